@@ -0,0 +1,109 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Measure the cpu inspector against a generated high core count host
+
+Usage:
+    PYTHONPATH=. python benchmarks/cpuinfo.py [--sockets 8] [--cores 128] [--memory]
+
+A /proc/cpuinfo and /sys/devices/system/cpu tree are written to a temporary directory from the
+test_cpuinfo.py fixtures, 1024 logical processors by default. The script reports the time to
+construct CPUInfo from /proc/cpuinfo and SysFSCPUInfo from sysfs, the time to run the accessors
+used by the cpu inspector, and, for comparison, the same accessors with the indexes rebuilt on
+every access. With --memory, the size of the parsed core dictionaries is measured with
+tracemalloc.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from mercury_agent.inspector.hwlib.cpuinfo import CPUInfo, SysFSCPUInfo, build_index
+from tests.unit.hwlib.test_cpuinfo import write_fake_cpu_tree
+
+ACCESSES = 1000
+
+
+def measure(f, memory=False):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = f()
+    elapsed = time.perf_counter() - start
+    size = None
+    if memory:
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return result, elapsed, size
+
+
+def report(name, elapsed, size=None):
+    print('{:<40} {:>10.4f} {:>12}'.format(
+        name, elapsed, size is None and '-' or '%.1f KB' % (size / 1024.0)))
+
+
+def inspector_accesses(info):
+    for _ in range(ACCESSES):
+        for cores in info.physical_index.values():
+            cores[0]['flags']
+        info.logical_processor_index
+        info.core_zero_index
+
+
+def rebuilt_accesses(info):
+    for _ in range(ACCESSES):
+        for cores in build_index(info.core_dicts, 'physical_id').values():
+            cores[0]['flags']
+        build_index(info.core_dicts, 'processor')
+        build_index(info.core_dicts, 'physical_id')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPUInfo benchmark')
+    parser.add_argument('--sockets', type=int, default=8)
+    parser.add_argument('--cores', type=int, default=128)
+    parser.add_argument('--memory', action='store_true')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='cpuinfo-')
+    try:
+        print('Generating %d logical processors' % (args.sockets * args.cores))
+        cpuinfo_path = write_fake_cpu_tree(root, sockets=args.sockets,
+                                           cores_per_socket=args.cores)
+        sysfs_root = os.path.join(root, 'sys')
+
+        print('{:<40} {:>10} {:>12}'.format('case', 'seconds', 'retained'))
+
+        proc_info, elapsed, size = measure(lambda: CPUInfo(cpuinfo_path), args.memory)
+        report('CPUInfo, /proc/cpuinfo', elapsed, size)
+
+        sysfs_info, elapsed, size = measure(
+            lambda: SysFSCPUInfo(sysfs_root=sysfs_root, cpuinfo_path=cpuinfo_path), args.memory)
+        report('SysFSCPUInfo, sysfs topology', elapsed, size)
+
+        _, elapsed, _ = measure(lambda: rebuilt_accesses(proc_info))
+        report('%d accesses, indexes rebuilt' % ACCESSES, elapsed)
+
+        _, elapsed, _ = measure(lambda: inspector_accesses(proc_info))
+        report('%d accesses, memoized indexes' % ACCESSES, elapsed)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
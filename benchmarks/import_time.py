@@ -0,0 +1,121 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Measure the import cost of the agent using python -X importtime
+
+Usage:
+    python benchmarks/import_time.py [--module mercury_agent.agent] [--top 25]
+    python benchmarks/import_time.py --save baseline.json
+    python benchmarks/import_time.py --baseline baseline.json --tolerance 20
+
+Each measurement runs in a fresh interpreter. The median of --runs runs is reported per module.
+With --baseline, the script exits non-zero when the total cumulative import time regresses by
+more than --tolerance percent.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+def measure(module, python=sys.executable):
+    """
+    Import module in a new interpreter and parse the importtime report
+    :param module: The module to import
+    :param python: interpreter path
+    :return: dict of module: (self_us, cumulative_us)
+    """
+    process = subprocess.run([python, '-X', 'importtime', '-c', 'import {}'.format(module)],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    if process.returncode:
+        raise RuntimeError('Importing {} failed:\n{}'.format(module, process.stderr))
+
+    timings = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def collect(module, runs):
+    samples = [measure(module) for _ in range(runs)]
+    names = set().union(*samples)
+    return dict(
+        (name, {
+            'self_us': median([s[name][0] for s in samples if name in s]),
+            'cumulative_us': median([s[name][1] for s in samples if name in s])
+        }) for name in names)
+
+
+def report(results, module, top):
+    print('{:>12} {:>14}  {}'.format('self [us]', 'cumulative [us]', 'module'))
+    ordered = sorted(results.items(), key=lambda item: item[1]['cumulative_us'], reverse=True)
+    for name, timing in ordered[:top]:
+        print('{:>12} {:>14}  {}'.format(timing['self_us'], timing['cumulative_us'], name))
+    print('\nTotal for {}: {:.1f} ms'.format(module, results[module]['cumulative_us'] / 1000.0))
+
+
+def compare(results, baseline, module, tolerance):
+    current = results[module]['cumulative_us']
+    previous = baseline[module]['cumulative_us']
+    change = (current - previous) * 100.0 / previous
+    print('Baseline: {:.1f} ms, current: {:.1f} ms ({:+.1f}%)'.format(
+        previous / 1000.0, current / 1000.0, change))
+
+    new_modules = sorted(set(results) - set(baseline))
+    if new_modules:
+        print('Modules not imported in the baseline:')
+        for name in sorted(new_modules, key=lambda n: results[n]['cumulative_us'], reverse=True):
+            print('  {} ({} us)'.format(name, results[name]['cumulative_us']))
+
+    return change <= tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent import time benchmark')
+    parser.add_argument('--module', default='mercury_agent.agent')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--save', help='Write results to a json file')
+    parser.add_argument('--baseline', help='Compare against a saved json file')
+    parser.add_argument('--tolerance', type=float, default=20.0,
+                        help='Allowed regression, in percent, against the baseline')
+    args = parser.parse_args()
+
+    results = collect(args.module, args.runs)
+    report(results, args.module, args.top)
+
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        if not compare(results, baseline, args.module, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
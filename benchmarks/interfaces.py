@@ -0,0 +1,110 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Measure per interface address, gateway and udev lookups against synthetic interface sets
+
+Usage:
+    PYTHONPATH=. python benchmarks/interfaces.py [--interfaces 500 2000 4000]
+
+netifaces is replaced by an in-memory fake describing a host with a few physical NICs and a
+bond carrying the requested number of VLAN and veth interfaces. netifaces.interfaces() copies
+the interface list on each call, as the real call walks getifaddrs(). For each set the script
+times the lookups as interface_inspector used to make them, through the module level helpers,
+index_gateways() for every interface and a linear udev scan, and through a NetworkSnapshot with
+a udev index.
+"""
+
+import argparse
+import time
+
+import mock
+import netifaces
+
+from mercury_agent.inspector.hwlib import network_interfaces
+from mercury_agent.inspector.hwlib.network_interfaces import NetworkSnapshot, index_gateways
+from mercury_agent.inspector.inspectors.interfaces import get_udev_interface_by_name, \
+    index_udev_interfaces
+
+
+def synthetic_host(count):
+    """
+    :return: (interface names, ifaddresses dict, gateways, udev devices)
+    """
+    names = ['lo', 'eno1', 'eno2', 'bond0']
+    for index in range(count):
+        names.append(index % 2 and 'veth%d' % index or 'bond0.%d' % (index + 100))
+
+    addresses = dict()
+    gateways = {netifaces.AF_INET: [], netifaces.AF_INET6: []}
+    for index, name in enumerate(names):
+        addresses[name] = {
+            netifaces.AF_LINK: [{'addr': '02:00:00:%02x:%02x:%02x' % (
+                index >> 16 & 0xff, index >> 8 & 0xff, index & 0xff)}],
+            netifaces.AF_INET: [{'addr': '10.%d.%d.1' % (index >> 8 & 0xff, index & 0xff),
+                                 'netmask': '255.255.255.0'}],
+            netifaces.AF_INET6: [{'addr': 'fd00::%x' % index, 'netmask': 'ffff:ffff:ffff:ffff::/64'}]
+        }
+        if name.startswith('bond0.'):
+            gateways[netifaces.AF_INET].append(
+                ('10.%d.%d.254' % (index >> 8 & 0xff, index & 0xff), name, False))
+            gateways[netifaces.AF_INET6].append(('fe80::1', name, False))
+    gateways['default'] = {netifaces.AF_INET: ('10.0.1.254', 'eno1')}
+
+    udev_devices = [{'INTERFACE': name, 'ID_NET_NAME_MAC': 'enx' + name} for name in names]
+    return names, addresses, gateways, udev_devices
+
+
+def per_interface_lookups(names, udev_devices):
+    gateways = netifaces.gateways()
+    for interface in network_interfaces.list_interfaces():
+        get_udev_interface_by_name(udev_devices, interface)
+        network_interfaces.get_ipv4_network_info(interface)
+        index_gateways(gateways.get(netifaces.AF_INET, [])).get(interface)
+        network_interfaces.get_ipv6_network_info(interface)
+        index_gateways(gateways.get(netifaces.AF_INET6, [])).get(interface)
+
+
+def snapshot_lookups(names, udev_devices):
+    udev_index = index_udev_interfaces(udev_devices)
+    network = NetworkSnapshot()
+    for interface in network.interfaces:
+        udev_index.get(interface)
+        network.get_ipv4_network_info(interface)
+        network.get_gateways(interface, netifaces.AF_INET)
+        network.get_ipv6_network_info(interface)
+        network.get_gateways(interface, netifaces.AF_INET6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Interface inventory benchmark')
+    parser.add_argument('--interfaces', type=int, nargs='+', default=[500, 2000, 4000])
+    args = parser.parse_args()
+
+    print('{:>10} {:>16} {:>16}'.format('interfaces', 'per interface s', 'snapshot s'))
+    for count in args.interfaces:
+        names, addresses, gateways, udev_devices = synthetic_host(count)
+        with mock.patch.object(netifaces, 'interfaces', side_effect=lambda: list(names)), \
+                mock.patch.object(netifaces, 'ifaddresses', side_effect=addresses.__getitem__), \
+                mock.patch.object(netifaces, 'gateways', return_value=gateways):
+            timings = []
+            for f in (per_interface_lookups, snapshot_lookups):
+                start = time.perf_counter()
+                f(names, udev_devices)
+                timings.append(time.perf_counter() - start)
+        print('{:>10} {:>16.3f} {:>16.3f}'.format(len(names), *timings))
+
+
+if __name__ == '__main__':
+    main()
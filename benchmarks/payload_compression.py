@@ -0,0 +1,92 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Compare payload compression codecs over the unit test fixtures
+
+Usage:
+    PYTHONPATH=. python benchmarks/payload_compression.py [--iterations 50] [paths...]
+
+For each json fixture (tests/unit/resources by default) the script reports the packed msgpack
+size, the bytes sent on the wire for each available codec (base64 envelope included) and the
+average CPU time to pack and compress, and to decompress and unpack.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+from mercury_agent import compression
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'unit', 'resources')
+
+
+def cpu_time(f, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        f()
+    return (time.process_time() - start) / iterations
+
+
+def load(paths):
+    payloads = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+        for name in files:
+            with open(name) as fp:
+                payloads.append((os.path.basename(name), json.load(fp)))
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payload compression benchmark')
+    parser.add_argument('paths', nargs='*', default=[DEFAULT_PATH])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    codecs = compression.available_codecs()
+    print('{:<26} {:>10} {:>8} {:>10} {:>7} {:>12} {:>12}'.format(
+        'payload', 'msgpack', 'codec', 'wire', 'ratio', 'compress ms', 'decompress ms'))
+
+    totals = dict((codec, [0, 0.0, 0.0]) for codec in codecs)
+    raw_total = 0
+
+    for name, payload in load(args.paths):
+        raw = len(compression.pack(payload))
+        raw_total += raw
+        for codec in codecs:
+            envelope = compression.compress(payload, codec, threshold=0)
+            wire = len(compression.pack(envelope))
+            compress_time = cpu_time(lambda: compression.compress(payload, codec, threshold=0),
+                                     args.iterations)
+            decompress_time = cpu_time(lambda: compression.decompress(envelope), args.iterations)
+            totals[codec][0] += wire
+            totals[codec][1] += compress_time
+            totals[codec][2] += decompress_time
+            print('{:<26} {:>10} {:>8} {:>10} {:>7.2f} {:>12.3f} {:>12.3f}'.format(
+                name, raw, codec, wire, float(wire) / raw, compress_time * 1000,
+                decompress_time * 1000))
+
+    print('')
+    for codec in codecs:
+        wire, compress_time, decompress_time = totals[codec]
+        print('{:<26} {:>10} {:>8} {:>10} {:>7.2f} {:>12.3f} {:>12.3f}'.format(
+            'total', raw_total, codec, wire, float(wire) / raw_total, compress_time * 1000,
+            decompress_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Simulate a fleet of agents registering against a stub backend which recovers from an outage
+
+Usage:
+    PYTHONPATH=. python benchmarks/registration_load.py --agents 5000 --outage 120 --capacity 200
+    PYTHONPATH=. python benchmarks/registration_load.py --strategy fixed
+    PYTHONPATH=. python benchmarks/registration_load.py --retry-after 30
+
+The simulation runs on a virtual clock so thousands of agents can be modelled in a few seconds.
+Each agent runs the same retry logic as Agent.run(): it calls register() on the backend and, on
+error, sleeps for the delay chosen by the strategy. The stub backend rejects every request until
+the outage ends, then accepts up to --capacity registrations per second and rejects the excess
+(optionally with a retry_after hint).
+
+The report is the arrival-rate curve, requests per --bucket seconds, and the time until every
+agent was registered.
+"""
+
+import argparse
+import heapq
+import random
+import sys
+
+from mercury_agent.backoff import ExponentialBackoff, get_retry_after
+
+FIXED_RETRY_SECONDS = 15
+
+
+class StubBackend(object):
+    """Mimics BackEndClient.register() responses from an overloaded backend"""
+    def __init__(self, outage, capacity, retry_after=None):
+        self.outage = outage
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.now = 0.0
+        self.arrivals = []
+        self.accepted = {}
+
+    def register(self, device_info, agent_info):
+        self.arrivals.append(self.now)
+        second = int(self.now)
+
+        if self.now < self.outage or self.accepted.get(second, 0) >= self.capacity:
+            response = {'error': True, 'message': 'Backend unavailable'}
+            if self.retry_after and self.now >= self.outage:
+                response['retry_after'] = self.retry_after
+            return response
+
+        self.accepted[second] = self.accepted.get(second, 0) + 1
+        return {'error': False, 'message': 'ok'}
+
+
+class FixedDelay(object):
+    """The retry behaviour prior to exponential backoff"""
+    def next_delay(self, retry_after=None):
+        return FIXED_RETRY_SECONDS
+
+
+def simulate(agents, backend, strategy, boot_window, base, cap, seed):
+    rng = random.Random(seed)
+
+    def new_strategy():
+        if strategy == 'fixed':
+            return FixedDelay()
+        return ExponentialBackoff(base=base, cap=cap, uniform=rng.uniform)
+
+    # (time, agent index)
+    events = [(rng.uniform(0, boot_window), idx) for idx in range(agents)]
+    heapq.heapify(events)
+    strategies = [new_strategy() for _ in range(agents)]
+    registered_at = {}
+
+    while events:
+        now, idx = heapq.heappop(events)
+        backend.now = now
+        result = backend.register({'mercury_id': idx}, {})
+        if result.get('error'):
+            heapq.heappush(events, (now + strategies[idx].next_delay(get_retry_after(result)), idx))
+        else:
+            registered_at[idx] = now
+
+    return registered_at
+
+
+def histogram(arrivals, bucket, width=60):
+    counts = {}
+    for t in arrivals:
+        counts[int(t // bucket)] = counts.get(int(t // bucket), 0) + 1
+
+    peak = max(counts.values())
+    for b in range(max(counts) + 1):
+        count = counts.get(b, 0)
+        bar = '#' * int(round(count * width / float(peak)))
+        print('{:>7.0f}s {:>8.1f}/s {}'.format(b * bucket, count / float(bucket), bar))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registration storm simulation')
+    parser.add_argument('--agents', type=int, default=5000)
+    parser.add_argument('--outage', type=float, default=120.0,
+                        help='Seconds until the backend recovers')
+    parser.add_argument('--capacity', type=int, default=200,
+                        help='Registrations per second the backend can accept')
+    parser.add_argument('--retry-after', type=float,
+                        help='retry_after hint sent when the backend is overloaded')
+    parser.add_argument('--strategy', choices=['backoff', 'fixed'], default='backoff')
+    parser.add_argument('--boot-window', type=float, default=10.0,
+                        help='Agents start uniformly over this many seconds')
+    parser.add_argument('--base', type=float, default=1.0)
+    parser.add_argument('--cap', type=float, default=300.0)
+    parser.add_argument('--bucket', type=float, default=5.0,
+                        help='Histogram bucket size in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    backend = StubBackend(args.outage, args.capacity, args.retry_after)
+    registered_at = simulate(args.agents, backend, args.strategy, args.boot_window,
+                             args.base, args.cap, args.seed)
+
+    histogram(backend.arrivals, args.bucket)
+
+    after_outage = [t for t in backend.arrivals if t >= args.outage]
+    per_second = {}
+    for t in after_outage:
+        per_second[int(t)] = per_second.get(int(t), 0) + 1
+    peak = max(per_second.values()) if per_second else 0
+
+    print('\nStrategy: {}'.format(args.strategy))
+    print('Requests: {} ({:.2f} per agent)'.format(
+        len(backend.arrivals), len(backend.arrivals) / float(args.agents)))
+    print('Peak arrival rate after recovery: {}/s (capacity {}/s)'.format(peak, args.capacity))
+    print('All agents registered after {:.1f}s'.format(max(registered_at.values())))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
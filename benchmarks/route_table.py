@@ -0,0 +1,159 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""
+Measure route inventory collection against a generated full BGP table
+
+Usage:
+    PYTHONPATH=. python benchmarks/route_table.py [--routes 1000000] [--memory]
+
+A fixture resembling a router with a full IPv4 table (mostly /24s learned over bgp, a few
+connected networks and a default route) is generated in `ip route show` format and as rtnetlink
+RTM_NEWROUTE payloads. For each, the script reports the time to build the complete route list,
+the time to build the summarized routes and route_summary sections, and their msgpack size.
+With --memory, peak allocations are measured with tracemalloc, which makes the timings slower.
+"""
+
+import argparse
+import random
+import socket
+import struct
+import tempfile
+import time
+import tracemalloc
+
+from mercury_agent import compression
+from mercury_agent.inspector.hwlib import rtnetlink
+from mercury_agent.inspector.hwlib.iproute2 import iter_table
+from mercury_agent.inspector.inspectors.routes import collect_routes
+
+PREFIX_LENGTHS = [24] * 60 + [23, 22, 22, 21, 20, 20, 19, 18, 17, 16] * 4
+
+
+def generate(count, seed=0):
+    """
+    Generate (destination, prefix length, gateway, device, protocol) tuples
+    """
+    rng = random.Random(seed)
+    yield '0.0.0.0', 0, '203.0.113.1', 'eth0', 'bgp'
+    for index in range(4):
+        yield '10.%d.0.0' % index, 16, None, 'eth%d' % index, 'kernel'
+    for _ in range(count - 5):
+        length = rng.choice(PREFIX_LENGTHS)
+        network = rng.getrandbits(32) & (0xffffffff << (32 - length))
+        yield (socket.inet_ntoa(struct.pack('!I', network)), length,
+               '10.%d.0.1' % rng.randrange(4), 'eth%d' % rng.randrange(4), 'bgp')
+
+
+def write_text_fixture(fp, count):
+    for destination, length, gateway, dev, proto in generate(count):
+        if not length:
+            fp.write('default via %s dev %s proto %s metric 20\n' % (gateway, dev, proto))
+        elif gateway:
+            fp.write('%s/%d via %s dev %s proto %s metric 20\n' % (destination, length, gateway, dev,
+                                                                    proto))
+        else:
+            fp.write('%s/%d dev %s proto %s scope link src %s1\n' % (destination, length, dev, proto,
+                                                                     destination[:-1]))
+    fp.flush()
+
+
+def _rtattr(rta_type, payload):
+    length = rtnetlink.RTATTR.size + len(payload)
+    return rtnetlink.RTATTR.pack(length, rta_type) + payload + b'\0' * (((length + 3) & ~3) - length)
+
+
+def netlink_fixture(count):
+    protocols = {'kernel': 2, 'bgp': 186}
+    payloads = []
+    for destination, length, gateway, dev, proto in generate(count):
+        attributes = _rtattr(rtnetlink.RTA_TABLE, struct.pack('=I', 254))
+        if length:
+            attributes += _rtattr(rtnetlink.RTA_DST, socket.inet_aton(destination))
+        if gateway:
+            attributes += _rtattr(rtnetlink.RTA_PRIORITY, struct.pack('=I', 20))
+            attributes += _rtattr(rtnetlink.RTA_GATEWAY, socket.inet_aton(gateway))
+        attributes += _rtattr(rtnetlink.RTA_OIF, struct.pack('=i', int(dev[3:]) + 2))
+        payloads.append(rtnetlink.RTMSG.pack(socket.AF_INET, length, 0, 0, 254, protocols[proto],
+                                             gateway and 0 or 253, 1, 0) + attributes)
+    return payloads
+
+
+def sections(table):
+    """The routes and route_summary sections sent with the inventory"""
+    return {'routes': list(table), 'route_summary': table.summary.to_dict()}
+
+
+def measure(f, memory):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = f()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(name, result, elapsed, peak):
+    size = len(compression.pack(result))
+    print('{:<34} {:>10.2f} {:>14} {:>14}'.format(
+        name, elapsed, size, peak is None and '-' or '%.1f MB' % (peak / 1048576.0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route table benchmark')
+    parser.add_argument('--routes', type=int, default=1000000)
+    parser.add_argument('--threshold', type=int, default=10000)
+    parser.add_argument('--memory', action='store_true')
+    args = parser.parse_args()
+
+    interfaces = dict((index + 2, 'eth%d' % index) for index in range(4))
+
+    print('Generating %d routes' % args.routes)
+    text = tempfile.NamedTemporaryFile(mode='w+', prefix='routes-')
+    write_text_fixture(text, args.routes)
+    payloads = netlink_fixture(args.routes)
+
+    print('{:<34} {:>10} {:>14} {:>14}'.format('case', 'seconds', 'msgpack bytes', 'peak'))
+
+    def text_full():
+        text.seek(0)
+        return list(iter_table(text))
+
+    def text_summarized():
+        text.seek(0)
+        return sections(collect_routes(iter_table(text), summary_threshold=args.threshold))
+
+    def netlink_full():
+        return [rtnetlink.parse_route(payload, interfaces.get) for payload in payloads]
+
+    def netlink_summarized():
+        return sections(collect_routes(
+            (rtnetlink.parse_route(payload, interfaces.get) for payload in payloads),
+            summary_threshold=args.threshold))
+
+    for name, f in (('ip route show, full list', text_full),
+                    ('ip route show, summarized', text_summarized),
+                    ('rtnetlink, full list', netlink_full),
+                    ('rtnetlink, summarized', netlink_summarized)):
+        report(name, *measure(f, args.memory))
+
+    text.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,19 +14,30 @@
 #    limitations under the License.
 
 import logging
+import threading
 import time
 
-from mercury.common.clients.rpc.backend import BackEndClient
 from mercury.common.exceptions import MercuryCritical, MercuryGeneralException
 
+from mercury_agent.backend_client import CompressingBackEndClient
+from mercury_agent.backoff import ExponentialBackoff, get_retry_after
 from mercury_agent.capabilities import runtime_capabilities
-from mercury_agent.configuration import get_configuration
+from mercury_agent.compression import negotiate, set_negotiated_codec
+from mercury_agent.configuration import get_configuration, \
+    get_inspector_options
 from mercury_agent.pong import spawn_pong_process
 from mercury_agent.register import get_dhcp_ip, register
 from mercury_agent.remote_logging import MercuryLogHandler
 from mercury_agent.rpc import AgentService
+from mercury_agent.timeline import Timeline
 
 from mercury_agent.inspector import inspect
+from mercury_agent.inspector.inventory_cache import InventoryCache
+from mercury_agent.inspector.publisher import get_publisher
+from mercury_agent.inspector.raid_refresh import get_raid_refresher
+from mercury_agent.inspector.scheduler import DEFAULT_INTERVALS, \
+    InspectorScheduler
+from mercury_agent.inspector.udev_monitor import UDevInventoryMonitor
 
 # Async Inspectors
 
@@ -37,9 +48,6 @@ from mercury_agent.inspector.inspectors.async_inspectors.lldp import \
 log = logging.getLogger(__name__)
 
 
-RETRY_SECONDS = 15
-
-
 class Agent(object):
     def __init__(self, configuration, logger):
         """
@@ -56,48 +64,210 @@ class Agent(object):
         if not self.rpc_backend_url:
             raise MercuryCritical('Missing rpc backend in local configuration')
 
-        self.backend = BackEndClient(self.rpc_backend_url,
-                                     linger=0,
-                                     response_timeout=10,
-                                     rcv_retry=3)
+        self.backend = CompressingBackEndClient(self.rpc_backend_url,
+                                                linger=0,
+                                                response_timeout=10,
+                                                rcv_retry=3)
+
+        self.inspector_options = get_inspector_options(configuration)
+        get_raid_refresher(options=self.inspector_options['raid'])
+
+        if self.configuration.agent.inventory_cache.disabled:
+            self.inventory_cache = None
+        else:
+            self.inventory_cache = InventoryCache(
+                self.configuration.agent.inventory_cache.path)
+
+    def collect_inventory(self, timeline=None, early_only=False):
+        """
+        Load inventory from the cache if the hardware has not changed, otherwise run the
+        inspectors
+        :param timeline: Optional startup timeline
+        :param early_only: Only run early inspectors and driver probes, stream_late_inventory
+            must be called after registration
+        :return: device_info, True if the inventory came from the cache
+        """
+        cached = self.inventory_cache and self.inventory_cache.load()
+        if cached:
+            log.info('Using cached inventory, a full inspection will run '
+                     'in the background')
+            return inspect.warm_start(cached, timeline=timeline), True
+
+        max_workers = self.configuration.agent.inspector.max_workers
+        if early_only:
+            log.info('Running early inspectors')
+            return inspect.inspect_early(max_workers=max_workers,
+                                         timeline=timeline,
+                                         options=self.inspector_options), False
+
+        log.info('Running inspectors')
+        device_info = inspect.inspect(max_workers=max_workers,
+                                      timeline=timeline,
+                                      options=self.inspector_options)
+        if self.inventory_cache:
+            self.inventory_cache.save(device_info)
+        return device_info, False
+
+    def stream_late_inventory(self, mercury_id, timeline=None):
+        """
+        Run late inspectors after early registration, sending each section
+        to the backend as soon as it is collected
+        :param mercury_id: The registered MercuryID
+        :param timeline: Optional startup timeline
+        :return:
+        """
+        publisher = get_publisher()
+
+        # noinspection PyUnusedLocal
+        def _update(name, data):
+            log.info('Sending late inventory section: {}'.format(name))
+            # A failed push must not stop the remaining late inspectors, the
+            # section stays unacknowledged and goes out with the next update
+            # noinspection PyBroadException
+            try:
+                publisher.publish(inspect.global_device_info, sections=[name])
+            except Exception:
+                log.exception('Failed to send late inventory section: '
+                              '{}'.format(name))
+
+        device_info = inspect.inspect_late(
+            on_complete=_update,
+            max_workers=self.configuration.agent.inspector.max_workers,
+            timeline=timeline,
+            options=self.inspector_options)
+
+        if self.inventory_cache:
+            self.inventory_cache.save(device_info)
+
+        if timeline:
+            # The late inspectors finish after registration
+            self.send_timeline(mercury_id, timeline)
+
+    def send_timeline(self, mercury_id, timeline):
+        """
+        Log the startup timeline and send it to the backend. The timeline
+        sent with the registration stops before registration completes, this
+        one includes every phase recorded so far
+        :param mercury_id: The registered MercuryID
+        :param timeline: Startup timeline
+        :return:
+        """
+        timeline.log_summary()
+
+        # noinspection PyBroadException
+        try:
+            self.backend.update(mercury_id,
+                                {'startup_timeline': timeline.to_dict()})
+        except Exception:
+            log.exception('Failed to send the startup timeline')
+
+    def refresh_inventory(self, cached):
+        """
+        Run a full inspection after registering with cached inventory and
+        update the backend with any sections that differ
+        :param cached: The inventory used for registration
+        :return:
+        """
+        mercury_id = cached['mercury_id']
+
+        # This runs in its own thread, nothing else would report a failure
+        # noinspection PyBroadException
+        try:
+            device_info = inspect.inspect(
+                max_workers=self.configuration.agent.inspector.max_workers,
+                options=self.inspector_options)
+
+            if device_info['mercury_id'] != mercury_id:
+                log.error('MercuryID changed from {} to {} during background '
+                          'inspection'.format(mercury_id,
+                                              device_info['mercury_id']))
+
+            get_publisher().publish(device_info)
+            self.inventory_cache.save(device_info)
+        except Exception:
+            log.exception('Background inventory refresh failed')
+
+    def start_refresh_scheduler(self):
+        inspector_configuration = self.configuration.agent.inspector
+        if inspector_configuration.refresh_disabled:
+            log.info('Background inspector refresh is disabled')
+            return None
+
+        intervals = dict(DEFAULT_INTERVALS)
+        intervals.update(inspector_configuration.refresh_intervals or {})
+
+        scheduler = InspectorScheduler(
+            AgentService.serial_lock,
+            intervals=intervals,
+            jitter=inspector_configuration.refresh_jitter,
+            options=self.inspector_options)
+        scheduler.start()
+        return scheduler
 
     def run(self, dhcp_ip_method='simple'):
         # TODO: Add other mechanisms for enumerating the devices public ip
         log.debug('Agent: %s, Pong: %s' % (self.agent_bind_address,
                                            self.pong_bind_address))
 
-        log.info('Running inspectors')
+        timeline = Timeline()
+        early_registration = self.configuration.agent.early_registration
+
+        if early_registration:
+            # pong does not depend on inventory, make the agent reachable
+            # while the inspectors run
+            log.info('Starting pong service')
+            with timeline.phase('pong_spawn'):
+                spawn_pong_process(self.pong_bind_address)
 
-        device_info = inspect.inspect()
+        with timeline.phase('inspection'):
+            device_info, from_cache = self.collect_inventory(
+                timeline, early_only=early_registration)
 
         log.info('Registering device inventory for MercuryID {}'.format(
             device_info['mercury_id']))
 
-        log.info('Starting pong service')
-        spawn_pong_process(self.pong_bind_address)
+        if not early_registration:
+            log.info('Starting pong service')
+            with timeline.phase('pong_spawn'):
+                spawn_pong_process(self.pong_bind_address)
 
         log.info('Registering device')
 
-        local_ip = get_dhcp_ip(device_info, method=dhcp_ip_method)
+        with timeline.phase('ip_discovery'):
+            local_ip = get_dhcp_ip(device_info, method=dhcp_ip_method)
 
         # TODO: enumerate ipv6 addresses
         local_ipv6 = None
 
-        while True:
-            result = register(
-                self.backend,
-                device_info,
-                local_ip,
-                local_ipv6,
-                runtime_capabilities)
+        backoff = ExponentialBackoff(
+            base=self.configuration.agent.registration.backoff_base,
+            cap=self.configuration.agent.registration.backoff_cap)
+
+        with timeline.phase('registration'):
+            while True:
+                result = register(
+                    self.backend,
+                    device_info,
+                    local_ip,
+                    local_ipv6,
+                    runtime_capabilities,
+                    timeline=timeline)
+
+                if result.get('error'):
+                    delay = backoff.next_delay(get_retry_after(result))
+                    log.info('Registration was not successful, retrying in '
+                             '{:.1f} seconds...'.format(delay))
+                    time.sleep(delay)
+                    continue
 
-            if result.get('error'):
-                log.info('Registration was not successful, retrying...')
-                time.sleep(RETRY_SECONDS)
-                continue
+                log.info('Device has been registered successfully')
+                break
 
-            log.info('Device has been registered successfully')
-            break
+        compression = self.configuration.agent.compression
+        if not compression.disabled:
+            set_negotiated_codec(negotiate(result), compression.threshold)
+
+        get_publisher().acknowledge(device_info)
 
         # LogHandler
 
@@ -105,19 +275,36 @@ class Agent(object):
         self.log_handler.set_mercury_id(device_info['mercury_id'])
         log.info('Injection completed')
 
+        if from_cache:
+            threading.Thread(target=self.refresh_inventory,
+                             args=(device_info,)).start()
+        elif early_registration:
+            threading.Thread(target=self.stream_late_inventory,
+                             args=(device_info['mercury_id'], timeline)).start()
+
         # AsyncInspectors
-        try:
-            LLDPInspector(device_info, self.backend).inspect()
-        except MercuryGeneralException as mge:
-            log.error(
-                'Caught recoverable exception running async inspector: '
-                '{}'.format(mge))
+        with timeline.phase('lldp_launch'):
+            try:
+                LLDPInspector(device_info, self.backend).inspect()
+            except MercuryGeneralException as mge:
+                log.error(
+                    'Caught recoverable exception running async inspector: '
+                    '{}'.format(mge))
 
         log.info('Starting agent rpc service: %s' % self.agent_bind_address)
 
-        agent_service = AgentService(self.agent_bind_address,
-                                     self.rpc_backend_url)
-        agent_service.bind()
+        with timeline.phase('rpc_bind'):
+            agent_service = AgentService(self.agent_bind_address,
+                                         self.rpc_backend_url)
+            agent_service.bind()
+
+        self.send_timeline(device_info['mercury_id'], timeline)
+
+        self.start_refresh_scheduler()
+
+        if not self.configuration.agent.udev_monitor.disabled:
+            UDevInventoryMonitor(options=self.inspector_options).start()
+
         agent_service.start()
 
 
@@ -1,7 +1,27 @@
 from mercury_agent.configuration import get_configuration
+from mercury_agent.compression import compress, get_negotiated_codec
 from mercury.common.clients.rpc.backend import BackEndClient
 
 
+class CompressingBackEndClient(BackEndClient):
+    """
+    BackEndClient which compresses inventory updates and task results once a codec has been
+    negotiated during registration
+    """
+    def update(self, mercury_id, update_data):
+        codec, threshold = get_negotiated_codec()
+        return super(CompressingBackEndClient, self).update(
+            mercury_id, compress(update_data, codec, threshold))
+
+    def complete_task(self, return_data):
+        codec, threshold = get_negotiated_codec()
+        if codec and isinstance(return_data, dict) and 'message' in return_data:
+            # The backend validates and routes on the other keys, only the result is compressed
+            return_data = dict(return_data)
+            return_data['message'] = compress(return_data['message'], codec, threshold)
+        return super(CompressingBackEndClient, self).complete_task(return_data)
+
+
 # Private
 __backend_client = None
 
@@ -10,6 +30,6 @@ def get_backend_client():
     # TODO: Trying this out, 0mq says it is ok
     global __backend_client
     if not __backend_client:
-        __backend_client = BackEndClient(
+        __backend_client = CompressingBackEndClient(
             get_configuration().agent.remote.backend_url)
     return __backend_client
@@ -0,0 +1,79 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import random
+
+log = logging.getLogger(__name__)
+
+
+def get_retry_after(result):
+    """
+    Read a retry delay hint, in seconds, from a backend error response
+    :param result: The response returned by BackEndClient
+    :return: float or None
+    """
+    if not isinstance(result, dict):
+        return None
+
+    hint = result.get('retry_after')
+    if hint is None and isinstance(result.get('message'), dict):
+        hint = result['message'].get('retry_after')
+
+    try:
+        hint = float(hint)
+    except (TypeError, ValueError):
+        return None
+
+    return hint if hint > 0 else None
+
+
+class ExponentialBackoff(object):
+    """
+    Capped exponential backoff with full jitter. Spreading retries uniformly over the window
+    keeps a fleet of agents from retrying in lock step after a backend outage
+    """
+    def __init__(self, base=1.0, cap=300.0, uniform=random.uniform):
+        """
+        :param base: Window size, in seconds, for the first retry
+        :param cap: Maximum window size
+        :param uniform: random.uniform compatible function
+        """
+        self.base = base
+        self.cap = cap
+        self.uniform = uniform
+        self.attempts = 0
+
+    def window(self):
+        # Avoid computing huge powers once the cap has been reached
+        exponent = min(self.attempts, 32)
+        return min(self.cap, self.base * 2 ** exponent)
+
+    def next_delay(self, retry_after=None):
+        """
+        :param retry_after: Optional delay hint from the backend. When present, the retry is
+            scheduled no earlier than the hint, with jitter added on top
+        :return: The number of seconds to wait before the next attempt
+        """
+        window = self.window()
+        self.attempts += 1
+
+        jitter = self.uniform(0, window)
+        if retry_after:
+            return retry_after + jitter
+        return jitter
+
+    def reset(self):
+        self.attempts = 0
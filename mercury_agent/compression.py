@@ -0,0 +1,169 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Optional payload compression for the backend channel.
+
+Large values are packed with msgpack, compressed and replaced by an envelope::
+
+    {'__compressed__': 'zlib', 'size': 123456, 'data': '<base64>'}
+
+The transport unpacks every raw msgpack string as utf-8, so compressed bytes are base64 encoded.
+Agents advertise the codecs they support in agent_info at registration. Compression is only
+used once the backend picks a codec in its registration response, older backends never see an
+envelope.
+"""
+
+import base64
+import logging
+import threading
+import zlib
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+ENVELOPE_KEY = '__compressed__'
+DEFAULT_THRESHOLD = 4096
+
+
+def _zlib_compress(data):
+    return zlib.compress(data, 6)
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# Ordered by preference
+CODECS = [('zlib', _zlib_compress, zlib.decompress)]
+if zstandard:
+    CODECS.insert(0, ('zstd', _zstd_compress, _zstd_decompress))
+
+
+def available_codecs():
+    return [name for name, _, _ in CODECS]
+
+
+def _get_codec(name):
+    for codec in CODECS:
+        if codec[0] == name:
+            return codec
+    raise ValueError('Unsupported compression codec: {}'.format(name))
+
+
+def pack(value):
+    return msgpack.packb(value, use_bin_type=False)
+
+
+def compress(value, codec, threshold=DEFAULT_THRESHOLD):
+    """
+    Compress value if its packed size is at least threshold bytes and compression helps
+    :param value: msgpack serializable value
+    :param codec: codec name or None to disable compression
+    :param threshold: minimum packed size in bytes
+    :return: The envelope or the original value
+    """
+    if not codec:
+        return value
+
+    packed = pack(value)
+    if len(packed) < threshold:
+        return value
+
+    name, compress_f, _ = _get_codec(codec)
+    data = base64.b64encode(compress_f(packed)).decode('ascii')
+    if len(data) >= len(packed):
+        return value
+
+    return {ENVELOPE_KEY: name, 'size': len(packed), 'data': data}
+
+
+def is_compressed(value):
+    return isinstance(value, dict) and ENVELOPE_KEY in value
+
+
+def decompress(value):
+    """
+    Reverse compress(). Values which are not envelopes are returned as they are
+    """
+    if not is_compressed(value):
+        return value
+    _, _, decompress_f = _get_codec(value[ENVELOPE_KEY])
+    return msgpack.unpackb(decompress_f(base64.b64decode(value['data'])), raw=False)
+
+
+def get_registration_info(threshold=DEFAULT_THRESHOLD):
+    """
+    :return: Compression support to advertise in agent_info
+    """
+    return {'codecs': available_codecs(), 'threshold': threshold}
+
+
+def negotiate(register_result):
+    """
+    Read the codec chosen by the backend from a registration response
+    :param register_result: BackEndClient.register() response
+    :return: codec name or None
+    """
+    if not isinstance(register_result, dict):
+        return None
+
+    choice = register_result.get('compression')
+    message = register_result.get('message')
+    if choice is None and isinstance(message, dict):
+        choice = message.get('compression')
+
+    if choice in available_codecs():
+        return choice
+
+    if choice:
+        log.warning('Backend requested unsupported compression codec: {}'.format(choice))
+    return None
+
+
+class _Negotiated(object):
+    def __init__(self):
+        self.codec = None
+        self.threshold = DEFAULT_THRESHOLD
+        self.lock = threading.Lock()
+
+
+# Private, shared by every backend client in the process
+__negotiated = _Negotiated()
+
+
+def set_negotiated_codec(codec, threshold=DEFAULT_THRESHOLD):
+    with __negotiated.lock:
+        __negotiated.codec = codec
+        __negotiated.threshold = threshold
+    log.info('Backend payload compression: {}'.format(codec or 'disabled'))
+
+
+def get_negotiated_codec():
+    """
+    :return: (codec, threshold)
+    """
+    with __negotiated.lock:
+        return __negotiated.codec, __negotiated.threshold
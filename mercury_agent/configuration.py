@@ -62,6 +62,20 @@ def parse_options():
                              env_variable='STORCLI_PATH',
                              default='storcli64')
 
+    configuration.add_option('agent.hardware.raid.storcli_snapshot_ttl',
+                             default=30,
+                             special_type=int,
+                             help_string='Seconds storcli controller and disk '
+                                         'group output is reused before it is '
+                                         'read again. Writes always discard it')
+
+    configuration.add_option('agent.hardware.raid.storcli_timeout',
+                             default=120,
+                             special_type=int,
+                             help_string='Seconds a storcli command may run '
+                                         'before it is killed, 0 waits '
+                                         'forever')
+
     configuration.add_option('agent.hardware.raid.hpssacli_path',
                              cli_argument='--hpssacli_path',
                              env_variable='HPSSACLI_PATH',
@@ -84,6 +98,133 @@ def parse_options():
                              help_string='The location of the racadm binary',
                              default='racadm')
 
+    configuration.add_option('agent.inspector.max_workers',
+                             cli_argument='--inspector-max-workers',
+                             env_variable='MERCURY_AGENT_INSPECTOR_MAX_WORKERS',
+                             default=8,
+                             special_type=int,
+                             help_string='The number of threads used to run '
+                                         'inspectors. 1 runs them serially')
+
+    configuration.add_option('agent.inspector.routes.summary_threshold',
+                             default=10000,
+                             special_type=int,
+                             help_string='Routing tables larger than this are '
+                                         'summarized, only default and '
+                                         'connected routes are sent with the '
+                                         'inventory')
+
+    configuration.add_option('agent.inspector.routes.top_prefixes',
+                             default=10,
+                             special_type=int,
+                             help_string='Number of prefix lengths and '
+                                         'next hops, those carrying the most '
+                                         'routes, included in the route '
+                                         'summary')
+
+    configuration.add_option('agent.inspector.os_storage.properties',
+                             default=['*'],
+                             help_string='udev properties reported for each '
+                                         'block device. Names or shell style '
+                                         'patterns, \'*\' reports every '
+                                         'property. On hosts with thousands '
+                                         'of paths, a list such as DEVNAME '
+                                         'DEVPATH DEVTYPE DEVLINKS MAJOR '
+                                         'MINOR SUBSYSTEM ID_* DM_NAME '
+                                         'DM_UUID shrinks the inventory')
+
+    configuration.add_option('agent.inspector.raid.max_workers',
+                             default=4,
+                             special_type=int,
+                             help_string='Number of RAID adapters inspected '
+                                         'at the same time')
+
+    configuration.add_option('agent.inspector.raid.adapter_timeout',
+                             default=300,
+                             special_type=int,
+                             help_string='Seconds a RAID adapter may take to '
+                                         'inspect before it is reported as '
+                                         'errored')
+
+    configuration.add_option('agent.inspector.cpu.sysfs_topology',
+                             default=False,
+                             special_type=bool,
+                             help_string='Read cpu topology and frequencies '
+                                         'from /sys/devices/system/cpu and '
+                                         'parse only one /proc/cpuinfo entry '
+                                         'per socket')
+
+    configuration.add_option('agent.registration.backoff_base',
+                             default=1.0,
+                             special_type=float,
+                             help_string='Initial registration retry window, '
+                                         'in seconds. The window doubles after '
+                                         'each failure')
+
+    configuration.add_option('agent.registration.backoff_cap',
+                             default=300.0,
+                             special_type=float,
+                             help_string='Maximum registration retry window, '
+                                         'in seconds')
+
+    configuration.add_option('agent.compression.disabled',
+                             default=False,
+                             special_type=bool,
+                             help_string='Do not offer payload compression to '
+                                         'the backend')
+
+    configuration.add_option('agent.compression.threshold',
+                             default=4096,
+                             special_type=int,
+                             help_string='Minimum payload size, in bytes, '
+                                         'which will be compressed')
+
+    configuration.add_option('agent.early_registration',
+                             default=False,
+                             special_type=bool,
+                             help_string='Register as soon as the early '
+                                         'inspectors complete and send late '
+                                         'inspector sections (raid, bmc) to '
+                                         'the backend as they are collected')
+
+    configuration.add_option('agent.inspector.refresh_disabled',
+                             default=False,
+                             special_type=bool,
+                             help_string='Do not re-run inspectors in the '
+                                         'background after registration')
+
+    configuration.add_option('agent.inspector.refresh_intervals',
+                             default={},
+                             help_string='Mapping of inspector name to refresh '
+                                         'interval in seconds, merged with the '
+                                         'defaults. 0 disables the refresh of '
+                                         'an inspector')
+
+    configuration.add_option('agent.inspector.refresh_jitter',
+                             default=0.1,
+                             special_type=float,
+                             help_string='Fraction of the refresh interval '
+                                         'used to randomize refreshes')
+
+    configuration.add_option('agent.udev_monitor.disabled',
+                             default=False,
+                             special_type=bool,
+                             help_string='Do not update inventory when udev '
+                                         'reports block, net or pci changes')
+
+    configuration.add_option('agent.inventory_cache.disabled',
+                             default=False,
+                             special_type=bool,
+                             help_string='Always run a full inspection before '
+                                         'registering rather than using the '
+                                         'inventory saved by the last run when '
+                                         'the boot_id and hardware fingerprint '
+                                         'match')
+
+    configuration.add_option('agent.inventory_cache.path',
+                             default='/var/cache/mercury-agent/inventory.json',
+                             help_string='Location of the saved inventory')
+
     return configuration.scan_options()
 
 
@@ -92,3 +233,29 @@ def get_configuration():
     if not __configuration:
         __configuration = parse_options()
     return __configuration
+
+
+def get_inspector_options(configuration):
+    """
+    :param configuration: The agent configuration
+    :return: dict of inspector name: keyword arguments passed to the inspector
+    """
+    inspector_configuration = configuration.agent.inspector
+    return {
+        'cpu': {
+            'sysfs_topology': inspector_configuration.cpu.sysfs_topology
+        },
+        'routes': {
+            'summary_threshold': inspector_configuration.routes.summary_threshold
+        },
+        'route_summary': {
+            'top_prefixes': inspector_configuration.routes.top_prefixes
+        },
+        'os_storage': {
+            'properties': inspector_configuration.os_storage.properties
+        },
+        'raid': {
+            'max_workers': inspector_configuration.raid.max_workers,
+            'adapter_timeout': inspector_configuration.raid.adapter_timeout
+        }
+    }
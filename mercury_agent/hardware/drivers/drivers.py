@@ -36,6 +36,22 @@ class DriverBase(object):
     def inspect(self):
         raise NotImplementedError
 
+    def get_adapter_indexes(self):
+        """
+        Drivers which can inspect their adapters independently return the adapter indexes here
+        and implement inspect_adapter, allowing the adapters to be inspected concurrently.
+        Called once at the start of each inspection.
+        :return: A list of adapter indexes or None when only inspect() is supported
+        """
+        return None
+
+    def inspect_adapter(self, index):
+        """
+        :param index: An index returned by get_adapter_indexes
+        :return: The inventory of one adapter
+        """
+        raise NotImplementedError
+
 
 class PCIDriverBase(DriverBase):
     @classmethod
@@ -75,10 +91,17 @@ def driver():
 
 
 def get_subsystem_drivers(subsystem):
+    """
+    Return instantiated drivers for a subsystem in registration order. Probes may complete in
+    any order, so the cache insertion order is not used
+    :param subsystem: driver_type
+    :return: list of driver instances
+    """
     drivers = []
-    for d in driver_class_cache:
-        if driver_class_cache[d].driver_type == subsystem:
-            drivers.append(driver_class_cache[d])
+    for d in registered_drivers:
+        instance = driver_class_cache.get(d['name'])
+        if instance and instance.driver_type == subsystem and instance not in drivers:
+            drivers.append(instance)
     return drivers
 
 
@@ -13,8 +13,6 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from hpssa.hpssa import HPSSA
-
 from mercury_agent.configuration import get_configuration
 
 from mercury_agent.hardware import platform_detection
@@ -38,6 +36,8 @@ class SmartArrayActions(RAIDActions):
 
     def __init__(self):
         super(SmartArrayActions, self).__init__()
+        # python-hpssa is only imported once a Smart Array controller is found
+        from hpssa.hpssa import HPSSA
         self.hpssa = HPSSA(hpssa_path=get_configuration().get(
             'agent', {}).get(
             'hardware', {}).get(
@@ -276,7 +276,10 @@ class SmartArrayActions(RAIDActions):
         :param drives: RAIDActions drive selection
         :return:
         """
-        adapter_info = self.get_adapter_info(adapter)
+        with self.adapter_transaction(adapter):
+            adapter_info = self.get_adapter_info(adapter)
+            target_drives = self.get_drives_from_selection(adapter, drives)
+
         slot = self.get_slot(adapter_info)
 
         if arrays:
@@ -285,8 +288,6 @@ class SmartArrayActions(RAIDActions):
         else:
             array_letters = None
 
-        target_drives = self.get_drives_from_selection(adapter, drives)
-
         return self.hpssa.add_spares(slot,
                                      ','.join([self.assemble_drive(d)
                                                for d in target_drives]),
@@ -305,13 +306,12 @@ class SmartArrayDriver(PCIDriverBase):
     ]
 
     @classmethod
-    def probe(cls, pci_data):
-        raid_pci_devices = platform_detection.get_raid_controllers(pci_data)
-        if not platform_detection.has_smart_array_gen9(pci_data=raid_pci_devices):
+    def probe(cls, pci_bus):
+        if not platform_detection.has_smart_array_gen9(pci_bus):
             return
 
         owns = list()
-        for device in raid_pci_devices:
+        for device in platform_detection.get_raid_controllers(pci_bus):
             if cls.check(device):
                 owns.append(device['slot'])
         return owns
@@ -320,15 +320,15 @@ class SmartArrayDriver(PCIDriverBase):
     def check(cls, pci_device):
         return pci_device['device_id'] in cls.PCI_DEVICE_IDS
 
-    def inspect(self):
-        adapters = []
-        for idx in range(len(self.handler.hpssa.adapters)):
-            _a = dict(**self.handler.get_adapter_info(idx))
-            adapter_obj = self.handler.hpssa.adapters[idx]
-            _a.update({
-                'adapter_handler': self.name
-            })
+    def get_adapter_indexes(self):
+        return list(range(len(self.handler.hpssa.adapters)))
 
-            adapters.append(_a)
+    def inspect_adapter(self, index):
+        _a = dict(**self.handler.get_adapter_info(index))
+        _a.update({
+            'adapter_handler': self.name
+        })
+        return _a
 
-        return adapters
+    def inspect(self):
+        return [self.inspect_adapter(idx) for idx in self.get_adapter_indexes()]
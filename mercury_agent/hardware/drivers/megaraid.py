@@ -26,7 +26,8 @@ from mercury_agent.hardware import platform_detection
 from mercury_agent.hardware.drivers import driver, PCIDriverBase
 from mercury_agent.hardware.raid.abstraction.api import RAIDActions, \
     RAIDAbstractionException
-from mercury_agent.hardware.raid.interfaces.megaraid.storcli import Storcli
+from mercury_agent.hardware.raid.interfaces.megaraid.storcli import Storcli, \
+    DEFAULT_SNAPSHOT_TTL, DEFAULT_TIMEOUT
 
 log = logging.getLogger(__name__)
 
@@ -61,11 +62,16 @@ class MegaRAIDActions(RAIDActions):
         As such, vendor_info may need a little more cleanup in comparison to SmartArray
         """
         super(MegaRAIDActions, self).__init__()
-        self.storcli = Storcli(binary_path=get_configuration().get(
+        raid_configuration = get_configuration().get(
             'agent', {}).get(
             'hardware', {}).get(
-            'raid', {}).get(
-            'storcli_path') or 'storcli')
+            'raid', {})
+        snapshot_ttl = raid_configuration.get('storcli_snapshot_ttl')
+        timeout = raid_configuration.get('storcli_timeout')
+        self.storcli = Storcli(
+            binary_path=raid_configuration.get('storcli_path') or 'storcli',
+            snapshot_ttl=DEFAULT_SNAPSHOT_TTL if snapshot_ttl is None else snapshot_ttl,
+            timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
 
     @staticmethod
     def get_vendor_info(adapter):
@@ -299,10 +305,13 @@ class MegaRAIDActions(RAIDActions):
             'unassigned': []
         }
 
-        # The second controller specific read is necessary because
-        # /call show all does not contain some necessary information.
-        # Such as "UN-CONFIGURED DRIVE LIST"
-        dg_info = self.storcli.get_disk_group(controller)[0]
+        # The disk group read is necessary because /call show all does not
+        # contain some necessary information. Such as "UN-CONFIGURED DRIVE LIST"
+        # Both come from the same snapshot, loaded once for every controller
+        try:
+            dg_info = self.storcli.snapshot.get_disk_group(controller)
+        except IndexError:
+            raise RAIDAbstractionException('Controller does not exist')
 
         if dg_info.get('TOPOLOGY'):
             # A configuration exists on the adapter
@@ -320,12 +329,12 @@ class MegaRAIDActions(RAIDActions):
 
     def transform_adapter_info(self, adapter_index):
         """
-        Transforms Storcli.controllers[adapter_index] into standard form
+        Transforms Storcli.snapshot.controllers[adapter_index] into standard form
         :param adapter_index:
         :return: Adapter details in standard from
         """
         try:
-            adapter = self.storcli.controllers[adapter_index]
+            adapter = self.storcli.snapshot.controllers[adapter_index]
         except IndexError:
             raise RAIDAbstractionException('Controller does not exist')
 
@@ -410,10 +419,11 @@ class MegaRAIDActions(RAIDActions):
         :param arrays:
         :return:
         """
-        adapter_info = self.get_adapter_info(adapter)
-        controller_id = self.get_controller_id(adapter_info)
+        with self.adapter_transaction(adapter):
+            adapter_info = self.get_adapter_info(adapter)
+            target_drives = self.get_drives_from_selection(adapter, drives)
 
-        target_drives = self.get_drives_from_selection(adapter, drives)
+        controller_id = self.get_controller_id(adapter_info)
 
         results = []
         dgs = []
@@ -448,8 +458,8 @@ class MegaRaidSASDriver(PCIDriverBase):
     wants = 'pci'
 
     @classmethod
-    def probe(cls, pci_data):
-        raid_pci_devices = platform_detection.get_raid_controllers(pci_data)
+    def probe(cls, pci_bus):
+        raid_pci_devices = platform_detection.get_raid_controllers(pci_bus)
         owns = list()
 
         for device in raid_pci_devices:
@@ -461,10 +471,13 @@ class MegaRaidSASDriver(PCIDriverBase):
     def check(cls, pci_device):
         return pci_device['driver'] == cls.name
 
-    def inspect(self):
-        adapters = []
+    def get_adapter_indexes(self):
+        # Inventory is always current, every adapter is then read from one snapshot
+        self.handler.storcli.snapshot.invalidate()
+        return list(range(len(self.devices)))
 
-        for idx in range(len(self.devices)):
-            adapters.append(self.handler.get_adapter_info(idx))
+    def inspect_adapter(self, index):
+        return self.handler.get_adapter_info(index)
 
-        return adapters
+    def inspect(self):
+        return [self.inspect_adapter(idx) for idx in self.get_adapter_indexes()]
@@ -26,8 +26,6 @@ Classes should provide:
 import logging
 import os
 
-from lxml import etree
-
 from mercury.common.helpers import cli
 
 log = logging.getLogger(__name__)
@@ -262,8 +260,9 @@ class IPMIToolHP(IPMITool):
         raise NotImplemented
 
     def create_superuser_hp(self, username, password):
+        from lxml import etree
+
         self.run_hpon('-f %s -l %s' % (self.list_users_path, self.users_path))
-        # noinspection PyUnresolvedReferences
         user_tree = etree.parse(self.users_path)
         user_elements = user_tree.xpath('.//USER_LOGIN')
         if user_elements:
@@ -1,3 +1,5 @@
+from mercury_agent.inspector.hwlib.lspci import as_pci_bus
+
 RAID_CONTROLLER_CLASS_ID = "0104"
 SMART_ARRAY_DEVICE_ID_9 = "3239"  # Smart Array Gen9 Controllers
 
@@ -27,12 +29,9 @@ def get_product_name(dmi_info):
 
 
 # PCI
-def has_smart_array_gen9(pci_data):
-    for device in pci_data:
-        if device['device_id'] == SMART_ARRAY_DEVICE_ID_9:
-            return True
-    return False
+def has_smart_array_gen9(pci_bus):
+    return bool(as_pci_bus(pci_bus).get_devices_by_device_id(SMART_ARRAY_DEVICE_ID_9))
 
 
-def get_raid_controllers(pci_data):
-    return [d for d in pci_data if d['class_id'] == RAID_CONTROLLER_CLASS_ID]
+def get_raid_controllers(pci_bus):
+    return as_pci_bus(pci_bus).get_devices_by_class(RAID_CONTROLLER_CLASS_ID)
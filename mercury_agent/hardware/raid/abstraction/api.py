@@ -1,5 +1,11 @@
+import contextlib
+import logging
+import threading
+
 from size import PercentString, Size
 
+log = logging.getLogger(__name__)
+
 
 class RAIDAbstractionException(Exception):
     pass
@@ -15,6 +21,38 @@ class RAIDActions(object):
 
     # TODO add RAID constraints class object for use in raid_minimums and raid_calculator
 
+    def __init__(self):
+        # Adapter snapshots of the transactions open in each thread
+        self._transactions = threading.local()
+
+    def _get_snapshots(self):
+        snapshots = getattr(self._transactions, 'snapshots', None)
+        if snapshots is None:
+            snapshots = self._transactions.snapshots = dict()
+        return snapshots
+
+    @contextlib.contextmanager
+    def adapter_transaction(self, adapter_index):
+        """
+        Within the block, get_adapter_info(adapter_index) reads the adapter once and returns that
+        snapshot to every caller in the same thread. Validation, drive selection and the write of
+        one logical operation therefore see the same adapter state. The snapshot is discarded when
+        the outermost block for the adapter exits, so the next operation reads the adapter again.
+
+        :param adapter_index: The index of the adapter
+        """
+        snapshots = self._get_snapshots()
+        if adapter_index in snapshots:
+            # Nested, the outer transaction owns the snapshot
+            yield
+            return
+
+        snapshots[adapter_index] = None
+        try:
+            yield
+        finally:
+            del snapshots[adapter_index]
+
     def transform_adapter_info(self, adapter_index):
         raise NotImplementedError
 
@@ -66,13 +104,22 @@ class RAIDActions(object):
         will need to change so that drivers and handlers are registered in PCI order and not import
         order. Talk to Jared R. about implementation details as he is soldiering on.
 
+        Inside adapter_transaction(adapter_index) the adapter is only read once.
+
         :param adapter_index: The index of the adapter to populate configuration information
         :return: A dictionary representing the adapter
 
         """
+        snapshots = self._get_snapshots()
+        if snapshots.get(adapter_index) is not None:
+            return snapshots[adapter_index]
+
         adapter_info = self.transform_adapter_info(adapter_index)
         self._add_indexes(adapter_info['configuration'])
         self._add_totals(adapter_info)
+
+        if adapter_index in snapshots:
+            snapshots[adapter_index] = adapter_info
         return adapter_info
 
     def create(self, adapter_info, level, drives=None, size=None, array=None):
@@ -92,27 +139,38 @@ class RAIDActions(object):
         """
         raise NotImplementedError
 
-    def create_logical_drive_on_existing_array(self, adapter, adapter_info, level, array, converted_size,
-                                               percent_string):
+    @staticmethod
+    def parse_size(size):
         """
+        :param size: See create_logical_drive
+        :return: (converted_size, percent_string), either or both may be None
+        """
+        if size:
+            if isinstance(size, str) and '%' in size:
+                return None, PercentString(size)
+            return Size(size), None
+        return None, None
+
+    @staticmethod
+    def check_existing_array(adapter, adapter_info, array, converted_size, percent_string):
+        """
+        Validates a logical drive request on an existing array
 
         :param adapter:
         :param adapter_info:
-        :param level:
-        :param array:
+        :param array: array index
         :param converted_size:
         :param percent_string:
-        :return:
+        :return: (array, converted_size)
         """
-
         # Check to see that the array exists
         try:
-            array = adapter_info['configuration']['arrays'][array]
-        except (KeyError, IndexError):
+            array_info = adapter_info['configuration']['arrays'][array]
+        except (KeyError, IndexError, TypeError):
             raise RAIDAbstractionException('The referenced array {}:{} does not exist'.format(adapter, array))
 
         # Check to see if the array has enough free space (or any free space, if size is None)
-        free_space = Size(array['free_space'])
+        free_space = Size(array_info['free_space'])
         if free_space < Size('1MiB'):
             raise RAIDAbstractionException('The array {}:{} has not free space'.format(adapter, array))
 
@@ -126,23 +184,18 @@ class RAIDActions(object):
             else:
                 raise RAIDAbstractionException('only %FREE is supported for RAID abstraction')
 
-        return self.create(adapter_info, level, drives=None, size=converted_size, array=array)
+        return array_info, converted_size
 
-    def create_logical_drive_on_new_array(self, adapter, adapter_info, level, drives, converted_size, percent_string):
+    def check_new_array(self, level, target_drives, converted_size, percent_string):
         """
+        Validates a new array request
 
-        :param adapter:
-        :param adapter_info:
         :param level:
-        :param drives:
+        :param target_drives: drives returned by get_drives_from_selection
         :param converted_size:
         :param percent_string:
-        :return:
+        :return: converted_size
         """
-        # Creating new array, so we need to check that there is enough space (if specified)
-        # and that the RAID level is valid
-        target_drives = self.get_drives_from_selection(adapter, drives)
-
         # this will raise an exception if it's invalid
         self.raid_minimums(level, len(target_drives))
 
@@ -159,6 +212,43 @@ class RAIDActions(object):
             else:
                 converted_size = Size(percent_string.value * available_size)
 
+        return converted_size
+
+    def create_logical_drive_on_existing_array(self, adapter, adapter_info, level, array, converted_size,
+                                               percent_string):
+        """
+
+        :param adapter:
+        :param adapter_info:
+        :param level:
+        :param array:
+        :param converted_size:
+        :param percent_string:
+        :return:
+        """
+
+        array, converted_size = self.check_existing_array(adapter, adapter_info, array, converted_size,
+                                                          percent_string)
+
+        return self.create(adapter_info, level, drives=None, size=converted_size, array=array)
+
+    def create_logical_drive_on_new_array(self, adapter, adapter_info, level, drives, converted_size, percent_string):
+        """
+
+        :param adapter:
+        :param adapter_info:
+        :param level:
+        :param drives:
+        :param converted_size:
+        :param percent_string:
+        :return:
+        """
+        # Creating new array, so we need to check that there is enough space (if specified)
+        # and that the RAID level is valid
+        target_drives = self.get_drives_from_selection(adapter, drives)
+
+        converted_size = self.check_new_array(level, target_drives, converted_size, percent_string)
+
         return self.create(adapter_info, level, drives=target_drives, size=converted_size, array=None)
 
     def create_logical_drive(self, adapter, level, drives=None, size=None, array=None):
@@ -195,16 +285,13 @@ class RAIDActions(object):
         if not (array is not None or drives is not None):
             raise RAIDAbstractionException('Either drive targets or an array must be specified')
 
-        adapter_info = self.get_adapter_info(adapter)
+        with self.adapter_transaction(adapter):
+            return self._create_logical_drive(adapter, level, drives, size, array)
 
-        percent_string = None
-        converted_size = None
+    def _create_logical_drive(self, adapter, level, drives, size, array):
+        adapter_info = self.get_adapter_info(adapter)
 
-        if size:
-            if isinstance(size, str) and '%' in size:
-                percent_string = PercentString(size)
-            else:
-                converted_size = Size(size)
+        converted_size, percent_string = self.parse_size(size)
 
         if drives is not None:
             return self.create_logical_drive_on_new_array(adapter,
@@ -230,6 +317,144 @@ class RAIDActions(object):
     def add_spares(self, adapter, drives, arrays=None):
         raise NotImplementedError
 
+    def _claim_drives(self, adapter, drive_selector, all_drives, available):
+        """
+        Resolves a drive selection against the drives left over by earlier layout steps
+
+        :param adapter: adapter index
+        :param drive_selector: See create_logical_drive
+        :param all_drives: get_all_drives_from_adapter output
+        :param available: dict of drive index: drive, claimed drives are removed
+        :return: the selected drives
+        """
+        if isinstance(drive_selector, str) and drive_selector.lower() == 'unassigned':
+            selection = sorted(available)
+        elif isinstance(drive_selector, str) and drive_selector.lower() == 'all':
+            selection = [drive['index'] for drive in all_drives]
+        else:
+            selection = self.parse_selection(adapter, drive_selector)
+
+        selected_drives = []
+        for drive in selection:
+            ud = available.pop(drive, None)
+            if not ud:
+                raise RAIDAbstractionException('Drive {} is not available'.format(drive))
+
+            if not ud['status'] == 'OK':
+                raise RAIDAbstractionException(
+                    'Attempting to initialize a failed drive : {} {}'.format(
+                        drive, ud['status']))
+            selected_drives.append(ud)
+        return selected_drives
+
+    def plan_layout(self, adapter, clear=False, logical_drives=None, spares=None):
+        """
+        Validates a complete adapter layout against one read of the adapter, without changing it.
+        Steps are applied in order: clear, logical drives, then spares. Drives claimed by one step
+        are not available to the steps after it, so `unassigned` means the drives left over.
+        Arrays created by the layout are numbered after the arrays that remain on the adapter.
+
+        :param adapter: adapter index
+        :param clear: Remove the existing configuration first
+        :param logical_drives: list of create_logical_drive arguments, for example::
+
+                {'level': '1', 'drives': '0-1'}
+                {'level': '5', 'array': 0, 'size': '50%FREE'}
+
+        :param spares: list of add_spares arguments, for example::
+
+                {'drives': '6, 7', 'arrays': [0]}
+
+        :return: list of (method name, keyword arguments) for apply_layout. Drive selections are
+            resolved to drive indexes.
+        """
+        steps = []
+
+        with self.adapter_transaction(adapter):
+            adapter_info = self.get_adapter_info(adapter)
+            all_drives = self.get_all_drives_from_adapter(adapter_info)
+
+            if clear:
+                steps.append(('clear_configuration', {}))
+                arrays = []
+                available = dict((d['index'], d) for d in all_drives if 'target' not in d)
+            else:
+                arrays = adapter_info['configuration']['arrays']
+                available = dict((d['index'], d) for d in all_drives
+                                 if 'member_of' not in d and 'target' not in d)
+
+            # Free space of the arrays as the layout is applied, arrays created by the layout
+            # are appended. Each logical drive takes its size from the array it is placed on.
+            planned_arrays = [{'free_space': Size(array['free_space']).bytes} for array in arrays]
+            planned_info = {'configuration': {'arrays': planned_arrays}}
+
+            for logical_drive in logical_drives or []:
+                level = str(logical_drive['level'])
+                drives = logical_drive.get('drives')
+                array = logical_drive.get('array')
+                size = logical_drive.get('size')
+
+                converted_size, percent_string = self.parse_size(size)
+
+                if drives is not None:
+                    target_drives = self._claim_drives(adapter, drives, all_drives, available)
+                    converted_size = self.check_new_array(level, target_drives, converted_size,
+                                                          percent_string)
+                    capacity = int(self.raid_calculator(
+                        level, len(target_drives), min(drive['size'] for drive in target_drives)))
+                    planned_arrays.append({'free_space': capacity - (
+                        int(converted_size.bytes) if converted_size else capacity)})
+                    steps.append(('create_logical_drive', {
+                        'level': level,
+                        'drives': [drive['index'] for drive in target_drives],
+                        'size': size
+                    }))
+                elif array is not None:
+                    if not 0 <= array < len(planned_arrays):
+                        raise RAIDAbstractionException(
+                            'The referenced array {}:{} does not exist'.format(adapter, array))
+                    _, converted_size = self.check_existing_array(
+                        adapter, planned_info, array, converted_size, percent_string)
+                    free_space = planned_arrays[array]['free_space']
+                    planned_arrays[array]['free_space'] = free_space - (
+                        int(converted_size.bytes) if converted_size else free_space)
+                    steps.append(('create_logical_drive', {
+                        'level': level,
+                        'array': array,
+                        'size': size
+                    }))
+                else:
+                    raise RAIDAbstractionException(
+                        'Either drive targets or an array must be specified')
+
+            for spare in spares or []:
+                arrays = spare.get('arrays')
+                for array in arrays or []:
+                    if not 0 <= array < len(planned_arrays):
+                        raise RAIDAbstractionException('Array {} does not exist'.format(array))
+                target_drives = self._claim_drives(adapter, spare['drives'], all_drives, available)
+                steps.append(('add_spares', {
+                    'drives': [drive['index'] for drive in target_drives],
+                    'arrays': arrays
+                }))
+
+        return steps
+
+    def apply_layout(self, adapter, steps):
+        """
+        Applies the steps returned by plan_layout. Every step reads the adapter once, since the
+        previous step changed it.
+
+        :param adapter: adapter index
+        :param steps: plan_layout output
+        :return: list of step results
+        """
+        results = []
+        for method, kwargs in steps:
+            log.info('Applying layout to adapter {}: {} {}'.format(adapter, method, kwargs))
+            results.append(getattr(self, method)(adapter, **kwargs))
+        return results
+
     def get_all_drives_from_adapter(self, adapter):
         """
         Get drives while preserving array membership
@@ -359,8 +584,9 @@ class RAIDActions(object):
         return selected_drives
 
     def get_drives_from_selection(self, adapter_index, drive_selector):
-        selection = self.parse_selection(adapter_index, drive_selector)
-        return self.fetch_selection(adapter_index, selection)
+        with self.adapter_transaction(adapter_index):
+            selection = self.parse_selection(adapter_index, drive_selector)
+            return self.fetch_selection(adapter_index, selection)
 
     # These methods can be overridden to support more raid levels
     # TODO: Clean these up...
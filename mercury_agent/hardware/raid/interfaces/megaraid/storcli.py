@@ -1,27 +1,94 @@
 import json
+import logging
+import threading
+import time
 
 from mercury.common.helpers import cli
 
+log = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_TTL = 30
+# Seconds a storcli command may run before it is killed
+DEFAULT_TIMEOUT = 120
+# coreutils timeout exits with this code when the command ran out of time
+TIMEOUT_RETURNCODE = 124
+
 
 class StorcliException(Exception):
     """ Raised exclusively by Storcli classes """
     pass
 
 
+class StorcliSnapshot(object):
+    """ One read of /call show all and /call/dall show all, shared by every adapter transform
+
+    The snapshot is reloaded once ttl seconds have passed or after invalidate() is called.
+    Storcli invalidates its snapshot after every write.
+    """
+
+    def __init__(self, storcli, ttl=DEFAULT_SNAPSHOT_TTL):
+        """
+        :param storcli: Storcli instance used to load the snapshot
+        :param ttl: Seconds a snapshot is served before it is reloaded, 0 disables caching
+        """
+        self.storcli = storcli
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._loaded_at = None
+
+    def _load(self):
+        with self._lock:
+            if self._data is None or time.time() - self._loaded_at >= self.ttl:
+                self._data = (self.storcli.controllers, self.storcli.get_disk_group('all'))
+                self._loaded_at = time.time()
+            return self._data
+
+    def invalidate(self):
+        with self._lock:
+            self._data = None
+
+    @property
+    def controllers(self):
+        """ Storcli.controllers as of the last load
+        :return type: list
+        """
+        return self._load()[0]
+
+    def get_disk_group(self, controller):
+        """ /c<controller>/dall show all response data as of the last load
+        :param controller: Controller index
+        :return: Response Data of the controller
+        :raises: IndexError when the controller does not exist
+        """
+        return self._load()[1][controller]
+
+
 class Storcli(object):
     """ Thin storcli/percli interface for querying PERC and MegaRAID adapters and creating simple arrays """
 
     span_arrays = [10, 50, 60]
     parity_arrays = [5, 6, 50, 60]
 
-    def __init__(self, binary_path='storcli'):
+    def __init__(self, binary_path='storcli', snapshot_ttl=DEFAULT_SNAPSHOT_TTL,
+                 timeout=DEFAULT_TIMEOUT):
         """ Constructor
 
         :param binary_path: Location (relative, in shell path, or absolute) of storcli binary
+        :param snapshot_ttl: Seconds the controller snapshot is served before it is reloaded
+        :param timeout: Seconds a command may run before it is killed, None or 0 waits forever.
+            A hung storcli would otherwise hold the snapshot lock and block every later
+            MegaRAID inspection, even after the RAID inspector gave up on it.
         """
         self.storecli_path = cli.find_in_path(binary_path)
         if not self.storecli_path:
             raise StorcliException('storcli binary is missing')
+        self.snapshot = StorcliSnapshot(self, ttl=snapshot_ttl)
+
+        self.timeout = timeout
+        self.timeout_path = timeout and cli.find_in_path('timeout')
+        if timeout and not self.timeout_path:
+            log.warning('timeout binary is missing, storcli commands are not time limited')
 
     def run(self, cmd, ignore_error=False):
         """ Run a storecli command
@@ -31,7 +98,14 @@ class Storcli(object):
         :return: AttributeString
         """
 
-        result = cli.run('{} {}'.format(self.storecli_path, cmd), ignore_error=ignore_error)
+        command = '{} {}'.format(self.storecli_path, cmd)
+        if self.timeout_path:
+            command = '{} -k 5 {} {}'.format(self.timeout_path, self.timeout, command)
+
+        result = cli.run(command, ignore_error=ignore_error)
+        if self.timeout_path and result.returncode == TIMEOUT_RETURNCODE:
+            raise StorcliException('Command timed out after {} seconds: {}'.format(
+                self.timeout, cmd))
         if not ignore_error:
             if result.returncode:
                 raise StorcliException('Command returned: {}, Error: {}'.format(
@@ -112,7 +186,10 @@ class Storcli(object):
         :param virtual_drive: Virtual Drive ID or 'all' (default all)
         :return:
         """
-        return self.run('/c{} /v{} del force'.format(controller, virtual_drive))
+        try:
+            return self.run('/c{} /v{} del force'.format(controller, virtual_drive))
+        finally:
+            self.snapshot.invalidate()
 
     def add(self, controller, array_type, drives, size=None, pdperarray=None, pdcache=None,
             dimmerswitch=None, io_mode='direct', write_policy='wb', read_policy='ra',
@@ -170,7 +247,10 @@ value is automatically chosen.(0 to 16)
                     raise StorcliException('Span depth (pdperarray) must be specified')
                 break
 
-        out = self.run(command)
+        try:
+            out = self.run(command)
+        finally:
+            self.snapshot.invalidate()
 
         lines = [l.strip() for l in out.splitlines() if l.strip()]
 
@@ -197,9 +277,12 @@ value is automatically chosen.(0 to 16)
         else:
             dgs = None
 
-        self.run('/c{}/e{}/s{} add hotsparedrive{}'.format(
-            controller,
-            enclosure,
-            slot,
-            dgs and ' DGs={}'.format(dgs) or ''
-        ))
+        try:
+            self.run('/c{}/e{}/s{} add hotsparedrive{}'.format(
+                controller,
+                enclosure,
+                slot,
+                dgs and ' DGs={}'.format(dgs) or ''
+            ))
+        finally:
+            self.snapshot.invalidate()
@@ -0,0 +1,114 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Structural diffs of device_info. Changes are expressed as paths, tuples of dictionary keys and
+list indexes, so they can be sent to the backend as dotted $set updates rather than as whole
+sections.
+"""
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# Never sent in updates, the backend refuses to change the mercury_id of a record
+IGNORED_KEYS = ('mercury_id',)
+
+
+def diff(old, new, path=()):
+    """
+    Compute a structural diff between two json compatible structures. Dictionaries are compared
+    key by key and lists of the same length index by index. Anything else, including lists which
+    changed length, is reported as a changed value.
+    :param old: The previous structure
+    :param new: The current structure
+    :param path: The path of old and new within the document
+    :return: list of (op, path, value) tuples. value is the new value, or None when removed
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in old:
+            if key not in new:
+                changes.append((REMOVED, path + (key,), None))
+        for key in new:
+            if key not in old:
+                changes.append((ADDED, path + (key,), new[key]))
+            else:
+                changes += diff(old[key], new[key], path + (key,))
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for idx in range(len(new)):
+            changes += diff(old[idx], new[idx], path + (idx,))
+        return changes
+
+    if old != new or type(old) != type(new):
+        return [(CHANGED, path, new)]
+
+    return []
+
+
+def _addressable(key):
+    """Mongo field names cannot contain dots or start with $"""
+    if isinstance(key, int):
+        return True
+    return not ('.' in key or key.startswith('$'))
+
+
+def _lookup(document, path):
+    for key in path:
+        document = document[key]
+    return document
+
+
+def format_path(path):
+    return '.'.join(str(key) for key in path)
+
+
+def to_update(changes, new):
+    """
+    Convert diff() output to a $set style update with dotted paths. Removed keys cannot be
+    expressed with $set, so the parent of a removed key is sent whole, as is any value whose path
+    contains keys that cannot be addressed with dot notation. A removed section is set to None.
+    :param changes: diff() output
+    :param new: The current document, used to look up parent values
+    :return: dict of dotted path: value
+    """
+    targets = set()
+    for op, path, _ in changes:
+        if path[0] in IGNORED_KEYS:
+            continue
+        if op == REMOVED and len(path) > 1:
+            path = path[:-1]
+        for idx, key in enumerate(path):
+            if not _addressable(key):
+                path = path[:idx]
+                break
+        if path:
+            targets.add(path)
+
+    update = {}
+    for path in targets:
+        # Skip paths covered by a parent which is sent whole
+        if any(path[:length] in targets for length in range(1, len(path))):
+            continue
+        try:
+            value = _lookup(new, path)
+        except (KeyError, IndexError):
+            value = None
+        update[format_path(path)] = value
+
+    return update
@@ -13,9 +13,27 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+"""
+Physical (biosdevname --policy physical) interface names
+
+Embedded NICs are named em<instance> from their SMBIOS type 41 record, NICs in a PCI slot are
+named p<slot>p<port> where the slot number comes from the SMBIOS type 9 records, or from
+/sys/bus/pci/slots, and ports are numbered in PCI address order within the slot. SR-IOV virtual
+functions take the name of their physical function followed by _<vf index>.
+"""
+
+import logging
+import os
+import re
 import shlex
 import subprocess
 
+from mercury_agent.inspector.hwlib import smbios
+
+log = logging.getLogger(__name__)
+
+PCI_ADDRESS = re.compile(r'^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$')
+
 
 def get_name(interface):
     command = 'biosdevname --policy physical -i %s' % interface
@@ -38,3 +56,204 @@ def get_name(interface):
             raise Exception('Problem running biosdevname: %d' % p.returncode)
 
     return out.strip()
+
+
+def parse_dump(output):
+    """
+    Parse `biosdevname -d` output, one blank line separated block per interface
+    :param output: command output
+    :return: dict of kernel name: BIOS device name or None
+    """
+    names = dict()
+    for block in output.split('\n\n'):
+        fields = dict()
+        for line in block.splitlines():
+            key, _, value = line.partition(':')
+            fields[key.strip()] = value.strip()
+        kernel_name = fields.get('Kernel name')
+        if kernel_name:
+            names[kernel_name] = fields.get('BIOS device') or None
+    return names
+
+
+def get_dump_names():
+    """
+    Names for every interface from a single biosdevname call
+    """
+    command = 'biosdevname --policy physical -d'
+    p = subprocess.Popen(shlex.split(command),
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE)
+    out, err = p.communicate()
+
+    if p.returncode:
+        if p.returncode == 3:
+            raise OSError('biosdevname must be run as the root user')
+        if p.returncode in (2, 4):
+            # Nothing supported, or running on a virtual machine
+            return dict()
+        raise Exception('Problem running biosdevname: %d' % p.returncode)
+
+    return parse_dump(out.decode('utf-8', 'replace'))
+
+
+class SlotNameResolver(object):
+    def __init__(self, smbios_table, sysfs_root='/sys'):
+        """
+        :param smbios_table: SMBIOSTable providing the type 9 and type 41 records
+        :param sysfs_root: sysfs mount point
+        """
+        self.sysfs_root = sysfs_root
+
+        # pci address: onboard instance
+        self.embedded = dict()
+        for device in smbios_table.records(smbios.ONBOARD_DEVICE):
+            if device['device_type'] == 'Ethernet' and device['pci_address']:
+                self.embedded[device['pci_address']] = device['instance']
+
+        # domain:bus:device: slot number
+        self.slots = dict()
+        for slot in smbios_table.records(smbios.SYSTEM_SLOT):
+            if slot['pci_address']:
+                self.slots[slot['pci_address'][:-2]] = slot['slot_id']
+        self._add_sysfs_slots()
+
+    @classmethod
+    def load(cls, sysfs_root='/sys', dmi_path=None):
+        """
+        :param dmi_path: Read the SMBIOS table from this path instead of using the shared table
+        :raises: IOError/OSError when the SMBIOS table cannot be read
+        """
+        if dmi_path:
+            table = smbios.SMBIOSTable.load(dmi_path)
+        else:
+            table = smbios.get_table()
+            if table is None:
+                raise OSError('SMBIOS table is not available')
+        return cls(table, sysfs_root=sysfs_root)
+
+    def _add_sysfs_slots(self):
+        slots_path = os.path.join(self.sysfs_root, 'bus/pci/slots')
+        if not os.path.isdir(slots_path):
+            return
+        for name in os.listdir(slots_path):
+            if not name.isdigit():
+                continue
+            try:
+                with open(os.path.join(slots_path, name, 'address')) as fp:
+                    address = fp.read().strip()
+            except (IOError, OSError):
+                continue
+            self.slots.setdefault(address, int(name))
+
+    def _net_devices(self):
+        """
+        :return: list of (interface, pci address, device path, dev_port) for PCI network devices
+        """
+        net_path = os.path.join(self.sysfs_root, 'class/net')
+        devices = []
+        for interface in os.listdir(net_path):
+            device_path = os.path.realpath(os.path.join(net_path, interface, 'device'))
+            address = os.path.basename(device_path)
+            if not PCI_ADDRESS.match(address):
+                # bonds, bridges, vlans and other virtual interfaces
+                continue
+            try:
+                with open(os.path.join(net_path, interface, 'dev_port')) as fp:
+                    dev_port = int(fp.read().strip() or 0)
+            except (IOError, OSError, ValueError):
+                dev_port = 0
+            devices.append((interface, address, device_path, dev_port))
+        return devices
+
+    def _slot(self, device_path):
+        """
+        The slot of a function, or of the nearest bridge above it which is in a slot
+        """
+        for component in reversed(device_path.split(os.sep)):
+            if PCI_ADDRESS.match(component) and component[:-2] in self.slots:
+                return self.slots[component[:-2]]
+        return None
+
+    @staticmethod
+    def _physical_function(device_path):
+        """
+        :return: (physical function path, vf index) or (None, None) if this is not a VF
+        """
+        physfn = os.path.join(device_path, 'physfn')
+        if not os.path.islink(physfn):
+            return None, None
+        pf_path = os.path.realpath(physfn)
+        for name in os.listdir(pf_path):
+            if name.startswith('virtfn') and \
+                    os.path.realpath(os.path.join(pf_path, name)) == device_path:
+                return pf_path, int(name[6:])
+        return pf_path, None
+
+    def get_names(self, interfaces=None):
+        """
+        :param interfaces: Only name these interfaces, default all
+        :return: dict of interface: name or None when the interface cannot be located
+        """
+        devices = self._net_devices()
+
+        # Number the ports of the physical functions in each slot, in PCI address order
+        ports = dict()
+        port_counts = dict()
+        virtual_functions = dict()
+        for interface, address, device_path, dev_port in sorted(devices, key=lambda d: (d[1], d[3])):
+            pf_path, vf_index = self._physical_function(device_path)
+            if pf_path:
+                virtual_functions[interface] = (os.path.basename(pf_path), vf_index)
+                continue
+            if address in self.embedded:
+                continue
+            slot = self._slot(device_path)
+            if slot is None:
+                continue
+            port_counts[slot] = port_counts.get(slot, 0) + 1
+            ports[(address, dev_port)] = 'p%dp%d' % (slot, port_counts[slot])
+
+        names = dict()
+        for interface, address, device_path, dev_port in devices:
+            if interfaces is not None and interface not in interfaces:
+                continue
+            suffix = ''
+            if interface in virtual_functions:
+                address, vf_index = virtual_functions[interface]
+                if vf_index is None:
+                    names[interface] = None
+                    continue
+                dev_port = 0
+                suffix = '_%d' % vf_index
+
+            if address in self.embedded:
+                names[interface] = 'em%d%s' % (self.embedded[address], suffix)
+            elif (address, dev_port) in ports:
+                names[interface] = ports[(address, dev_port)] + suffix
+            else:
+                names[interface] = None
+
+        if interfaces is not None:
+            for interface in interfaces:
+                names.setdefault(interface, None)
+        return names
+
+
+def get_names(interfaces=None):
+    """
+    Names for many interfaces at once. biosdevname is run once for all interfaces, when it is not
+    installed or cannot be run, SMBIOS and sysfs are read directly by SlotNameResolver
+    :param interfaces: Only name these interfaces, default all
+    :return: dict of interface: name or None
+    :raises: IOError/OSError when neither biosdevname nor the SMBIOS table are available
+    """
+    try:
+        names = get_dump_names()
+    except (IOError, OSError) as e:
+        log.debug('biosdevname is not available, reading SMBIOS [%s]' % e)
+        return SlotNameResolver.load().get_names(interfaces)
+
+    if interfaces is not None:
+        names = dict((interface, names.get(interface)) for interface in interfaces)
+    return names
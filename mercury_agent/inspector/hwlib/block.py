@@ -0,0 +1,183 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Block disks enumerated from /sys/block and the udev database in /run/udev/data
+
+This produces the same properties pyudev reports for a disk, without building a pyudev Device
+per disk. Multipath maps carry the devnames of their paths, and the paths themselves are left
+out of the listing.
+"""
+
+import fnmatch
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+UDEV_DATA_PATH = '/run/udev/data'
+
+MULTIPATH_UUID_PREFIX = 'mpath-'
+
+
+def parse_udev_data(data):
+    """
+    Parse a udev database entry
+    :param data: file contents
+    :return: dict of properties, symlinks are reported as DEVLINKS and tags as TAGS
+    """
+    properties = dict()
+    links = []
+    tags = []
+    for line in data.splitlines():
+        record, _, value = line.partition(':')
+        if record == 'E':
+            key, _, value = value.partition('=')
+            properties[key] = value
+        elif record == 'S':
+            links.append('/dev/' + value)
+        elif record == 'G':
+            tags.append(value)
+    if links:
+        properties['DEVLINKS'] = ' '.join(links)
+    if tags:
+        properties['TAGS'] = ':%s:' % ':'.join(tags)
+    return properties
+
+
+def parse_uevent(data):
+    properties = dict()
+    for line in data.splitlines():
+        key, _, value = line.partition('=')
+        if key:
+            properties[key] = value
+    return properties
+
+
+def _read(path):
+    with open(path) as fp:
+        return fp.read()
+
+
+class BlockDevices(object):
+    def __init__(self, sysfs_root='/sys', udev_data_path=UDEV_DATA_PATH):
+        """
+        :param sysfs_root: sysfs mount point
+        :param udev_data_path: udev database directory
+        :raises: OSError when the udev database is missing, in which case pyudev should be used
+        """
+        if not os.path.isdir(udev_data_path):
+            raise OSError('udev database is not available at %s' % udev_data_path)
+        self.sysfs_root = sysfs_root
+        self.block_path = os.path.join(sysfs_root, 'block')
+        self.udev_data_path = udev_data_path
+
+    def get_properties(self, name):
+        """
+        :param name: kernel name, sda, dm-0 ...
+        :return: dict of udev properties or None if the device has gone away
+        """
+        device_path = os.path.join(self.block_path, name)
+        try:
+            properties = parse_uevent(_read(os.path.join(device_path, 'uevent')))
+        except (IOError, OSError):
+            return None
+
+        properties['SUBSYSTEM'] = 'block'
+        properties['DEVPATH'] = os.path.realpath(device_path)[len(self.sysfs_root):]
+        if 'DEVNAME' in properties:
+            properties['DEVNAME'] = '/dev/' + properties['DEVNAME']
+
+        database_entry = os.path.join(self.udev_data_path, 'b%s:%s' % (properties.get('MAJOR'),
+                                                                       properties.get('MINOR')))
+        try:
+            properties.update(parse_udev_data(_read(database_entry)))
+        except (IOError, OSError):
+            log.debug('No udev database entry for %s' % name)
+        return properties
+
+    def get_slaves(self, name):
+        try:
+            return sorted(os.listdir(os.path.join(self.block_path, name, 'slaves')))
+        except (IOError, OSError):
+            return []
+
+    def get_device(self, name, is_valid=None):
+        """
+        :param name: kernel name, sda, dm-0 ...
+        :param is_valid: Optional filter called with the properties of a disk which is not a
+            device mapper device
+        :return: dict of udev properties, multipath maps have a `paths` list of the devnames of
+            their paths. None if the device is gone, is filtered out or is a device mapper
+            device other than a multipath map.
+        """
+        properties = self.get_properties(name)
+        if not properties or 'DEVNAME' not in properties:
+            return None
+
+        if name.startswith('dm-'):
+            if not properties.get('DM_UUID', '').startswith(MULTIPATH_UUID_PREFIX):
+                return None
+            properties['paths'] = ['/dev/' + slave for slave in self.get_slaves(name)]
+        elif is_valid and not is_valid(properties):
+            return None
+
+        return properties
+
+    def discover(self, is_valid=None):
+        """
+        :param is_valid: Optional filter called with the properties of each disk which is not a
+            device mapper device
+        :return: dict of devname: properties, see get_device. The paths of multipath maps are
+            not reported on their own.
+        """
+        devices = dict()
+        multipath_paths = set()
+
+        for name in sorted(os.listdir(self.block_path)):
+            properties = self.get_device(name, is_valid)
+            if properties is None:
+                continue
+            multipath_paths.update(properties.get('paths', ()))
+            devices[properties['DEVNAME']] = properties
+
+        return dict((devname, properties) for devname, properties in devices.items()
+                    if devname not in multipath_paths)
+
+
+class PropertyFilter(object):
+    def __init__(self, allowed=None):
+        """
+        :param allowed: list of property names or fnmatch patterns, None or '*' keeps every
+            property
+        """
+        allowed = allowed or ['*']
+        self.keep_all = '*' in allowed
+        self.names = set(p for p in allowed if not any(c in p for c in '*?['))
+        self.patterns = [p for p in allowed if p not in self.names]
+        self._decisions = dict()
+
+    def allows(self, key):
+        # The same few dozen keys repeat across every disk
+        allowed = self._decisions.get(key)
+        if allowed is None:
+            allowed = self._decisions[key] = key in self.names or \
+                any(fnmatch.fnmatchcase(key, p) for p in self.patterns)
+        return allowed
+
+    def __call__(self, properties):
+        if self.keep_all:
+            return dict(properties)
+        return dict((k, v) for k, v in properties.items() if k == 'paths' or self.allows(k))
@@ -13,8 +13,18 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import logging
 import os
 
+from mercury_agent.inspector.hwlib.sysfs import read_attribute
+
+log = logging.getLogger(__name__)
+
+# Fields which differ between the logical processors of a socket
+PER_CPU_FIELDS = ('processor', 'physical_id', 'core_id', 'apicid', 'initial_apicid', 'cpu_mhz')
+
+INTEGER_FIELDS = ('processor', 'physical_id', 'core_id', 'cpu_cores')
+
 
 def build_index(l, key):
     our_dict = dict()
@@ -46,44 +56,75 @@ def get_cpufreq_info(cpu):
     return freq
 
 
+def parse_cpuinfo_block(block, seen=None, fields=None):
+    """
+    Parse one processor entry of /proc/cpuinfo
+    :param block: The text of the entry
+    :param seen: dict used to share identical keys and values, such as the flags string, between
+        entries
+    :param fields: Only parse these keys, every key is parsed when None
+    :return: core dictionary
+    """
+    seen = {} if seen is None else seen
+    core_dict = dict()
+    for attribute in block.splitlines():
+        if not attribute:
+            continue
+        k, _, v = attribute.partition(':')
+        fixed_key = seen.get(k)
+        if fixed_key is None:
+            fixed_key = seen[k] = k.strip().replace(' ', '_').lower()
+        if fields is not None and fixed_key not in fields:
+            continue
+        stripped_value = v.strip()
+
+        if fixed_key in INTEGER_FIELDS:
+            stripped_value = int(stripped_value)
+        else:
+            stripped_value = seen.setdefault(stripped_value, stripped_value)
+
+        core_dict[fixed_key] = stripped_value
+    return core_dict
+
+
 class CPUInfo(object):
-    def __init__(self):
-        if not os.path.exists('/proc/cpuinfo'):
-            raise OSError('/proc/cpuinfo is missing. Bro, do you even linux?')
+    def __init__(self, cpuinfo_path='/proc/cpuinfo'):
+        if not os.path.exists(cpuinfo_path):
+            raise OSError('%s is missing. Bro, do you even linux?' % cpuinfo_path)
 
-        with open('/proc/cpuinfo') as fp:
+        with open(cpuinfo_path) as fp:
             self.raw_cpuinfo = fp.read()
 
         cores = self.raw_cpuinfo.split('\n\n')
 
+        # Identical strings, the 1-2KB flags string in particular, are stored once
+        seen = dict()
         self.core_dicts = list()
         for core in cores:
             if not core:
                 continue
-            core_dict = dict()
-            for attribute in core.splitlines():
-                if not attribute:
-                    continue
-                k, v = attribute.split(':')
-                fixed_key = k.strip().replace(' ', '_').lower()
-                stripped_value = v.strip()
-
-                if fixed_key in ['processor', 'physical_id', 'core_id', 'cpu_cores']:
-                    stripped_value = int(stripped_value)
-
-                core_dict[fixed_key] = stripped_value
-
-            self.core_dicts.append(core_dict)
+            self.core_dicts.append(parse_cpuinfo_block(core, seen))
 
         self.core_dicts.sort(key=lambda d: d['processor'])
+        self.cpufreq = None
+        self._indexes = dict()
+
+    def _index(self, key):
+        """
+        Indexes are built on first use and kept. core_dicts is not expected to change after
+        construction
+        """
+        if key not in self._indexes:
+            self._indexes[key] = build_index(self.core_dicts, key)
+        return self._indexes[key]
 
     @property
     def physical_index(self):
-        return build_index(self.core_dicts, 'physical_id')
+        return self._index('physical_id')
 
     @property
     def logical_processor_index(self):
-        return build_index(self.core_dicts, 'processor')
+        return self._index('processor')
 
     @property
     def processor_ids(self):
@@ -112,17 +153,23 @@ class CPUInfo(object):
 
     @property
     def core_zero_index(self):
-        physical_index = self.physical_index
-        for physical_id in physical_index:
-            physical_index[physical_id] = physical_index[physical_id][0]
-        return physical_index
+        if 'core_zero' not in self._indexes:
+            self._indexes['core_zero'] = dict(
+                (physical_id, cores[0]) for physical_id, cores in self.physical_index.items())
+        return self._indexes['core_zero']
 
     @staticmethod
-    def get_speed_info(core_dict):
+    def get_speed_info(core_dict, cpufreq=None):
+        """
+        :param core_dict: A core_dicts element
+        :param cpufreq: Frequencies already read for the core. When None, cpufreq is read from
+            sysfs
+        """
         speed_info = dict()
         processor_id = int(core_dict['processor'])
         speed_info['model_name'] = core_dict['model_name']
-        cpufreq = get_cpufreq_info(processor_id)
+        if cpufreq is None:
+            cpufreq = get_cpufreq_info(processor_id)
         cpufreq_enabled = bool(cpufreq) or False
 
         speed_info['bogomips'] = float(core_dict['bogomips'])
@@ -141,14 +188,91 @@ class CPUInfo(object):
 
         return speed_info
 
+    def get_core_speed_info(self, core_dict):
+        cpufreq = None
+        if self.cpufreq is not None:
+            cpufreq = self.cpufreq.get(core_dict['processor'], {})
+        return self.get_speed_info(core_dict, cpufreq)
+
     def get_physical_speed_info(self):
         speed_info = list()
         zero_index = self.core_zero_index
         for physical_processor in zero_index:
             core_dict = zero_index[physical_processor]
-            speed_info.append(self.get_speed_info(core_dict))
+            speed_info.append(self.get_core_speed_info(core_dict))
         return speed_info
 
     @property
     def one_core(self):
         return self.core_dicts and self.core_dicts[0] or dict()
+
+
+class SysFSCPUInfo(CPUInfo):
+    """
+    Topology and cpufreq for every logical processor come from /sys/devices/system/cpu in one
+    pass. Only the /proc/cpuinfo entry of the first processor of each socket is fully parsed, the
+    other processors share that entry's per socket fields (model_name, flags, cache_size ...) and
+    read only their per processor fields (apicid, cpu_mhz ...) from their own entry. Processors
+    without an entry cannot lead a socket and are skipped until one with an entry is found.
+    """
+    # noinspection PyMissingConstructor
+    def __init__(self, sysfs_root='/sys', cpuinfo_path='/proc/cpuinfo'):
+        cpu_root = os.path.join(sysfs_root, 'devices/system/cpu')
+        topology = []
+        self.cpufreq = dict()
+        for name in os.listdir(cpu_root):
+            if not name.startswith('cpu') or not name[3:].isdigit():
+                continue
+            processor = int(name[3:])
+            path = os.path.join(cpu_root, name)
+            try:
+                physical_id = int(read_attribute(os.path.join(path, 'topology/physical_package_id')))
+                core_id = int(read_attribute(os.path.join(path, 'topology/core_id')))
+            except (IOError, OSError, ValueError):
+                # Offline processors have no topology
+                continue
+            topology.append((processor, physical_id, core_id))
+            self.cpufreq[processor] = self._read_cpufreq(os.path.join(path, 'cpufreq'))
+        topology.sort()
+
+        with open(cpuinfo_path) as fp:
+            self.raw_cpuinfo = fp.read()
+
+        blocks = dict()
+        for block in self.raw_cpuinfo.split('\n\n'):
+            first_line = block.lstrip('\n').partition('\n')[0]
+            if first_line.startswith('processor'):
+                blocks[int(first_line.partition(':')[2])] = block
+
+        seen = dict()
+        leaders = dict()
+        self.core_dicts = list()
+        for processor, physical_id, core_id in topology:
+            leader = leaders.get(physical_id)
+            if leader is None:
+                if processor not in blocks:
+                    log.warning('Processor {} is missing from {}'.format(processor, cpuinfo_path))
+                    continue
+                core_dict = parse_cpuinfo_block(blocks[processor], seen)
+                leaders[physical_id] = core_dict
+            else:
+                core_dict = dict((k, v) for k, v in leader.items() if k not in PER_CPU_FIELDS)
+                core_dict.update(parse_cpuinfo_block(blocks.get(processor, ''), seen,
+                                                     PER_CPU_FIELDS))
+            core_dict['processor'] = processor
+            core_dict['physical_id'] = physical_id
+            core_dict['core_id'] = core_id
+            self.core_dicts.append(core_dict)
+
+        self._indexes = dict()
+
+    @staticmethod
+    def _read_cpufreq(path):
+        try:
+            return {
+                'min': int(read_attribute(os.path.join(path, 'scaling_min_freq'))),
+                'max': int(read_attribute(os.path.join(path, 'scaling_max_freq'))),
+                'cur': int(read_attribute(os.path.join(path, 'scaling_cur_freq')))
+            }
+        except (IOError, OSError, ValueError):
+            return dict()
@@ -17,47 +17,85 @@
 Bare minimum to get system routing information
 """
 
+import subprocess
+
 from mercury.common.helpers import cli
 
+SINGLETONS = frozenset(['dead', 'onlink', 'pervasive', 'offload', 'notify', 'linkdown'])
+
+
+def parse_route_line(line):
+    """
+    Parse a single line of `ip route show` output
+    :param line: The route line
+    :return: route dictionary
+    """
+    fields = line.split()
+    route = {'destination': fields[0]}
+    key = None
+    for field in fields[1:]:
+        if key is not None:
+            route[key] = field
+            key = None
+        elif field in SINGLETONS:
+            route[field] = True
+        else:
+            key = field
+
+    if key is not None:
+        raise Exception('The route has an unpaired attribute, cannot unzip: %s' % line)
+
+    return route
+
+
+def iter_table(lines):
+    """
+    Parse `ip route show` output one line at a time
+    :param lines: Any iterable of lines, such as a file object
+    :return: A generator of route dictionaries
+    """
+    for line in lines:
+        if line and not line.isspace():
+            yield parse_route_line(line)
+
 
 class IPRoute2(object):
-    def __init__(self, path='ip'):
+    def __init__(self, path='ip', load=True):
+        """
+        :param path: Name or path of the ip binary
+        :param load: Run `ip route show` and populate the table. When False, use iter_routes to
+            stream the table instead
+        """
         self.ip_path = cli.find_in_path(path)
-        self.raw_table = self.get_table()
         self.table = []
-        self.parse_table()
+        if load:
+            self.raw_table = self.get_table()
+            self.parse_table()
 
     def ip(self, args):
         command = '%s %s' % (self.ip_path, args)
         return cli.run(command)
 
-    @staticmethod
-    def _dzip(l):
-        _d = {}
-        length = len(l)
-        if length % 2:
-            raise Exception('The list length is ODD, cannot unzip')
-        for idx in range(0, len(l), 2):
-            _d[l[idx]] = l[idx+1]
-        return _d
-
     def parse_table(self):
-        singletons = ['dead', 'onlink', 'pervasive', 'offload', 'notify', 'linkdown']
-        for line in self.raw_table.splitlines():
-            if line:
-                line = line.split()
-                route = {'destination': line[0]}
-                for singleton in singletons:
-                    if singleton in line:
-                        route[singleton] = True
-                        line.remove(singleton)
-
-                route.update(self._dzip(line[1:]))
-                self.table.append(route)
+        self.table.extend(iter_table(self.raw_table.splitlines()))
 
     def get_table(self):
         return self.ip('route show')
 
+    def iter_routes(self):
+        """
+        Stream `ip route show` without holding the output or the parsed table in memory
+        :return: A generator of route dictionaries
+        """
+        process = subprocess.Popen([self.ip_path, 'route', 'show'], stdout=subprocess.PIPE,
+                                   universal_newlines=True)
+        try:
+            for route in iter_table(process.stdout):
+                yield route
+        finally:
+            process.stdout.close()
+            process.wait()
+
 
 if __name__ == '__main__':
     ip_route = IPRoute2()
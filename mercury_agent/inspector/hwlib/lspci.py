@@ -13,10 +13,22 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 """Provides functionality for parsing output from `lspci`."""
+import logging
+import os
 import shlex
 import six
 import subprocess
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from mercury_agent.inspector.hwlib.pciids import get_pci_ids
+from mercury_agent.inspector.hwlib.sysfs import read_attribute
+
+log = logging.getLogger(__name__)
+
 # Class codes used by lspci.
 ETHERNET_CONTROLLER = '0200'
 NETWORK_CONTROLLER = '0280'
@@ -75,9 +87,10 @@ def _get_lspci_name(line):
     return '['.join(hush[0:-1]).strip()
 
 
-def parse_nnvmmk():
+def parse_nnvmmk(slot=None):
     """
     Runs lspci -nnvmmk and parses the output into a list of dictionaries.
+    :param slot: Only report the device in this slot, [[domain:]bus:]device.function
     :return: a list of dicts with the following keys
     slot
     vendor_name
@@ -93,7 +106,7 @@ def parse_nnvmmk():
     driver
     :except:
     """
-    out = lspci_run('-nnvmmk')
+    out = lspci_run(slot and '-nnvmmk -s {}'.format(slot) or '-nnvmmk')
     pcibus = list()
 
     blocks = out.split('\n\n')
@@ -122,8 +135,115 @@ def parse_nnvmmk():
     return pcibus
 
 
-class PCIDevice(dict):
-    """Represents information about a PCI Device as returned by `lspci`."""
+def _read_id(path):
+    return int(read_attribute(path), 16)
+
+
+def _full_slot(slot):
+    if slot.count(':') == 1:
+        return '0000:' + slot
+    return slot
+
+
+def parse_sysfs(slot=None, sysfs_root='/sys', pci_ids=None):
+    """
+    Enumerate PCI functions from /sys/bus/pci/devices, without running lspci. Names are resolved
+    through the pci.ids index and the result has the same keys as parse_nnvmmk.
+    :param slot: Only report the device in this slot, [domain:]bus:device.function
+    :param sysfs_root: sysfs mount point
+    :param pci_ids: pciids.PCIIDs, defaults to the shared index
+    :return: a list of dicts, see parse_nnvmmk
+    :except: OSError when sysfs is unavailable
+    """
+    devices_path = os.path.join(sysfs_root, 'bus/pci/devices')
+    addresses = sorted(os.listdir(devices_path))
+    pci_ids = pci_ids or get_pci_ids()
+
+    # Like lspci, only show the domain when there is more than one
+    show_domain = any(not address.startswith('0000:') for address in addresses)
+    if slot:
+        addresses = [address for address in addresses if address == _full_slot(slot)]
+
+    def name(lookup, default, *ids):
+        if pci_ids is None:
+            return default
+        return getattr(pci_ids, lookup)(*ids) or default
+
+    pcibus = list()
+    for address in addresses:
+        path = os.path.join(devices_path, address)
+        class_code = _read_id(os.path.join(path, 'class'))
+        base_class, sub_class, progif = class_code >> 16, (class_code >> 8) & 0xff, class_code & 0xff
+        vendor_id = _read_id(os.path.join(path, 'vendor'))
+        device_id = _read_id(os.path.join(path, 'device'))
+
+        device = {
+            'slot': show_domain and address or address[5:],
+            'class_id': '%02x%02x' % (base_class, sub_class),
+            'class_name': name('device_class', 'Class', base_class, sub_class),
+            'vendor_id': '%04x' % vendor_id,
+            'vendor_name': name('vendor', 'Vendor', vendor_id),
+            'device_id': '%04x' % device_id,
+            'device_name': name('device', 'Device', vendor_id, device_id)
+        }
+
+        try:
+            svendor_id = _read_id(os.path.join(path, 'subsystem_vendor'))
+            sdevice_id = _read_id(os.path.join(path, 'subsystem_device'))
+        except (IOError, OSError, ValueError):
+            svendor_id = sdevice_id = 0
+        if svendor_id not in (0, 0xffff):
+            device['svendor_id'] = '%04x' % svendor_id
+            device['svendor_name'] = name('vendor', 'Vendor', svendor_id)
+            device['sdevice_id'] = '%04x' % sdevice_id
+            device['sdevice_name'] = name('subsystem', 'Device', vendor_id, device_id,
+                                          svendor_id, sdevice_id)
+
+        try:
+            revision = _read_id(os.path.join(path, 'revision'))
+        except (IOError, OSError, ValueError):
+            revision = 0
+        if revision:
+            device['revision'] = '%02x' % revision
+        if progif:
+            device['progif'] = '%02x' % progif
+
+        driver = os.path.join(path, 'driver')
+        if os.path.islink(driver):
+            device['driver'] = os.path.basename(os.readlink(driver))
+
+        pcibus.append(device)
+
+    return pcibus
+
+
+def get_pci_devices(slot=None):
+    """
+    Enumerate PCI devices from sysfs, falling back to lspci when sysfs cannot be read
+    :param slot: Only report the device in this slot
+    :return: a list of dicts, see parse_nnvmmk
+    """
+    try:
+        return parse_sysfs(slot=slot)
+    except (IOError, OSError, ValueError) as e:
+        log.warning('Could not enumerate PCI devices from sysfs, running lspci [%s]' % e)
+        return parse_nnvmmk(slot=slot)
+
+
+PCI_DEVICE_FIELDS = ('slot', 'class_id', 'vendor_id', 'device_id', 'class_name', 'vendor_name',
+                     'device_name', 'svendor_name', 'svendor_id', 'sdevice_name', 'sdevice_id',
+                     'revision', 'progif', 'driver')
+
+
+class PCIDevice(MutableMapping):
+    """Represents information about a PCI Device as returned by `lspci`.
+
+    Fields are stored in slots rather than a per device dict, which matters on hosts with hundreds
+    of PCI functions. The device still behaves like the dict it used to be: item access, get,
+    keys/items, equality with dicts and attribute access to any key, unknown keys reading as None.
+    """
+    __slots__ = PCI_DEVICE_FIELDS + ('_extra',)
+
     def __init__(self,
                  slot=None,
                  class_id=None,
@@ -143,7 +263,7 @@ class PCIDevice(dict):
         if None in [slot, class_id, vendor_id, device_id]:
             raise LSPCIError(
                 'slot, class_id, vendor_id, and device_id are required.')
-        super(PCIDevice, self).__init__()
+        self._extra = None
         self.slot = slot
         self.class_id = class_id
         self.vendor_id = vendor_id
@@ -160,40 +280,141 @@ class PCIDevice(dict):
         self.driver = driver
 
     def __getattr__(self, key):
-        try:
-            return self[key]
-        except (KeyError, AttributeError):
-            return None
+        # Only reached for keys which are not slots
+        if key == '_extra':
+            raise AttributeError(key)
+        return (self._extra or {}).get(key)
 
     def __setattr__(self, key, value):
-        self[key] = value
+        if key in PCIDevice.__slots__:
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in PCI_DEVICE_FIELDS:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in PCI_DEVICE_FIELDS:
+            object.__setattr__(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in PCI_DEVICE_FIELDS:
+            object.__setattr__(self, key, None)
+            return
+        if not self._extra or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        for key in PCI_DEVICE_FIELDS:
+            yield key
+        for key in self._extra or ():
+            yield key
+
+    def __len__(self):
+        return len(PCI_DEVICE_FIELDS) + len(self._extra or ())
+
+    def __repr__(self):
+        return 'PCIDevice(%r)' % self.to_dict()
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def _invalidates(method):
+    """Wrap a list method which changes the bus so that the indexes are rebuilt"""
+    def wrapped(self, *args, **kwargs):
+        self._indexes = None
+        return method(self, *args, **kwargs)
+    wrapped.__name__ = method.__name__
+    wrapped.__doc__ = method.__doc__
+    return wrapped
 
 
 class PCIBus(list):
-    def __init__(self, sudo=False):
+    """
+    The PCI devices of the host, with hash indexes by class, vendor, (vendor, device), device and
+    slot. The indexes are built at construction and rebuilt on the next query after the bus is
+    changed through a list method. Changing the fields of a device in place is not tracked.
+    """
+    def __init__(self, sudo=False, devices=None):
+        """
+        :param sudo: Unused
+        :param devices: Device dictionaries, such as device_info['pci']. When None, the PCI bus is
+            enumerated
+        """
         super(PCIBus, self).__init__()
-        for it in parse_nnvmmk():
-            self.append(PCIDevice(**it))
+        self._indexes = None
+        list.extend(self, (PCIDevice(**it) for it in (get_pci_devices() if devices is None
+                                                       else devices)))
+        self._build_indexes()
+
+    append = _invalidates(list.append)
+    extend = _invalidates(list.extend)
+    insert = _invalidates(list.insert)
+    remove = _invalidates(list.remove)
+    pop = _invalidates(list.pop)
+    clear = _invalidates(list.clear)
+    sort = _invalidates(list.sort)
+    reverse = _invalidates(list.reverse)
+    __setitem__ = _invalidates(list.__setitem__)
+    __delitem__ = _invalidates(list.__delitem__)
+    __iadd__ = _invalidates(list.__iadd__)
+    __imul__ = _invalidates(list.__imul__)
+
+    def _build_indexes(self):
+        indexes = {
+            'class_id': {},
+            'vendor_id': {},
+            'device_id': {},
+            'id': {},
+            'slot': {}
+        }
+        for device in self:
+            vendor_id = device.get('vendor_id')
+            device_id = device.get('device_id')
+            indexes['class_id'].setdefault(device.get('class_id'), []).append(device)
+            indexes['vendor_id'].setdefault(vendor_id, []).append(device)
+            indexes['device_id'].setdefault(device_id, []).append(device)
+            indexes['id'].setdefault((vendor_id, device_id), []).append(device)
+            if device.get('slot'):
+                indexes['slot'][_full_slot(device['slot'])] = device
+        self._indexes = indexes
+        return indexes
+
+    def _index(self, name):
+        return (self._indexes or self._build_indexes())[name]
 
     def get_devices_by_class(self, class_id):
-        sub_li = list()
-        for device in self:
-            if device.get('class_id') == class_id:
-                sub_li.append(device)
-        return sub_li
+        return list(self._index('class_id').get(class_id, ()))
 
     def has_device_class(self, class_id):
-        for device in self:
-            if device.get('class_id') == class_id:
-                return True
-        return False
+        return class_id in self._index('class_id')
 
     def get_devices_by_vendor(self, vendor_id):
-        sub_li = list()
-        for device in self:
-            if device.get('vendor_id') == vendor_id:
-                sub_li.append(device)
-        return sub_li
+        return list(self._index('vendor_id').get(vendor_id, ()))
+
+    def get_devices_by_device_id(self, device_id):
+        return list(self._index('device_id').get(device_id, ()))
+
+    def get_devices_by_id(self, vendor_id, device_id):
+        return list(self._index('id').get((vendor_id, device_id), ()))
+
+    def get_device_by_slot(self, slot):
+        """
+        :param slot: [domain:]bus:device.function
+        :return: PCIDevice or None
+        """
+        return self._index('slot').get(_full_slot(slot))
 
     def get_fibre_channel_devices(self):
         return self.get_devices_by_class(FIBRE_CHANNEL)
@@ -218,3 +439,14 @@ class PCIBus(list):
 
     def has_raid_bus_controller(self):
         return self.has_device_class(RAID_CONTROLLER)
+
+
+def as_pci_bus(pci_data):
+    """
+    :param pci_data: PCIBus or a list of device dictionaries, such as device_info['pci']. Driver
+        probes are passed the PCIBus built once per inspection
+    :return: PCIBus
+    """
+    if isinstance(pci_data, PCIBus):
+        return pci_data
+    return PCIBus(devices=pci_data)
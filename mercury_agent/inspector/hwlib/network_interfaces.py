@@ -13,8 +13,12 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import logging
+
 import netifaces
 
+log = logging.getLogger(__name__)
+
 
 def get_default_interface():
     """Get default AF_INET interfaces.
@@ -96,3 +100,64 @@ def list_interfaces(exclude_loopback=True):
         interfaces = [i for i in interfaces if i != 'lo']
 
     return interfaces
+
+
+def index_gateways(gateways):
+    """Index netifaces gateway tuples by interface.
+
+    :param gateways: A netifaces.gateways() family list of
+        (gateway_ip, interface, default) tuples
+    :return: dict of interface: [{gateway_ip, interface, default}]
+    """
+    _d = {}
+    for gateway in gateways:
+        if gateway == 'default':
+            continue
+        _d[gateway[1]] = list()
+        _d[gateway[1]].append(dict(list(zip(['gateway_ip', 'interface', 'default'], gateway))))
+    return _d
+
+
+class NetworkSnapshot(object):
+    """Interfaces, addresses and gateways read once for a whole inspection.
+
+    netifaces.interfaces() and netifaces.gateways() are each called once and
+    netifaces.ifaddresses() once per interface, so lookups for any number of
+    interfaces stay linear.
+    """
+    def __init__(self, interfaces=None, gateways=None, exclude_loopback=True):
+        """
+        :param interfaces: Only read these interfaces, default all
+        :param gateways: netifaces.gateways() output, if it is already known
+        :param exclude_loopback: Leave out the loopback interface when listing
+            all interfaces
+        """
+        if interfaces is None:
+            interfaces = list_interfaces(exclude_loopback)
+        self.interfaces = list(interfaces)
+
+        self.addresses = dict()
+        for interface in self.interfaces:
+            try:
+                self.addresses[interface] = netifaces.ifaddresses(interface)
+            except ValueError:
+                # The interface went away after it was listed
+                log.debug('Interface %s is gone' % interface)
+                self.addresses[interface] = {}
+
+        self.gateways = gateways if gateways is not None else netifaces.gateways()
+        self.gateway_index = dict(
+            (family, index_gateways(self.gateways.get(family, [])))
+            for family in (netifaces.AF_INET, netifaces.AF_INET6))
+
+    def get_ipv4_network_info(self, interface):
+        return self.addresses.get(interface, {}).get(netifaces.AF_INET, [])
+
+    def get_ipv6_network_info(self, interface):
+        return self.addresses.get(interface, {}).get(netifaces.AF_INET6, [])
+
+    def get_gateways(self, interface, family=netifaces.AF_INET):
+        """
+        :return: list of gateway dicts, see index_gateways, or None
+        """
+        return self.gateway_index[family].get(interface)
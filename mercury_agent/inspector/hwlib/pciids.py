@@ -0,0 +1,249 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Vendor, device and class names from pci.ids, without parsing the text file on every run
+
+pci.ids is compiled once into a binary index of fixed size records sorted by key, followed by
+the names. The index is memory-mapped and searched with bisect, and is rebuilt whenever the size
+or modification time of pci.ids changes.
+
+Record layout, big endian so that keys sort bytewise:
+    kind (B), four 16 bit ids (4H), name offset (I), name length (H)
+"""
+
+import bisect
+import logging
+import mmap
+import os
+import struct
+import tempfile
+
+log = logging.getLogger(__name__)
+
+PCI_IDS_PATHS = ['/usr/share/hwdata/pci.ids', '/usr/share/misc/pci.ids', '/usr/share/pci.ids']
+INDEX_PATH = '/var/cache/mercury-agent/pci.ids.idx'
+
+MAGIC = b'MPID'
+VERSION = 1
+
+HEADER = struct.Struct('>4sHIQQ')
+RECORD = struct.Struct('>B4HIH')
+KEY_SIZE = 9
+
+CLASS = 1
+VENDOR = 2
+DEVICE = 3
+SUBSYSTEM = 4
+
+
+def find_pci_ids(paths=None):
+    for path in paths or PCI_IDS_PATHS:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _key(kind, a=0, b=0, c=0, d=0):
+    return struct.pack('>B4H', kind, a, b, c, d)
+
+
+def parse_pci_ids(lines):
+    """
+    Parse pci.ids into (kind, ids, name) tuples
+    :param lines: iterable of text lines
+    :return: generator of (kind, tuple of ids, name)
+    """
+    vendor = device = None
+    base_class = sub_class = None
+    in_classes = False
+
+    for line in lines:
+        if not line.strip() or line.startswith('#'):
+            continue
+        line = line.rstrip('\n')
+        depth = len(line) - len(line.lstrip('\t'))
+        text = line.lstrip('\t')
+
+        try:
+            if depth == 0:
+                if text.startswith('C '):
+                    in_classes = True
+                    ident, name = text[2:].split(None, 1)
+                    base_class = int(ident, 16)
+                    yield CLASS, (base_class, 0xffff, 0xffff), name
+                    continue
+                in_classes = False
+                ident, name = text.split(None, 1)
+                if len(ident) != 4:
+                    # Other lists (device classes, HID usages ...) end the vendor list
+                    vendor = None
+                    continue
+                vendor = int(ident, 16)
+                yield VENDOR, (vendor,), name
+            elif in_classes:
+                ident, name = text.split(None, 1)
+                if depth == 1:
+                    sub_class = int(ident, 16)
+                    yield CLASS, (base_class, sub_class, 0xffff), name
+                elif depth == 2 and sub_class is not None:
+                    yield CLASS, (base_class, sub_class, int(ident, 16)), name
+            elif vendor is not None:
+                if depth == 1:
+                    ident, name = text.split(None, 1)
+                    device = int(ident, 16)
+                    yield DEVICE, (vendor, device), name
+                elif depth == 2 and device is not None:
+                    svendor, sdevice, name = text.split(None, 2)
+                    yield SUBSYSTEM, (vendor, device, int(svendor, 16), int(sdevice, 16)), name
+        except ValueError:
+            log.debug('Skipping malformed pci.ids line: %s' % line)
+
+
+def build_index(source, destination=None):
+    """
+    Compile pci.ids into the binary index
+    :param source: Path to pci.ids
+    :param destination: Where to write the index. When None, the index is only returned
+    :return: The index as bytes
+    """
+    stat = os.stat(source)
+    entries = {}
+    with open(source, encoding='utf-8', errors='replace') as fp:
+        for kind, ids, name in parse_pci_ids(fp):
+            entries[_key(kind, *ids)] = name.encode('utf-8')
+
+    records = []
+    names = []
+    offset = 0
+    for key in sorted(entries):
+        name = entries[key][:0xffff]
+        records.append(key + struct.pack('>IH', offset, len(name)))
+        names.append(name)
+        offset += len(name)
+
+    data = b''.join([HEADER.pack(MAGIC, VERSION, len(records), stat.st_size, int(stat.st_mtime))] +
+                    records + names)
+
+    if destination:
+        try:
+            directory = os.path.dirname(destination)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.rename(tmp, destination)
+        except (IOError, OSError) as e:
+            log.debug('Could not save pci.ids index to %s [%s]' % (destination, e))
+
+    return data
+
+
+class _Keys(object):
+    """
+    Sequence view over the record keys, for bisect
+    """
+    def __init__(self, buf, count):
+        self.buf = buf
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        offset = HEADER.size + index * RECORD.size
+        return self.buf[offset:offset + KEY_SIZE]
+
+
+class PCIIDs(object):
+    def __init__(self, buf):
+        """
+        :param buf: The index, as bytes or an mmap
+        """
+        magic, version, self.count, self.source_size, self.source_mtime = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a pci.ids index')
+        self.buf = buf
+        self.keys = _Keys(buf, self.count)
+        self.names_offset = HEADER.size + self.count * RECORD.size
+
+    @classmethod
+    def load(cls, source=None, index_path=INDEX_PATH):
+        """
+        Map the index for source, building it if it is missing or stale
+        :param source: Path to pci.ids, defaults to the first of PCI_IDS_PATHS
+        :param index_path: Path to the saved index
+        :return: PCIIDs or None if pci.ids cannot be found
+        """
+        source = source or find_pci_ids()
+        if not source:
+            log.debug('pci.ids is not available, PCI names will not be resolved')
+            return None
+
+        stat = os.stat(source)
+        try:
+            with open(index_path, 'rb') as fp:
+                buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            ids = cls(buf)
+            if ids.source_size == stat.st_size and ids.source_mtime == int(stat.st_mtime):
+                return ids
+            buf.close()
+        except (IOError, OSError, ValueError, struct.error):
+            pass
+
+        log.info('Building pci.ids index from %s' % source)
+        return cls(build_index(source, index_path))
+
+    def lookup(self, kind, *ids):
+        key = _key(kind, *ids)
+        index = bisect.bisect_left(self.keys, key)
+        if index == self.count or self.keys[index] != key:
+            return None
+        _, offset, length = struct.unpack_from('>9sIH', self.buf, HEADER.size + index * RECORD.size)
+        start = self.names_offset + offset
+        return self.buf[start:start + length].decode('utf-8')
+
+    def vendor(self, vendor_id):
+        return self.lookup(VENDOR, vendor_id)
+
+    def device(self, vendor_id, device_id):
+        return self.lookup(DEVICE, vendor_id, device_id)
+
+    def subsystem(self, vendor_id, device_id, svendor_id, sdevice_id):
+        return self.lookup(SUBSYSTEM, vendor_id, device_id, svendor_id, sdevice_id)
+
+    def device_class(self, base_class, sub_class):
+        """
+        The subclass name, or the base class name when the subclass is unknown, as lspci reports
+        """
+        return self.lookup(CLASS, base_class, sub_class, 0xffff) or \
+            self.lookup(CLASS, base_class, 0xffff, 0xffff)
+
+
+__pci_ids = {}
+
+
+def get_pci_ids():
+    """
+    The shared index, loaded once per process
+    """
+    if 'ids' not in __pci_ids:
+        try:
+            __pci_ids['ids'] = PCIIDs.load()
+        except (IOError, OSError) as e:
+            log.warning('Could not load pci.ids [%s]' % e)
+            __pci_ids['ids'] = None
+    return __pci_ids['ids']
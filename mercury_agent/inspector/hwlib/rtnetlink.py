@@ -0,0 +1,345 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Read the kernel routing tables over rtnetlink, without forking `ip`
+
+Routes are returned in the same shape IPRoute2 produces from `ip route show`, with the addition of family, table
+and type keys, so that callers can tell IPv6, policy routing tables and local/broadcast entries apart. Unlike
+`ip route show`, the route type is not prepended to the destination.
+"""
+
+import logging
+import os
+import socket
+import struct
+
+log = logging.getLogger(__name__)
+
+NETLINK_ROUTE = 0
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_DUMP = 0x300
+
+RTM_F_NOTIFY = 0x100
+RTM_F_CLONED = 0x200
+
+RTA_DST = 1
+RTA_SRC = 2
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_PREFSRC = 7
+RTA_MULTIPATH = 9
+RTA_TABLE = 15
+
+NLMSG_HEADER = struct.Struct('=IHHII')
+RTMSG = struct.Struct('=BBBBBBBBI')
+RTATTR = struct.Struct('=HH')
+RTNEXTHOP = struct.Struct('=HBBi')
+U32 = struct.Struct('=I')
+I32 = struct.Struct('=i')
+
+FAMILIES = {
+    socket.AF_INET: 'inet',
+    socket.AF_INET6: 'inet6'
+}
+
+PROTOCOLS = {
+    0: 'unspec',
+    1: 'redirect',
+    2: 'kernel',
+    3: 'boot',
+    4: 'static',
+    8: 'gated',
+    9: 'ra',
+    10: 'mrt',
+    11: 'zebra',
+    12: 'bird',
+    13: 'dnrouted',
+    14: 'xorp',
+    15: 'ntk',
+    16: 'dhcp',
+    42: 'babel',
+    186: 'bgp',
+    187: 'isis',
+    188: 'ospf',
+    189: 'rip',
+    192: 'eigrp'
+}
+
+SCOPES = {
+    0: 'global',
+    200: 'site',
+    253: 'link',
+    254: 'host',
+    255: 'nowhere'
+}
+
+TYPES = {
+    0: 'unspec',
+    1: 'unicast',
+    2: 'local',
+    3: 'broadcast',
+    4: 'anycast',
+    5: 'multicast',
+    6: 'blackhole',
+    7: 'unreachable',
+    8: 'prohibit',
+    9: 'throw',
+    10: 'nat',
+    11: 'xresolve'
+}
+
+TABLES = {
+    0: 'unspec',
+    253: 'default',
+    254: 'main',
+    255: 'local'
+}
+
+# rtm_flags / rtnh_flags bits, named as `ip route show` prints them
+NEXTHOP_FLAGS = (
+    (0x1, 'dead'),
+    (0x2, 'pervasive'),
+    (0x4, 'onlink'),
+    (0x8, 'offload'),
+    (0x10, 'linkdown')
+)
+
+RECV_BUFFER_SIZE = 1 << 16
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def iter_attributes(data, offset=0, end=None):
+    """
+    Walk a run of rtattr structures
+
+    :param data: The message buffer
+    :param offset: Where the first attribute starts
+    :param end: Where the attributes end, defaults to the end of data
+    :return: A generator of (type, payload) tuples
+    """
+    end = len(data) if end is None else end
+    while offset + RTATTR.size <= end:
+        length, rta_type = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        yield rta_type, data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+
+
+def iter_messages(data):
+    """
+    Split a netlink datagram into messages
+
+    :param data: Bytes received from the socket
+    :return: A generator of (type, flags, seq, payload) tuples
+    """
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, flags, seq, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        yield msg_type, flags, seq, data[offset + NLMSG_HEADER.size:offset + length]
+        offset += _align(length)
+
+
+def _nexthop_flags(flags, entry):
+    for bit, name in NEXTHOP_FLAGS:
+        if flags & bit:
+            entry[name] = True
+
+
+def parse_multipath(family, data, ifname):
+    """
+    Decode an RTA_MULTIPATH payload
+
+    :param family: Address family of the route
+    :param data: The attribute payload
+    :param ifname: Callable resolving an interface index to a name
+    :return: list of nexthop dictionaries
+    """
+    nexthops = []
+    offset = 0
+    while offset + RTNEXTHOP.size <= len(data):
+        length, flags, hops, ifindex = RTNEXTHOP.unpack_from(data, offset)
+        if length < RTNEXTHOP.size:
+            break
+        nexthop = {'dev': ifname(ifindex), 'weight': str(hops + 1)}
+        for rta_type, payload in iter_attributes(data, offset + RTNEXTHOP.size, offset + length):
+            if rta_type == RTA_GATEWAY:
+                nexthop['via'] = socket.inet_ntop(family, payload)
+        _nexthop_flags(flags, nexthop)
+        nexthops.append(nexthop)
+        offset += _align(length)
+    return nexthops
+
+
+def parse_route(data, ifname):
+    """
+    Decode a RTM_NEWROUTE payload into an IPRoute2 compatible dictionary
+
+    :param data: The message payload, starting with struct rtmsg
+    :param ifname: Callable resolving an interface index to a name
+    :return: route dictionary, or None if the route is a cache entry
+    """
+    (family, dst_len, _, _, table, protocol, scope, route_type,
+     flags) = RTMSG.unpack_from(data)
+
+    if flags & RTM_F_CLONED:
+        return None
+
+    # Walk the attributes inline, this runs once per route on tables with millions of entries
+    attributes = {}
+    offset = RTMSG.size
+    end = len(data)
+    while offset + 4 <= end:
+        length, rta_type = RTATTR.unpack_from(data, offset)
+        if length < 4:
+            break
+        attributes[rta_type] = data[offset + 4:offset + length]
+        offset += (length + 3) & ~3
+
+    if RTA_TABLE in attributes:
+        table = U32.unpack_from(attributes[RTA_TABLE])[0]
+
+    if RTA_DST in attributes:
+        destination = socket.inet_ntop(family, attributes[RTA_DST])
+        if dst_len != (32 if family == socket.AF_INET else 128):
+            destination = '%s/%d' % (destination, dst_len)
+    else:
+        destination = 'default'
+
+    route = {
+        'destination': destination,
+        'family': FAMILIES.get(family) or str(family),
+        'table': TABLES.get(table) or str(table),
+        'type': TYPES.get(route_type) or str(route_type)
+    }
+
+    if RTA_GATEWAY in attributes:
+        route['via'] = socket.inet_ntop(family, attributes[RTA_GATEWAY])
+    if RTA_OIF in attributes:
+        route['dev'] = ifname(I32.unpack_from(attributes[RTA_OIF])[0])
+    if protocol != 3:
+        route['proto'] = PROTOCOLS.get(protocol) or str(protocol)
+    if scope:
+        route['scope'] = SCOPES.get(scope) or str(scope)
+    if RTA_PREFSRC in attributes:
+        route['src'] = socket.inet_ntop(family, attributes[RTA_PREFSRC])
+    if RTA_PRIORITY in attributes:
+        route['metric'] = str(U32.unpack_from(attributes[RTA_PRIORITY])[0])
+    if RTA_MULTIPATH in attributes:
+        route['nexthops'] = parse_multipath(family, attributes[RTA_MULTIPATH], ifname)
+
+    if flags & 0x1f:
+        _nexthop_flags(flags, route)
+    if flags & RTM_F_NOTIFY:
+        route['notify'] = True
+
+    return route
+
+
+class InterfaceNames(object):
+    """
+    Memoized if_indextoname, stale indexes resolve to `if<index>` like iproute2
+    """
+    def __init__(self):
+        self.names = {}
+
+    def __call__(self, index):
+        try:
+            return self.names[index]
+        except KeyError:
+            pass
+        try:
+            name = socket.if_indextoname(index)
+        except (OSError, socket.error):
+            name = 'if%d' % index
+        self.names[index] = name
+        return name
+
+
+class RTNetlink(object):
+    def __init__(self, families=(socket.AF_INET, socket.AF_INET6)):
+        self.families = families
+        self.ifname = InterfaceNames()
+        self.sequence = 0
+
+    def _request(self, family):
+        self.sequence += 1
+        body = RTMSG.pack(family, 0, 0, 0, 0, 0, 0, 0, 0)
+        header = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), RTM_GETROUTE,
+                                   NLM_F_REQUEST | NLM_F_DUMP, self.sequence, 0)
+        return header + body
+
+    def dump(self, family):
+        """
+        Dump a single address family, yielding raw RTM_NEWROUTE payloads
+
+        :param family: socket.AF_INET or socket.AF_INET6
+        :raises OSError: When the socket cannot be opened or the kernel returns an error
+        """
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            sock.bind((0, 0))
+            sock.send(self._request(family))
+            while True:
+                data = sock.recv(RECV_BUFFER_SIZE)
+                if not data:
+                    return
+                for msg_type, _, seq, payload in iter_messages(data):
+                    if seq != self.sequence:
+                        continue
+                    if msg_type == NLMSG_DONE:
+                        return
+                    if msg_type == NLMSG_ERROR:
+                        error = I32.unpack_from(payload)[0]
+                        if error:
+                            raise OSError(-error, os.strerror(-error))
+                        return
+                    if msg_type == RTM_NEWROUTE:
+                        yield payload
+        finally:
+            sock.close()
+
+    def iter_routes(self):
+        """
+        Generate route dictionaries for every configured family, across all tables
+        """
+        for family in self.families:
+            for payload in self.dump(family):
+                route = parse_route(payload, self.ifname)
+                if route is not None:
+                    yield route
+
+    def get_table(self):
+        return list(self.iter_routes())
+
+
+if __name__ == '__main__':
+    from pprint import pprint
+    pprint(RTNetlink().get_table())
@@ -0,0 +1,514 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+SMBIOS structures read from the raw table the kernel exports in
+/sys/firmware/dmi/tables/DMI (root only)
+
+Each structure is a 4 byte header (type, length, handle), a formatted area of `length` bytes,
+then a set of NUL terminated strings ended by an extra NUL. Formatted fields refer to strings
+by their 1 based index. Fields added by later SMBIOS versions are decoded when the structure is
+long enough to hold them, and are None otherwise.
+"""
+
+import logging
+import os
+import struct
+
+log = logging.getLogger(__name__)
+
+DMI_TABLE_PATH = '/sys/firmware/dmi/tables/DMI'
+# Read from the directory of the table
+ENTRY_POINT_NAME = 'smbios_entry_point'
+
+HEADER = struct.Struct('<BBH')
+PCI_ADDRESS = struct.Struct('<HBB')
+BYTE = struct.Struct('<B')
+WORD = struct.Struct('<H')
+DWORD = struct.Struct('<I')
+
+BIOS = 0
+SYSTEM = 1
+BASEBOARD = 2
+CHASSIS = 3
+PROCESSOR = 4
+SYSTEM_SLOT = 9
+MEMORY_DEVICE = 17
+ONBOARD_DEVICE = 41
+END_OF_TABLE = 127
+
+CHASSIS_TYPES = {
+    1: 'Other',
+    2: 'Unknown',
+    3: 'Desktop',
+    4: 'Low Profile Desktop',
+    6: 'Mini Tower',
+    7: 'Tower',
+    9: 'Laptop',
+    10: 'Notebook',
+    17: 'Main Server Chassis',
+    23: 'Rack Mount Chassis',
+    25: 'Multi-system Chassis',
+    28: 'Blade',
+    29: 'Blade Enclosure',
+    33: 'IoT Gateway',
+    34: 'Embedded PC',
+    35: 'Mini PC',
+    36: 'Stick PC'
+}
+
+PROCESSOR_TYPES = {
+    1: 'Other',
+    2: 'Unknown',
+    3: 'Central Processor',
+    4: 'Math Processor',
+    5: 'DSP Processor',
+    6: 'Video Processor'
+}
+
+PROCESSOR_STATUS = {
+    0: 'Unknown',
+    1: 'Enabled',
+    2: 'Disabled By User',
+    3: 'Disabled By BIOS',
+    4: 'Idle',
+    7: 'Other'
+}
+
+MEMORY_FORM_FACTORS = {
+    1: 'Other',
+    2: 'Unknown',
+    3: 'SIMM',
+    8: 'TSOP',
+    9: 'DIMM',
+    13: 'SODIMM',
+    15: 'FB-DIMM',
+    16: 'Die'
+}
+
+MEMORY_TYPES = {
+    1: 'Other',
+    2: 'Unknown',
+    15: 'SDRAM',
+    18: 'DDR',
+    19: 'DDR2',
+    20: 'DDR2 FB-DIMM',
+    24: 'DDR3',
+    26: 'DDR4',
+    27: 'LPDDR',
+    28: 'LPDDR2',
+    29: 'LPDDR3',
+    30: 'LPDDR4',
+    31: 'Logical non-volatile device',
+    32: 'HBM',
+    33: 'HBM2',
+    34: 'DDR5',
+    35: 'LPDDR5'
+}
+
+ONBOARD_DEVICE_TYPES = {
+    1: 'Other',
+    2: 'Unknown',
+    3: 'Video',
+    4: 'SCSI Controller',
+    5: 'Ethernet',
+    6: 'Token Ring',
+    7: 'Sound',
+    8: 'PATA Controller',
+    9: 'SATA Controller',
+    10: 'SAS Controller'
+}
+
+SLOT_USAGE = {
+    1: 'Other',
+    2: 'Unknown',
+    3: 'Available',
+    4: 'In Use',
+    5: 'Unavailable'
+}
+
+
+def iter_structures(data):
+    """
+    Walk a raw SMBIOS table
+    :param data: bytes
+    :return: generator of (type, handle, formatted area, list of strings)
+    """
+    offset = 0
+    size = len(data)
+    while offset + HEADER.size <= size:
+        structure_type, length, handle = HEADER.unpack_from(data, offset)
+        if length < HEADER.size:
+            log.debug('Malformed SMBIOS structure at offset %d' % offset)
+            return
+
+        strings_start = offset + length
+        end = data.find(b'\0\0', strings_start)
+        if end == -1:
+            return
+        if end == strings_start:
+            strings = []
+        else:
+            strings = [s.decode('latin-1').strip() for s in data[strings_start:end].split(b'\0')]
+
+        yield structure_type, handle, data[offset:strings_start], strings
+
+        if structure_type == END_OF_TABLE:
+            return
+        offset = end + 2
+
+
+def get_string(strings, index):
+    if 0 < index <= len(strings):
+        return strings[index - 1]
+    return None
+
+
+def _field(fmt, formatted, offset):
+    if len(formatted) < offset + fmt.size:
+        return None
+    return fmt.unpack_from(formatted, offset)[0]
+
+
+def _string(formatted, strings, offset):
+    index = _field(BYTE, formatted, offset)
+    return index and get_string(strings, index) or None
+
+
+def format_pci_address(formatted, offset):
+    """
+    Segment group, bus and device/function, as used by types 9 and 41
+    :return: address in sysfs form or None when the field is not applicable
+    """
+    if len(formatted) < offset + PCI_ADDRESS.size:
+        return None
+    segment, bus, devfn = PCI_ADDRESS.unpack_from(formatted, offset)
+    if bus == 0xff and devfn == 0xff:
+        return None
+    return '%04x:%02x:%02x.%x' % (segment, bus, devfn >> 3, devfn & 7)
+
+
+def format_uuid(formatted, offset, version=None):
+    """
+    From SMBIOS 2.6 the first three fields are little endian, earlier tables store them in network
+    order. The byte order follows the kernel's, so product_uuid matches
+    :param version: (major, minor) of the table, None is taken as 2.6 or later
+    :return: uuid string or None if the uuid is not present or not set
+    """
+    raw = formatted[offset:offset + 16]
+    if len(raw) < 16 or raw in (b'\0' * 16, b'\xff' * 16):
+        return None
+    byte_order = version is not None and version < (2, 6) and '>' or '<'
+    time_low, time_mid, time_high = struct.unpack_from(byte_order + 'IHH', raw)
+    rest = ''.join('%02x' % b for b in bytearray(raw[8:]))
+    return '%08x-%04x-%04x-%s-%s' % (time_low, time_mid, time_high, rest[:4], rest[4:])
+
+
+def parse_bios(formatted, strings, version=None):
+    """
+    Type 0
+    """
+    return {
+        'vendor': _string(formatted, strings, 0x04),
+        'version': _string(formatted, strings, 0x05),
+        'release_date': _string(formatted, strings, 0x08),
+        'rom_size': (_field(BYTE, formatted, 0x09) + 1) * 65536
+    }
+
+
+def parse_system(formatted, strings, version=None):
+    """
+    Type 1
+    """
+    return {
+        'manufacturer': _string(formatted, strings, 0x04),
+        'product_name': _string(formatted, strings, 0x05),
+        'version': _string(formatted, strings, 0x06),
+        'serial_number': _string(formatted, strings, 0x07),
+        'uuid': format_uuid(formatted, 0x08, version),
+        'sku_number': _string(formatted, strings, 0x19),
+        'family': _string(formatted, strings, 0x1a)
+    }
+
+
+def parse_baseboard(formatted, strings, version=None):
+    """
+    Type 2
+    """
+    return {
+        'manufacturer': _string(formatted, strings, 0x04),
+        'product_name': _string(formatted, strings, 0x05),
+        'version': _string(formatted, strings, 0x06),
+        'serial_number': _string(formatted, strings, 0x07),
+        'asset_tag': _string(formatted, strings, 0x08)
+    }
+
+
+def parse_chassis(formatted, strings, version=None):
+    """
+    Type 3
+    """
+    chassis_type = _field(BYTE, formatted, 0x05) & 0x7f
+    return {
+        'manufacturer': _string(formatted, strings, 0x04),
+        'type_id': chassis_type,
+        'type': CHASSIS_TYPES.get(chassis_type, 'Unknown'),
+        'version': _string(formatted, strings, 0x06),
+        'serial_number': _string(formatted, strings, 0x07),
+        'asset_tag': _string(formatted, strings, 0x08)
+    }
+
+
+def _count(formatted, offset, extended_offset):
+    """
+    Core and thread counts above 255 are stored in a second, 16 bit, field (SMBIOS 3.0)
+    """
+    count = _field(BYTE, formatted, offset)
+    if count == 0xff:
+        return _field(WORD, formatted, extended_offset) or count
+    return count or None
+
+
+def parse_processor(formatted, strings, version=None):
+    """
+    Type 4
+    """
+    status = _field(BYTE, formatted, 0x18)
+    return {
+        'socket_designation': _string(formatted, strings, 0x04),
+        'processor_type': PROCESSOR_TYPES.get(_field(BYTE, formatted, 0x05), 'Unknown'),
+        'family': _field(BYTE, formatted, 0x06),
+        'manufacturer': _string(formatted, strings, 0x07),
+        'version': _string(formatted, strings, 0x10),
+        'external_clock': _field(WORD, formatted, 0x12) or None,
+        'max_speed': _field(WORD, formatted, 0x14) or None,
+        'current_speed': _field(WORD, formatted, 0x16) or None,
+        'populated': bool(status & 0x40),
+        'status': PROCESSOR_STATUS.get(status & 0x07, 'Unknown'),
+        'serial_number': _string(formatted, strings, 0x20),
+        'asset_tag': _string(formatted, strings, 0x21),
+        'part_number': _string(formatted, strings, 0x22),
+        'core_count': _count(formatted, 0x23, 0x2a),
+        'core_enabled': _count(formatted, 0x24, 0x2c),
+        'thread_count': _count(formatted, 0x25, 0x2e)
+    }
+
+
+def _memory_size(formatted):
+    """
+    :return: size in bytes, 0 when the slot is empty and None when unknown
+    """
+    size = _field(WORD, formatted, 0x0c)
+    if size == 0xffff:
+        return None
+    if size == 0x7fff:
+        extended = _field(DWORD, formatted, 0x1c)
+        if extended is not None:
+            return (extended & 0x7fffffff) * 1048576
+    if size & 0x8000:
+        return (size & 0x7fff) * 1024
+    return size * 1048576
+
+
+def parse_memory_device(formatted, strings, version=None):
+    """
+    Type 17, speeds are in MT/s
+    """
+    size = _memory_size(formatted)
+    return {
+        'size': size,
+        'installed': size != 0,
+        'form_factor': MEMORY_FORM_FACTORS.get(_field(BYTE, formatted, 0x0e), 'Unknown'),
+        'locator': _string(formatted, strings, 0x10),
+        'bank_locator': _string(formatted, strings, 0x11),
+        'memory_type': MEMORY_TYPES.get(_field(BYTE, formatted, 0x12), 'Unknown'),
+        'speed': _field(WORD, formatted, 0x15) or None,
+        'manufacturer': _string(formatted, strings, 0x17),
+        'serial_number': _string(formatted, strings, 0x18),
+        'asset_tag': _string(formatted, strings, 0x19),
+        'part_number': _string(formatted, strings, 0x1a),
+        'configured_speed': _field(WORD, formatted, 0x20) or None
+    }
+
+
+def parse_system_slot(formatted, strings, version=None):
+    """
+    Type 9
+    """
+    return {
+        'designation': _string(formatted, strings, 0x04),
+        'slot_type': _field(BYTE, formatted, 0x05),
+        'current_usage': SLOT_USAGE.get(_field(BYTE, formatted, 0x07), 'Unknown'),
+        'slot_id': _field(WORD, formatted, 0x09),
+        'pci_address': format_pci_address(formatted, 0x0d)
+    }
+
+
+def parse_onboard_device(formatted, strings, version=None):
+    """
+    Type 41
+    """
+    device_type = formatted[0x05]
+    return {
+        'designation': _string(formatted, strings, 0x04),
+        'device_type': ONBOARD_DEVICE_TYPES.get(device_type & 0x7f, 'Unknown'),
+        'enabled': bool(device_type & 0x80),
+        'instance': formatted[0x06],
+        'pci_address': format_pci_address(formatted, 0x07)
+    }
+
+
+# type: (minimum structure length, decoder)
+DECODERS = {
+    BIOS: (0x12, parse_bios),
+    SYSTEM: (0x08, parse_system),
+    BASEBOARD: (0x08, parse_baseboard),
+    CHASSIS: (0x09, parse_chassis),
+    PROCESSOR: (0x1a, parse_processor),
+    SYSTEM_SLOT: (0x0d, parse_system_slot),
+    MEMORY_DEVICE: (0x15, parse_memory_device),
+    ONBOARD_DEVICE: (0x0b, parse_onboard_device)
+}
+
+# /sys/class/dmi/id attribute: (type, field)
+DMI_ATTRIBUTES = {
+    'bios_vendor': (BIOS, 'vendor'),
+    'bios_version': (BIOS, 'version'),
+    'bios_date': (BIOS, 'release_date'),
+    'sys_vendor': (SYSTEM, 'manufacturer'),
+    'product_name': (SYSTEM, 'product_name'),
+    'product_version': (SYSTEM, 'version'),
+    'product_serial': (SYSTEM, 'serial_number'),
+    'product_uuid': (SYSTEM, 'uuid'),
+    'product_sku': (SYSTEM, 'sku_number'),
+    'product_family': (SYSTEM, 'family'),
+    'board_vendor': (BASEBOARD, 'manufacturer'),
+    'board_name': (BASEBOARD, 'product_name'),
+    'board_version': (BASEBOARD, 'version'),
+    'board_serial': (BASEBOARD, 'serial_number'),
+    'board_asset_tag': (BASEBOARD, 'asset_tag'),
+    'chassis_vendor': (CHASSIS, 'manufacturer'),
+    'chassis_type': (CHASSIS, 'type_id'),
+    'chassis_version': (CHASSIS, 'version'),
+    'chassis_serial': (CHASSIS, 'serial_number'),
+    'chassis_asset_tag': (CHASSIS, 'asset_tag')
+}
+
+
+def parse_entry_point(data):
+    """
+    :param data: The SMBIOS 2.1 (_SM_) or 3.0 (_SM3_) entry point structure
+    :return: (major, minor) version of the table or None if the entry point is not recognized
+    """
+    data = bytearray(data)
+    if data[:5] == b'_SM3_' and len(data) > 8:
+        return data[7], data[8]
+    if data[:4] == b'_SM_' and len(data) > 7:
+        return data[6], data[7]
+    return None
+
+
+class SMBIOSTable(object):
+    def __init__(self, data, version=None):
+        """
+        :param data: The raw table
+        :param version: (major, minor) from the entry point, None when it is not known
+        """
+        self.version = version
+        self.structures = dict()
+        for structure_type, handle, formatted, strings in iter_structures(data):
+            self.structures.setdefault(structure_type, []).append((handle, formatted, strings))
+
+    @classmethod
+    def load(cls, path=DMI_TABLE_PATH):
+        """
+        The table is read with a single read, its version from the entry point next to it
+        """
+        with open(path, 'rb') as fp:
+            data = fp.read()
+
+        version = None
+        try:
+            with open(os.path.join(os.path.dirname(path), ENTRY_POINT_NAME), 'rb') as fp:
+                version = parse_entry_point(fp.read())
+        except (IOError, OSError) as e:
+            log.debug('SMBIOS entry point is not available [%s]' % e)
+        return cls(data, version)
+
+    def records(self, structure_type):
+        """
+        Decoded structures of a type, structures too short for the decoder are skipped
+        :param structure_type: SMBIOS type number, see DECODERS
+        :return: list of dictionaries
+        """
+        minimum_length, decoder = DECODERS[structure_type]
+        records = []
+        for handle, formatted, strings in self.structures.get(structure_type, []):
+            if len(formatted) < minimum_length:
+                log.debug('SMBIOS type %d structure %#06x is too short' % (structure_type, handle))
+                continue
+            record = decoder(formatted, strings, self.version)
+            record['handle'] = handle
+            records.append(record)
+        return records
+
+    def first(self, structure_type):
+        records = self.records(structure_type)
+        return records and records[0] or None
+
+    def dmi_attributes(self):
+        """
+        The fields the kernel exports in /sys/class/dmi/id, under the same names
+        """
+        attributes = dict()
+        records = dict()
+        for attribute, (structure_type, field) in DMI_ATTRIBUTES.items():
+            if structure_type not in records:
+                records[structure_type] = self.first(structure_type) or {}
+            value = records[structure_type].get(field)
+            if value is not None:
+                attributes[attribute] = str(value)
+        return attributes
+
+    def dump(self):
+        return {
+            'bios': self.first(BIOS),
+            'system': self.first(SYSTEM),
+            'baseboards': self.records(BASEBOARD),
+            'chassis': self.records(CHASSIS),
+            'processors': self.records(PROCESSOR),
+            'memory_devices': self.records(MEMORY_DEVICE),
+            'slots': self.records(SYSTEM_SLOT),
+            'onboard_devices': self.records(ONBOARD_DEVICE)
+        }
+
+
+__tables = {}
+
+
+def get_table():
+    """
+    The table is read once per process and shared by the dmi, smbios and mem inspectors and by
+    biosdevname resolution. The table does not change while the system is running
+    :return: SMBIOSTable or None when the table cannot be read, for instance when not running
+        as root
+    """
+    if 'table' not in __tables:
+        try:
+            __tables['table'] = SMBIOSTable.load()
+        except (IOError, OSError) as e:
+            log.debug('SMBIOS table is not available [%s]' % e)
+            __tables['table'] = None
+    return __tables['table']
@@ -13,11 +13,18 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import errno
 import logging
 import os
 
 log = logging.getLogger(__name__)
 
+# sysfs attributes are at most a page
+ATTRIBUTE_SIZE = 4096
+
+# The NetClass attributes read by the interface inspector
+NET_ATTRIBUTES = ('address', 'carrier', 'dev_port', 'dev_id', 'duplex', 'speed', 'ifindex')
+
 
 def parse_cookie(path):
     try:
@@ -43,6 +50,94 @@ def append_sys(path):
     return os.path.join('/sys', path.lstrip('/'))
 
 
+def read_attribute(path):
+    """
+    Read a sysfs attribute with a single open/read/close
+    :param path: Absolute path to the attribute
+    :return: The stripped attribute value
+    :raises OSError: When the attribute cannot be read
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, ATTRIBUTE_SIZE).decode('utf-8', 'replace').strip()
+    finally:
+        os.close(fd)
+
+
+class SysFSSnapshot(object):
+    """
+    Read a sysfs directory in one pass and keep the values for the rest of an inspection run.
+
+    Without devices, every regular file in path is read. With devices, path is treated as a class
+    directory and the attributes of each device directory beneath it are read. Attributes which
+    fail to read are stored as empty strings, like parse_cookie, and the errors are kept in failed.
+    """
+    def __init__(self, path, attributes=None, devices=False, sysfs_root='/sys'):
+        """
+        :param path: Path relative to the sysfs root, eg. class/net
+        :param attributes: Allow-list of attribute names. Required when devices is True
+        :param devices: Read one level of device directories rather than path itself
+        :param sysfs_root: sysfs mount point
+        """
+        self.path = os.path.join(sysfs_root, path.lstrip('/'))
+        self.attributes = attributes and tuple(attributes)
+        self.devices = devices
+        self.data = {}
+        self.failed = {}
+        self.load()
+
+    def _record_failure(self, device, name, error):
+        log.debug('Problem reading sysfs attribute %s/%s [%s]' % (device or self.path, name, error))
+        self.failed.setdefault(device, {})[name] = errno.errorcode.get(error.errno, str(error))
+
+    def _read_named(self, directory, device):
+        values = {}
+        for name in self.attributes:
+            try:
+                values[name] = read_attribute(os.path.join(directory, name))
+            except (IOError, OSError) as error:
+                if error.errno == errno.ENOENT:
+                    continue
+                values[name] = ''
+                self._record_failure(device, name, error)
+        return values
+
+    def _read_all(self, directory):
+        values = {}
+        for entry in os.scandir(directory):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                values[entry.name] = read_attribute(entry.path)
+            except (IOError, OSError) as error:
+                values[entry.name] = ''
+                self._record_failure(None, entry.name, error)
+        return values
+
+    def load(self):
+        if not self.devices:
+            if self.attributes:
+                self.data = self._read_named(self.path, None)
+            else:
+                self.data = self._read_all(self.path)
+            return
+
+        for entry in os.scandir(self.path):
+            self.data[entry.name] = self._read_named(entry.path, entry.name)
+
+    def device_names(self):
+        return list(self.data)
+
+    def has(self, name, device=None):
+        if device is None:
+            return name in self.data
+        return name in self.data.get(device, ())
+
+    def get(self, name, device=None, default=''):
+        values = self.data if device is None else self.data.get(device, {})
+        return values.get(name, default)
+
+
 class SysFSBase(object):
     def __init__(self):
         self.base_path = ''
@@ -55,10 +150,26 @@ class SysFSBase(object):
 class NetClass(SysFSBase):
     class_path = 'class/net'
 
-    def __init__(self, devname):
+    def __init__(self, devname, snapshot=None):
+        """
+        :param devname: interface name
+        :param snapshot: Optional SysFSSnapshot of class/net. Attributes present in the snapshot
+            are served from it, anything else is read from sysfs
+        """
         super(NetClass, self).__init__()
         self.devname = devname
         self.base_path = os.path.join(self.class_path, self.devname)
+        self.snapshot = snapshot
+
+    @classmethod
+    def snapshot_class(cls, attributes=NET_ATTRIBUTES):
+        return SysFSSnapshot(cls.class_path, attributes=attributes, devices=True)
+
+    def get_cookie(self, name):
+        if self.snapshot is not None and name in (self.snapshot.attributes or ()) and \
+                self.devname in self.snapshot.data:
+            return self.snapshot.get(name, self.devname)
+        return super(NetClass, self).get_cookie(name)
 
     @property
     def address(self):
@@ -110,12 +221,12 @@ class DMI(SysFSBase):
         self.__build_attributes()
 
     def __build_attributes(self):
-        ld = os.listdir(append_sys(self.base_path))
-        for f in ld:
-            sys_path = os.path.join(self.base_path, f)
-            if os.path.isfile(append_sys(sys_path)):
-                self.elements.append(f)
-                self.__setattr__(f, self.get_cookie(f))
+        self.snapshot = SysFSSnapshot(self.base_path)
+        if self.snapshot.failed:
+            log.debug('Unreadable DMI attributes: %s' % ', '.join(sorted(self.snapshot.failed[None])))
+        for f, value in self.snapshot.data.items():
+            self.elements.append(f)
+            self.__setattr__(f, value)
 
     def __getattr__(self, item):
         """\
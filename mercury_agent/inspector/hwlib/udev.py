@@ -59,35 +59,35 @@ class UDevHelper(object):
             return None
         return udisk
 
-    def discover_valid_storage_devices(self, fc_enabled=True, loop_enabled=False):
+    @staticmethod
+    def is_valid_storage_device(disk, fc_enabled=True, loop_enabled=False):
         """
-        Kind of ugly, but gets the job done. It strips devices we don't
+        Kind of ugly, but gets the job done. Rejects devices we don't
         care about, such as cd roms, device mapper block devices, loop, and fibre channel.
-
         """
+        if not fc_enabled and 'fc' in disk.get('ID_BUS', ''):
+            return False
 
-        disks = self.get_disks()
-        pruned = list()
+        if not loop_enabled and disk.get('MAJOR') == '7':
+            return False
 
-        for disk in disks:
-            if not fc_enabled and 'fc' in disk.get('ID_BUS', ''):
-                continue
+        if disk.get('ID_TYPE') == 'cd':
+            return False
 
-            if not loop_enabled and disk.get('MAJOR') == '7':
-                continue
+        if disk.get('MAJOR') == '254':  # Device Mapper (LVM)
+            return False
 
-            if disk.get('ID_TYPE') == 'cd':
-                continue
+        if os.path.split(disk.get('DEVPATH', ''))[-1].startswith('ram'):
+            return False
 
-            if disk.get('MAJOR') == '254':  # Device Mapper (LVM)
-                continue
+        return True
 
-            if os.path.split(disk.get('DEVPATH', ''))[-1].startswith('ram'):
-                continue
-
-            pruned.append(disk)
-
-        return pruned
+    def discover_valid_storage_devices(self, fc_enabled=True, loop_enabled=False):
+        """
+        Strips devices we don't care about, see is_valid_storage_device
+        """
+        return [disk for disk in self.get_disks()
+                if self.is_valid_storage_device(disk, fc_enabled, loop_enabled)]
 
     def yield_mapped_devices(self):
         disks = self.get_disks()
@@ -106,17 +106,21 @@ class UDevHelper(object):
             if device.get('UDISKS_PARTITION_NUMBER') == str(partition_id):
                 return str(device['DEVNAME'])
 
+    @staticmethod
+    def is_ethernet_device(device):
+        try:
+            return device.attributes.asint('type') == 1
+        except KeyError:
+            return False
+
     def get_network_devices(self):
         """ Returns a list of all network(ethernet/type 1] devices found on the system. """
 
         result = []
 
         for candidate in self.context.list_devices(subsystem='net'):
-            try:
-                if candidate.attributes.asint('type') == 1:
-                    result.append(candidate)
-            except KeyError:
-                pass
+            if self.is_ethernet_device(candidate):
+                result.append(candidate)
 
         # let's go ahead and return it sorted..
         result.sort(key=lambda dev: dev.sys_name)
@@ -13,10 +13,15 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import functools
 import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from mercury_agent.inspector.inspectors import inspectors, late_inspectors
 from mercury_agent.hardware.drivers import registered_drivers, set_driver_cache
+from mercury_agent.inspector.hwlib.lspci import LSPCIError, PCIBus
 from mercury.common.mercury_id import generate_mercury_id
 from mercury.common.exceptions import fancy_traceback_short, parse_exception
 
@@ -27,52 +32,336 @@ log = logging.getLogger(__name__)
 
 global_device_info = {}
 
+# Sections are also replaced one at a time after the initial inspection, by the refresh
+# scheduler, the udev monitor and the RAID refresher. Each holds the section's lock while it
+# reads, replaces and publishes the section.
+_section_locks = {}
+_section_locks_lock = threading.Lock()
+
+DEFAULT_MAX_WORKERS = 8
+
+DRIVER_PREFIX = 'driver:'
+
+# The indexed PCI bus shared by every driver probe of an inspection
+PCI_BUS = 'context:pci_bus'
 
-def _collect():
+
+def get_section_lock(name):
+    """
+    :param name: Section name
+    :return: The threading.Lock shared by everything which updates the section
+    """
+    with _section_locks_lock:
+        return _section_locks.setdefault(name, threading.Lock())
+
+
+def _timed(timeline, name, f, category):
+    return timeline and timeline.wrap(name, f, category) or f
+
+
+def _configured(options, name, f):
+    """
+    :param options: dict of inspector name: keyword arguments, built from the agent configuration
+    :return: f, passed the keyword arguments of the inspector
+    """
+    kwargs = (options or {}).get(name)
+    return kwargs and functools.partial(f, **kwargs) or f
+
+
+def _inspector(timeline, options, name, f, category):
+    return _timed(timeline, name, _configured(options, name, f), category)
+
+
+def _collect(timeline=None, options=None):
     _c = dict()
     for inspector, f in inspectors:
-        _c[inspector] = f()
+        _c[inspector] = _inspector(timeline, options, inspector, f, 'inspector')()
     return _c
 
 
-def inspect():
+def _sections(results):
+    """Strip driver probe and probe context entries from engine results"""
+    return dict((k, v) for k, v in results.items()
+                if not k.startswith(DRIVER_PREFIX) and k != PCI_BUS)
+
+
+def _pci_bus(collected):
+    pci = collected.get('pci')
+    if pci is None:
+        return None
+    try:
+        return PCIBus(devices=pci)
+    except LSPCIError as e:
+        log.error('Could not index PCI devices, probes are passed the device list: {}'.format(e))
+        return None
+
+
+def _probe_context(collected, pci_bus=None):
     """
-    Runs inspectors and associates collection with a mercury_id
-    :return:
+    :param collected: early inspector data
+    :param pci_bus: PCIBus built from collected['pci'], passed to probes in place of the list
+    :return: data passed to driver probes
     """
-    collected = _collect()
+    if pci_bus is None:
+        return collected
+    context = dict(collected)
+    context['pci'] = pci_bus
+    return context
+
+
+def _mercury_id(collected):
     dmi = collected.get('dmi') or {}
     interfaces = collected.get('interfaces') or {}
+    return generate_mercury_id(dmi, interfaces)
 
-    collected['mercury_id'] = generate_mercury_id(dmi, interfaces)
 
-    # populate_drivers
+def probe_driver(driver, collected):
+    """
+    Probe a single registered driver and cache an instance if it claims devices
+    :param driver: registered_drivers entry
+    :param collected: early inspector data
+    :return: True if the driver was initialized
+    """
+    _wants = driver['class'].wants
+
+    # noinspection PyBroadException
+    try:
+        devices = driver['class'].probe(
+            _wants and collected[_wants] or collected)
+    except Exception:
+        # probe is implemented in each driver and is not wrapped
+        # handle probe errors gracefully and soldier on
+        log.error(fancy_traceback_short(
+            parse_exception(),
+            preamble='Probe function failed for driver {}'.format(
+                driver['name']
+            )))
+        return False
+    if devices:
+        set_driver_cache(driver, devices)
+        return True
+    return False
+
+
+def probe_drivers(collected, timeline=None):
+    context = _probe_context(collected, _pci_bus(collected))
+    for driver in registered_drivers:
+        _timed(timeline, driver['name'], probe_driver, 'probe')(driver, context)
+
+
+def run_tasks(tasks, max_workers=DEFAULT_MAX_WORKERS, on_complete=None):
+    """
+    Run tasks on a bounded thread pool. A task is submitted as soon as every task it requires
+    has completed.
+    :param tasks: list of (key, callable, requires) tuples. The callable is passed a copy of the
+        results which are available at submission time
+    :param max_workers: thread pool size
+    :param on_complete: Optional callback, called with key and result as each task completes
+    :return: dict of key: result
+    """
+    keys = [key for key, _, _ in tasks]
+    pending = []
+    for key, f, requires in tasks:
+        missing = set(requires) - set(keys)
+        if missing:
+            raise ValueError('Task {} requires unknown tasks: {}'.format(key, ', '.join(missing)))
+        pending.append((key, f, set(requires)))
+
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            waiting = []
+            for key, f, requires in pending:
+                if requires.issubset(results):
+                    running[executor.submit(f, dict(results))] = key
+                else:
+                    waiting.append((key, f, requires))
+            pending = waiting
+
+            if not running:
+                raise ValueError('Circular task dependency: {}'.format(
+                    ', '.join(key for key, _, _ in pending)))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                # Exceptions propagate to the caller, inspectors and probes handle their own
+                results[key] = future.result()
+                if on_complete:
+                    on_complete(key, results[key])
+
+    return results
+
+
+def _early_tasks(timeline=None, options=None):
+    early = [name for name, _ in inspectors]
+    tasks = []
+
+    for name, f in inspectors:
+        f = _inspector(timeline, options, name, f, 'inspector')
+        tasks.append((name, lambda results, _f=f: _f(), []))
+
+    tasks.append(('mercury_id', _mercury_id, ['dmi', 'interfaces']))
+
+    if 'pci' in early:
+        tasks.append((PCI_BUS, _pci_bus, ['pci']))
 
     for driver in registered_drivers:
         _wants = driver['class'].wants
+        probe = _timed(timeline, driver['name'], probe_driver, 'probe')
+        requires = _wants and [_wants] or list(early)
+        if 'pci' in requires and 'pci' in early:
+            requires.append(PCI_BUS)
+        tasks.append((DRIVER_PREFIX + driver['name'],
+                      lambda results, _d=driver, _p=probe: _p(
+                          _d, _probe_context(_sections(results), results.get(PCI_BUS))),
+                      requires))
 
-        # noinspection PyBroadException
-        try:
-            devices = driver['class'].probe(
-                _wants and collected[_wants] or collected)
-        except Exception:
-            # probe is implemented in each driver and is not wrapped
-            # handle probe errors gracefully and soldier on
-            log.error(fancy_traceback_short(
-                parse_exception(),
-                preamble='Probe function failed for driver {}'.format(
-                    driver['name']
-                )))
+    return tasks
+
+
+def _late_tasks(timeline=None, device_info=None, options=None):
+    """
+    :param timeline: Optional mercury_agent.timeline.Timeline
+    :param device_info: When provided, early inspection has already completed and the late
+        inspectors are passed this data rather than waiting on early tasks
+    :param options: Optional dict of inspector name: keyword arguments
+    """
+    early = [name for name, _ in inspectors]
+    tasks = []
+
+    for name, f in late_inspectors:
+        wants = getattr(f, 'wants', None)
+        driver_type = getattr(f, 'driver_type', None)
+        f = _inspector(timeline, options, name, f, 'late_inspector')
+
+        if device_info is not None:
+            tasks.append((name, lambda results, _f=f: _f(dict(device_info)), []))
             continue
-        if devices:
-            set_driver_cache(driver, devices)
+
+        requires = list(early if wants is None else wants)
+        if driver_type is not False:
+            requires += [DRIVER_PREFIX + d['name'] for d in registered_drivers
+                         if driver_type is None or d['driver_type'] == driver_type]
+        tasks.append((name, lambda results, _f=f: _f(_sections(results)), requires))
+
+    return tasks
+
+
+def build_tasks(timeline=None, options=None):
+    """
+    Build the inspection dependency graph. Driver probes wait for the section they want (or every
+    early inspector), late inspectors wait for the sections they want and the probes of their
+    driver_type
+    :param timeline: Optional mercury_agent.timeline.Timeline used to record run times
+    :param options: Optional dict of inspector name: keyword arguments
+    :return: list of (key, callable, requires) tuples
+    """
+    return _early_tasks(timeline, options) + _late_tasks(timeline, options=options)
+
+
+def _inspect_serial(timeline=None, options=None):
+    collected = _collect(timeline, options)
+    collected['mercury_id'] = _mercury_id(collected)
+
+    # populate_drivers
+    probe_drivers(collected, timeline)
 
     # TODO: Sort RAID drivers based on devices
 
     for inspector, f in late_inspectors:
-        collected[inspector] = f(collected)
+        collected[inspector] = _inspector(timeline, options, inspector, f,
+                                          'late_inspector')(collected)
+
+    return collected
+
+
+def inspect(max_workers=DEFAULT_MAX_WORKERS, timeline=None, options=None):
+    """
+    Runs inspectors and associates collection with a mercury_id
+    :param max_workers: Size of the inspector thread pool. 1 or less runs the inspectors serially
+    :param timeline: Optional mercury_agent.timeline.Timeline used to record inspector and probe
+        run times
+    :param options: Optional dict of inspector name: keyword arguments passed to the inspector
+    :return:
+    """
+    if max_workers and max_workers > 1:
+        collected = _sections(run_tasks(build_tasks(timeline, options), max_workers=max_workers))
+    else:
+        collected = _inspect_serial(timeline, options)
+
+    global global_device_info
+    global_device_info.update(**collected)
+
+    return global_device_info
+
+
+def inspect_early(max_workers=DEFAULT_MAX_WORKERS, timeline=None, options=None):
+    """
+    Runs early inspectors and driver probes only. This is enough to register the device,
+    inspect_late should be called afterwards to complete the inventory
+    :param max_workers: Size of the inspector thread pool. 1 or less runs the inspectors serially
+    :param timeline: Optional mercury_agent.timeline.Timeline
+    :param options: Optional dict of inspector name: keyword arguments passed to the inspector
+    :return:
+    """
+    if max_workers and max_workers > 1:
+        collected = _sections(run_tasks(_early_tasks(timeline, options),
+                                        max_workers=max_workers))
+    else:
+        collected = _collect(timeline, options)
+        collected['mercury_id'] = _mercury_id(collected)
+        probe_drivers(collected, timeline)
 
     global global_device_info
     global_device_info.update(**collected)
 
     return global_device_info
+
+
+def inspect_late(on_complete=None, max_workers=DEFAULT_MAX_WORKERS, timeline=None,
+                 options=None):
+    """
+    Runs late inspectors against the data collected by inspect_early. Each section is stored in
+    global_device_info as soon as its inspector completes
+    :param on_complete: Optional callback, called with the section name and data as each late
+        inspector completes
+    :param max_workers: Size of the inspector thread pool. 1 or less runs the inspectors serially
+    :param timeline: Optional mercury_agent.timeline.Timeline
+    :param options: Optional dict of inspector name: keyword arguments passed to the inspector
+    :return:
+    """
+    early_device_info = dict(global_device_info)
+
+    def _complete(name, data):
+        global_device_info[name] = data
+        if on_complete:
+            on_complete(name, data)
+
+    if max_workers and max_workers > 1:
+        run_tasks(_late_tasks(timeline, early_device_info, options), max_workers=max_workers,
+                  on_complete=_complete)
+    else:
+        for inspector, f in late_inspectors:
+            _complete(inspector, _inspector(timeline, options, inspector, f,
+                                            'late_inspector')(early_device_info))
+
+    return global_device_info
+
+
+def warm_start(device_info, timeline=None):
+    """
+    Seed global_device_info with previously collected inventory. Drivers are probed against the
+    cached sections so that hardware capabilities are available before a full inspection runs
+    :param device_info: cached inventory
+    :param timeline: Optional mercury_agent.timeline.Timeline
+    :return:
+    """
+    probe_drivers(device_info, timeline)
+
+    global global_device_info
+    global_device_info.update(**device_info)
+
+    return global_device_info
@@ -22,6 +22,7 @@ from .os_storage import os_storage_inspector
 from .mem import memory_inspector
 from .pci import pci_inspector
 from .routes import route_inspector
+from .smbios import smbios_inspector
 
 # Late
 
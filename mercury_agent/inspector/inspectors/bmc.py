@@ -9,7 +9,7 @@ log = logging.getLogger(__name__)
 
 
 # noinspection PyUnusedLocal
-@expose_late('bmc')
+@expose_late('bmc', wants=[], driver_type='bmc')
 def bmc_inspector(device_info):
 
     drivers = get_subsystem_drivers('bmc')
@@ -13,14 +13,31 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import logging
+
 from mercury_agent.inspector.inspectors import inspector
-from mercury_agent.inspector.hwlib.cpuinfo import CPUInfo
+from mercury_agent.inspector.hwlib.cpuinfo import CPUInfo, SysFSCPUInfo
+
+log = logging.getLogger(__name__)
+
+
+def get_cpu_info(sysfs_topology=False):
+    """
+    :param sysfs_topology: Read topology and cpufreq from /sys/devices/system/cpu and parse only
+        one /proc/cpuinfo entry per socket
+    """
+    if sysfs_topology:
+        try:
+            return SysFSCPUInfo()
+        except (IOError, OSError) as e:
+            log.warning('Could not read cpu topology from sysfs, using /proc/cpuinfo [%s]' % e)
+    return CPUInfo()
 
 
 @inspector.expose('cpu')
-def cpu_inspector():
+def cpu_inspector(sysfs_topology=False):
     _cpu = []
-    cpu_info = CPUInfo()
+    cpu_info = get_cpu_info(sysfs_topology)
 
     processors = cpu_info.physical_index
     for _id in processors:
@@ -34,7 +51,7 @@ def cpu_inspector():
         _proc_dict['cache_alignment'] = int(processor['cache_alignment'])
         _proc_dict['flags'] = processor['flags'].split()
         # speed
-        _proc_dict['frequency'] = CPUInfo.get_speed_info(processor)
+        _proc_dict['frequency'] = cpu_info.get_core_speed_info(processor)
 
         _cpu.append(_proc_dict)
         _cpu.sort(key=lambda k: k['physical_id'])
@@ -14,13 +14,35 @@
 #    limitations under the License.
 
 from . import inspector
+from mercury_agent.inspector.hwlib import smbios
 from mercury_agent.inspector.hwlib.sysfs import DMI
 
+# Never filled in from the SMBIOS table. product_uuid and the serials feed the MercuryID, filling
+# them in would change the identity of hosts registered while they were empty
+IDENTITY_ATTRIBUTES = ['product_uuid', 'product_serial', 'board_serial', 'board_asset_tag',
+                       'chassis_serial', 'chassis_asset_tag']
+
 
 @inspector.expose('dmi')
 def dmi_inspector():
-    dmi = DMI()
-    return dmi.dump()
+    """
+    /sys/class/dmi/id attributes, with attributes the kernel does not export, or which are not
+    readable, filled in from the SMBIOS table. Identity attributes are only taken from the kernel
+    """
+    table = smbios.get_table()
+    try:
+        dmi = DMI().dump()
+    except (IOError, OSError):
+        if table is None:
+            raise
+        dmi = dict()
+
+    if table is not None:
+        for attribute, value in table.dmi_attributes().items():
+            if value and not dmi.get(attribute) and attribute not in IDENTITY_ATTRIBUTES:
+                dmi[attribute] = value
+    return dmi
+
 
 if __name__ == '__main__':
     import pprint
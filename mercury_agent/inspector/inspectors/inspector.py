@@ -57,20 +57,26 @@ def expose(name):
     return wrap
 
 
-def expose_late(name, run_if=None):
+def expose_late(name, run_if=None, wants=None, driver_type=None):
     """Hardware dependent inspectors, such as those dependent on OEM/ODM utilities
     :param run_if: callback funtion that takes device_info as an argument. This is optional,
         run_if can always be added by other means
+    :param wants: list of early inspector sections the inspector depends on. When None,
+        the inspector waits for every early inspector
+    :param driver_type: only wait for driver probes of this type. When None, the inspector
+        waits for every driver probe, when False it does not wait for any
     """
     def wrap(f):
-        def wrapped_f(early_device_info):
+        def wrapped_f(early_device_info, **kwargs):
             if hasattr(f, 'run_if') and not f.run_if(early_device_info):
                 log.info('Requirement not satisfied for %s (%s)' % (f.__name__, name))
                 return None
-            return run_inspector(name, f, early_device_info)
+            return run_inspector(name, f, early_device_info, **kwargs)
         log.debug('Adding late inspector %s (%s)' % (f.__name__, name))
         wrapped_f.__name__ = f.__name__
         wrapped_f.__doc__ = f.__doc__
+        wrapped_f.wants = wants
+        wrapped_f.driver_type = driver_type
         if run_if:
             wrapped_f.run_if = run_if
         late_inspectors.append((name, wrapped_f))
@@ -32,17 +32,98 @@ def get_udev_interface_by_name(interfaces, name):
             return interface
 
 
-def index_gateways(gateways):
+def index_udev_interfaces(interfaces):
+    """
+    :param interfaces: pyudev network devices
+    :return: dict of interface name: device. The first device wins, as with
+        get_udev_interface_by_name
+    """
     _d = {}
-    for gateway in gateways:
-        if gateway == 'default':
-            continue
-        log.debug(gateway)
-        _d[gateway[1]] = list()
-        _d[gateway[1]].append(dict(list(zip(['gateway_ip', 'interface', 'default'], gateway))))
+    for interface in interfaces:
+        _d.setdefault(interface.get('INTERFACE'), interface)
     return _d
 
 
+def get_biosdevnames(interfaces):
+    """
+    Interfaces are reported without a biosdevname when names cannot be resolved
+    """
+    try:
+        return biosdevname.get_names(interfaces)
+    except (IOError, OSError) as e:
+        log.debug('Could not resolve biosdevname names: {}'.format(e))
+    except Exception:
+        # biosdevname failures and malformed SMBIOS tables
+        log.exception('Failed to resolve biosdevname names')
+    return dict()
+
+
+def inspect_interface(interface, udev_interfaces, gateways, snapshot=None, biosdevnames=None,
+                      network=None):
+    """
+    Inspect a single interface
+    :param interface: interface name
+    :param udev_interfaces: pyudev network devices, see UDevHelper.get_network_devices, or a
+        dictionary of them built by index_udev_interfaces
+    :param gateways: netifaces.gateways(), not used when network is given
+    :param snapshot: Optional class/net SysFSSnapshot shared by the inspection run
+    :param biosdevnames: Optional biosdevname names resolved for the whole inspection run
+    :param network: Optional NetworkSnapshot shared by the inspection run
+    :return: interface dictionary or None if the interface has no hardware address
+    """
+    log.debug('Inspecting: {}'.format(interface))
+    ndi = NetClass(interface, snapshot=snapshot)
+    _iface = dict()
+    _iface['devname'] = interface
+    address = ndi.address
+    if not address:
+        return None
+    _iface['address'] = address
+    _iface['carrier'] = ndi.carrier
+    log.debug('Interface {} is {}'.format(interface, _iface['carrier'] and 'up' or 'down'))
+    _iface['dev_port'] = ndi.dev_port
+    _iface['duplex'] = ndi.duplex
+    _iface['speed'] = ndi.speed
+    _iface['predictable_names'] = {}
+    if biosdevnames is None:
+        biosdevnames = get_biosdevnames([interface])
+    _iface['predictable_names']['biosdevname'] = biosdevnames.get(interface)
+
+    if isinstance(udev_interfaces, dict):
+        udev_interface = udev_interfaces.get(interface) or dict()
+    else:
+        udev_interface = get_udev_interface_by_name(udev_interfaces, interface) or dict()
+    _iface['predictable_names']['systemd_udev'] = udev_interface.get('ID_NET_NAME_PATH')
+    _iface['predictable_names']['systemd_onboard'] = udev_interface.get('ID_NET_NAME_ONBOARD')
+    _iface['predictable_names']['systemd_mac'] = udev_interface.get('ID_NET_NAME_MAC')
+    _iface['predictable_names']['systemd_slot'] = udev_interface.get('ID_NET_NAME_SLOT')
+
+    if not udev_interface:
+        udev_parent = dict()
+    else:
+        udev_parent = udev_interface.parent or dict()
+    _iface['pci_slot'] = udev_parent.get('PCI_SLOT_NAME')
+    _iface['model_name'] = udev_parent.get('ID_MODEL_FROM_DATABASE')
+    _iface['vendor_name'] = udev_parent.get('ID_VENDOR_FROM_DATABASE')
+    _iface['pci_class'] = udev_parent.get('PCI_CLASS')
+    _iface['pci_id'] = udev_parent.get('PCI_ID')
+    _iface['pci_subsystem_id'] = udev_parent.get('PCI_SUBSYS_ID')
+    _iface['driver'] = udev_parent.get('DRIVER')
+
+    if network is None:
+        network = network_interfaces.NetworkSnapshot(interfaces=[interface], gateways=gateways)
+
+    # provide per interface routing table
+    _iface['address_info'] = network.get_ipv4_network_info(interface)
+    _iface['ipv4_gateways'] = network.get_gateways(interface, netifaces.AF_INET)
+
+    _iface['address_info_v6'] = network.get_ipv6_network_info(interface)
+    _iface['ipv6_gateways'] = network.get_gateways(interface, netifaces.AF_INET6)
+
+    # TODO: Add gateway information from netifaces.gateways()
+    return _iface
+
+
 @inspector.expose('interfaces')
 def interface_inspector():
     """
@@ -51,62 +132,22 @@ def interface_inspector():
     """
     i = []
     uh = UDevHelper()
-    udev_interfaces = uh.get_network_devices()
-    interfaces = network_interfaces.list_interfaces()
-    gateways = netifaces.gateways()
-    log.debug(gateways)
+    udev_interfaces = index_udev_interfaces(uh.get_network_devices())
+    network = network_interfaces.NetworkSnapshot()
+    interfaces = network.interfaces
+    log.debug(network.gateways)
 
-    for interface in interfaces:
-        log.debug('Inspecting: {}'.format(interface))
-        ndi = NetClass(interface)
-        _iface = dict()
-        _iface['devname'] = interface
-        address = ndi.address
-        if not address:
-            continue
-        _iface['address'] = address
-        _iface['carrier'] = ndi.carrier
-        log.debug('Interface {} is {}'.format(interface, ndi.carrier and 'up' or 'down'))
-        _iface['dev_port'] = ndi.dev_port
-        _iface['duplex'] = ndi.duplex
-        _iface['speed'] = ndi.speed
-        _iface['predictable_names'] = {}
-        try:
-            _iface['predictable_names']['biosdevname'] = biosdevname.get_name(interface)
-        except OSError:
-            _iface['predictable_names']['biosdevname'] = None
+    snapshot = NetClass.snapshot_class()
+    for device, errors in snapshot.failed.items():
+        log.debug('Unreadable sysfs attributes for {}: {}'.format(device, errors))
 
-        udev_interface = get_udev_interface_by_name(udev_interfaces, interface) or dict()
-        _iface['predictable_names']['systemd_udev'] = udev_interface.get('ID_NET_NAME_PATH')
-        _iface['predictable_names']['systemd_onboard'] = udev_interface.get('ID_NET_NAME_ONBOARD')
-        _iface['predictable_names']['systemd_mac'] = udev_interface.get('ID_NET_NAME_MAC')
-        _iface['predictable_names']['systemd_slot'] = udev_interface.get('ID_NET_NAME_SLOT')
-
-        if not udev_interface:
-            udev_parent = dict()
-        else:
-            udev_parent = udev_interface.parent or dict()
-        _iface['pci_slot'] = udev_parent.get('PCI_SLOT_NAME')
-        _iface['model_name'] = udev_parent.get('ID_MODEL_FROM_DATABASE')
-        _iface['vendor_name'] = udev_parent.get('ID_VENDOR_FROM_DATABASE')
-        _iface['pci_class'] = udev_parent.get('PCI_CLASS')
-        _iface['pci_id'] = udev_parent.get('PCI_ID')
-        _iface['pci_subsystem_id'] = udev_parent.get('PCI_SUBSYS_ID')
-        _iface['driver'] = udev_parent.get('DRIVER')
-
-        # provide per interface routing table
-        _iface['address_info'] = network_interfaces.get_ipv4_network_info(interface)
-
-        ipv4_gateways = gateways.get(netifaces.AF_INET, [])
-        _iface['ipv4_gateways'] = index_gateways(ipv4_gateways).get(interface)
-
-        _iface['address_info_v6'] = network_interfaces.get_ipv6_network_info(interface)
-
-        ipv6_gateways = gateways.get(netifaces.AF_INET6, [])
-        _iface['ipv6_gateways'] = index_gateways(ipv6_gateways).get(interface)
-
-        # TODO: Add gateway information from netifaces.gateways()
-        i.append(_iface)
+    biosdevnames = get_biosdevnames(interfaces)
+
+    for interface in interfaces:
+        _iface = inspect_interface(interface, udev_interfaces, network.gateways,
+                                   snapshot=snapshot, biosdevnames=biosdevnames, network=network)
+        if _iface:
+            i.append(_iface)
 
     return i
 
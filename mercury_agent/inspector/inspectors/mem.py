@@ -1,11 +1,16 @@
 
 from mercury_agent.inspector.inspectors import expose
+from mercury_agent.inspector.hwlib import smbios
 from mercury_agent.inspector.hwlib.meminfo import parse_meminfo
 
 
 @expose('mem')
 def memory_inspector():
-    return parse_meminfo()
+    mem = parse_meminfo()
+    table = smbios.get_table()
+    if table is not None:
+        mem['memory_devices'] = [d for d in table.records(smbios.MEMORY_DEVICE) if d['installed']]
+    return mem
 
 
 if __name__ == '__main__':
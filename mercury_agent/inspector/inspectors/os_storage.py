@@ -13,20 +13,58 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import logging
+
 from . import inspector
+from mercury_agent.inspector.hwlib.block import BlockDevices, PropertyFilter
 from mercury_agent.inspector.hwlib.udev import UDevHelper
 
+log = logging.getLogger(__name__)
 
-@inspector.expose('os_storage')
-def os_storage_inspector():
+# Every udev property is reported unless the agent configuration narrows the list
+DEFAULT_PROPERTIES = ['*']
+
+
+def is_valid_storage_device(properties):
+    return UDevHelper.is_valid_storage_device(properties, fc_enabled=True, loop_enabled=False)
+
+
+def inspect_storage_device(storage_device, property_filter):
+    """
+    :param storage_device: pyudev.Device
+    :param property_filter: PropertyFilter
+    :return: devname, os_storage entry
+    """
+    return storage_device['DEVNAME'], property_filter(storage_device)
+
+
+def _udev_os_storage(property_filter):
     uh = UDevHelper()
     _os_storage = {}
     storage_devices = uh.discover_valid_storage_devices(fc_enabled=True, loop_enabled=False)
     for storage_device in storage_devices:
-        _os_storage[storage_device['DEVNAME']] = (dict(list(storage_device.items())))
+        devname, entry = inspect_storage_device(storage_device, property_filter)
+        _os_storage[devname] = entry
     return _os_storage
 
 
+@inspector.expose('os_storage')
+def os_storage_inspector(properties=DEFAULT_PROPERTIES):
+    """
+    :param properties: udev properties reported for each disk, names or fnmatch patterns. '*'
+        reports every property
+    """
+    property_filter = PropertyFilter(properties)
+    try:
+        block_devices = BlockDevices()
+    except OSError as e:
+        log.debug('Using pyudev to enumerate block devices: {}'.format(e))
+        return _udev_os_storage(property_filter)
+
+    return dict((devname, property_filter(properties)) for devname, properties in
+                block_devices.discover(is_valid=is_valid_storage_device).items())
+
+
 if __name__ == '__main__':
     from pprint import pprint
 
@@ -19,7 +19,7 @@ from mercury_agent.inspector.hwlib import lspci
 
 @inspector.expose('pci')
 def pci_inspector():
-    _pci = lspci.parse_nnvmmk()
+    _pci = lspci.get_pci_devices()
     return _pci
 
 
@@ -14,6 +14,10 @@
 #    limitations under the License.
 
 import logging
+import threading
+import time
+
+from six.moves import queue
 
 from mercury_agent.hardware.drivers import get_subsystem_drivers
 from mercury_agent.inspector.inspectors import expose_late
@@ -21,25 +25,160 @@ from mercury_agent.inspector.inspectors import expose_late
 
 log = logging.getLogger(__name__)
 
+MAX_WORKERS = 4
+# Seconds a single adapter (or driver enumeration) may take before it is reported as errored
+ADAPTER_TIMEOUT = 300
+
+
+def _run(done, idx, f, args):
+    try:
+        done.put((idx, (f(*args), None)))
+    except Exception as e:
+        log.exception('RAID inspection failed')
+        done.put((idx, (None, str(e) or e.__class__.__name__)))
+
+
+def _run_calls(calls, max_workers, timeout):
+    """
+    Run up to max_workers calls at a time, each in its own daemon thread. A call which runs for
+    longer than timeout is abandoned and its slot given to the next call, so a hung controller
+    cannot hold up the others or the agent's exit. The abandoned thread is not stopped, drivers
+    time limit their vendor tools so that it ends (see Storcli).
+
+    :param calls: list of (description, function, args)
+    :param max_workers: Number of calls running at the same time
+    :param timeout: Seconds each call may run, measured from when it starts
+    :return: list of (result, error) in the order of calls, error is None on success
+    """
+    outcomes = [None] * len(calls)
+    waiting = list(range(len(calls)))
+    waiting.reverse()
+    running = dict()
+    done = queue.Queue()
+
+    while waiting or running:
+        while waiting and len(running) < max(max_workers, 1):
+            idx = waiting.pop()
+            _, f, args = calls[idx]
+            thread = threading.Thread(target=_run, args=(done, idx, f, args))
+            thread.daemon = True
+            running[idx] = time.time()
+            thread.start()
+
+        try:
+            idx, outcome = done.get(
+                timeout=max(min(running.values()) + timeout - time.time(), 0))
+            # Outcomes of abandoned calls are discarded
+            if running.pop(idx, None) is not None:
+                outcomes[idx] = outcome
+        except queue.Empty:
+            pass
+
+        now = time.time()
+        for idx, started in list(running.items()):
+            if now - started >= timeout:
+                del running[idx]
+                log.warning('Abandoned RAID inspection of {} after {} seconds, its thread is '
+                            'still running'.format(calls[idx][0], timeout))
+                outcomes[idx] = (None, 'Timed out after {} seconds'.format(timeout))
+
+    return outcomes
+
+
+def _error_entry(driver, idx, error):
+    log.error('RAID inspection of %s adapter %s failed: %s' % (driver.name, idx, error))
+    return {'driver': driver.name, 'adapter_index': idx, 'error': error}
+
+
+class RAIDSection(list):
+    """
+    The raid section, with the position of each adapter's entry so that a single adapter can be
+    refreshed in place after it is changed. Sections restored from the inventory cache are plain
+    lists and are inspected in full.
+    """
+    def __init__(self, entries=(), positions=None):
+        """
+        :param entries: adapter entries
+        :param positions: dict of (driver name, adapter index): position in entries
+        """
+        super(RAIDSection, self).__init__(entries)
+        self.positions = dict(positions or {})
+
+
+def inspect_adapters(targets, max_workers=MAX_WORKERS, adapter_timeout=ADAPTER_TIMEOUT):
+    """
+    Inspects adapters concurrently
+
+    :param targets: list of (driver, adapter index)
+    :param max_workers: Number of adapters inspected at the same time
+    :param adapter_timeout: Seconds after which an adapter is reported as errored
+    :return: list of adapter entries in the order of targets
+    """
+    outcomes = _run_calls([('{} adapter {}'.format(driver.name, idx), driver.inspect_adapter,
+                            (idx,)) for driver, idx in targets],
+                          max_workers, adapter_timeout)
+
+    entries = []
+    for (driver, idx), (data, error) in zip(targets, outcomes):
+        entries.append(error and _error_entry(driver, idx, error) or data)
+    return entries
+
 
 # noinspection PyUnusedLocal
-@expose_late('raid')
-def raid_inspector(device_info):
+@expose_late('raid', wants=[], driver_type='raid')
+def raid_inspector(device_info, max_workers=MAX_WORKERS, adapter_timeout=ADAPTER_TIMEOUT):
+    """
+    Inspects every adapter of every RAID driver concurrently. Adapters are reported in driver
+    order, then adapter order. An adapter which fails or times out is reported as
+    {'driver': name, 'adapter_index': index, 'error': message}
+
+    :param max_workers: Number of adapters inspected at the same time
+    :param adapter_timeout: Seconds after which an adapter, or the enumeration of a driver's
+        adapters, is reported as errored
+    :return: RAIDSection
+    """
     drivers = get_subsystem_drivers('raid')
 
     if not drivers:
         return
 
-    _inspected = list()
+    enumerated = _run_calls([('{} adapters'.format(driver.name), driver.get_adapter_indexes, ())
+                             for driver in drivers],
+                            max_workers, adapter_timeout)
 
-    for driver in drivers:
+    # (driver, adapter index, error), index is None for drivers inspected as a whole
+    targets = []
+    calls = []
+    for driver, (indexes, error) in zip(drivers, enumerated):
         log.info('Running RAID inspector %s' % driver.name)
+        if error:
+            targets.append((driver, None, error))
+        elif indexes is None:
+            targets.append((driver, None, None))
+            calls.append((driver.name, driver.inspect, ()))
+        else:
+            for idx in indexes:
+                targets.append((driver, idx, None))
+                calls.append(('{} adapter {}'.format(driver.name, idx), driver.inspect_adapter,
+                              (idx,)))
 
-        data = driver.inspect()
+    outcomes = iter(_run_calls(calls, max_workers, adapter_timeout))
 
-        if isinstance(data, list):
+    _inspected = list()
+    positions = dict()
+    for driver, idx, error in targets:
+        if not error:
+            data, error = next(outcomes)
+        if error:
+            entry = _error_entry(driver, idx, error)
+        elif isinstance(data, list):
             _inspected += data
+            continue
         else:
-            _inspected.append(data)
+            entry = data
+
+        if idx is not None:
+            positions[(driver.name, idx)] = len(_inspected)
+        _inspected.append(entry)
 
-    return _inspected
+    return RAIDSection(_inspected, positions)
@@ -17,23 +17,223 @@
 The current device routing table
 """
 
+import logging
+import socket
+
 from . import inspector
 from mercury_agent.inspector.hwlib.iproute2 import IPRoute2
+from mercury_agent.inspector.hwlib.rtnetlink import RTNetlink
+
+log = logging.getLogger(__name__)
+
+# Tables with more routes than this are summarized, only default and connected routes are kept
+SUMMARY_THRESHOLD = 10000
+TOP_PREFIXES = 10
+
+
+def iter_routes():
+    """
+    Stream routes from rtnetlink, falling back to `ip route show` when netlink is unavailable
+    :return: A generator of route dictionaries
+    """
+    started = False
+    try:
+        for route in RTNetlink().iter_routes():
+            started = True
+            yield route
+        return
+    except (OSError, socket.error) as e:
+        if started:
+            raise
+        log.warning('rtnetlink route dump failed, falling back to ip route show: %s' % e)
+
+    for route in IPRoute2(load=False).iter_routes():
+        yield route
+
+
+def is_default_route(route):
+    return route.get('destination') == 'default'
+
+
+def is_connected_route(route):
+    return route.get('proto') == 'kernel' and route.get('type', 'unicast') == 'unicast' and \
+        'via' not in route
+
+
+def prefix_length(destination):
+    if destination == 'default':
+        return 0
+    if '/' in destination:
+        return int(destination[destination.index('/') + 1:])
+    return ':' in destination and 128 or 32
+
+
+class RouteSummary(object):
+    """
+    Accumulates route counts without keeping the routes
+    """
+    def __init__(self):
+        self.total = 0
+        self.truncated = False
+        self.defaults = 0
+        self.connected = 0
+        self.tables = {}
+        self.families = {}
+        self.protocols = {}
+        self.prefix_lengths = {}
+        self.next_hops = {}
+
+    def _add_next_hop(self, family, hop):
+        key = (family, hop.get('via', ''), hop.get('dev', ''))
+        self.next_hops[key] = self.next_hops.get(key, 0) + 1
+
+    def add(self, route):
+        get = route.get
+        family = get('family', 'inet')
+        proto = get('proto', 'boot')
+        self.total += 1
+
+        if is_default_route(route):
+            self.defaults += 1
+        if is_connected_route(route):
+            self.connected += 1
+
+        table = get('table', 'main')
+        self.tables[table] = self.tables.get(table, 0) + 1
+        self.families[family] = self.families.get(family, 0) + 1
+        self.protocols[proto] = self.protocols.get(proto, 0) + 1
+        key = (family, prefix_length(route['destination']))
+        self.prefix_lengths[key] = self.prefix_lengths.get(key, 0) + 1
+
+        # Multipath routes count once for each of their next hops
+        for hop in get('nexthops') or [route]:
+            self._add_next_hop(family, hop)
+
+    def to_dict(self, top_prefixes=TOP_PREFIXES):
+        """
+        :param top_prefixes: Number of prefix lengths and next hops reported, those carrying the
+            most routes
+        """
+        lengths = sorted(self.prefix_lengths.items(), key=lambda item: (-item[1], item[0]))
+        hops = sorted(self.next_hops.items(), key=lambda item: (-item[1], item[0]))
+
+        next_hops = []
+        for (family, via, dev), count in hops[:top_prefixes]:
+            hop = {'family': family, 'count': count}
+            if via:
+                hop['via'] = via
+            if dev:
+                hop['dev'] = dev
+            next_hops.append(hop)
+
+        return {
+            'total': self.total,
+            'truncated': self.truncated,
+            'defaults': self.defaults,
+            'connected': self.connected,
+            'tables': self.tables,
+            'families': self.families,
+            'protocols': self.protocols,
+            'prefix_lengths': [{'family': family, 'length': length, 'count': count}
+                               for (family, length), count in lengths[:top_prefixes]],
+            'next_hops': next_hops
+        }
+
+
+class RouteTable(list):
+    """
+    The routes section, with the summary of every route seen while it was collected, including
+    the routes left out of a summarized table. Sections restored from the inventory cache are
+    plain lists.
+    """
+    def __init__(self, routes=(), summary=None):
+        """
+        :param routes: route dictionaries
+        :param summary: RouteSummary
+        """
+        super(RouteTable, self).__init__(routes)
+        self.summary = summary
+
+
+def collect_routes(routes=None, summary_threshold=SUMMARY_THRESHOLD):
+    """
+    Build the routes section and its summary in a single pass. Once the table grows past the
+    threshold, only default and connected routes are kept
+    :param routes: Iterable of routes, defaults to streaming the kernel tables
+    :param summary_threshold: Number of routes above which the table is summarized
+    :return: RouteTable
+    """
+    summary = RouteSummary()
+    table = []
+    for route in routes if routes is not None else iter_routes():
+        summary.add(route)
+        if not summary.truncated:
+            table.append(route)
+            if len(table) > summary_threshold:
+                summary.truncated = True
+                table = [r for r in table if is_default_route(r) or is_connected_route(r)]
+        elif is_default_route(route) or is_connected_route(route):
+            table.append(route)
+
+    if summary.truncated:
+        log.info('Routing table has %d routes, only default and connected routes are included '
+                 'in the inventory' % summary.total)
+
+    return RouteTable(table, summary)
+
+
+def summarize_routes(routes, top_prefixes=TOP_PREFIXES):
+    """
+    :param routes: Iterable of routes
+    :param top_prefixes: Number of prefix lengths and next hops reported in the summary
+    :return: summary dictionary
+    """
+    summary = RouteSummary()
+    for route in routes:
+        summary.add(route)
+    return summary.to_dict(top_prefixes)
 
 
 @inspector.expose('routes')
-def route_inspector():
-    return IPRoute2().table
+def route_inspector(summary_threshold=SUMMARY_THRESHOLD):
+    return collect_routes(summary_threshold=summary_threshold)
+
+
+@inspector.expose_late('route_summary', wants=['routes'], driver_type=False)
+def route_summary_inspector(device_info, top_prefixes=TOP_PREFIXES):
+    """
+    Route counts for the whole routing table, collected with the routes section. `truncated` is
+    set when the routes section only holds the default and connected routes.
+    """
+    routes = device_info.get('routes')
+    if routes is None:
+        return None
+
+    summary = getattr(routes, 'summary', None)
+    if summary is None:
+        # A section restored from the inventory cache, which may have been cut down. Count the
+        # kernel tables again rather than the routes it kept
+        summary = RouteSummary()
+        for route in iter_routes():
+            summary.add(route)
+        summary.truncated = len(routes) < summary.total
+
+    return summary.to_dict(top_prefixes)
 
 
 def find_default_route(routes):
     """
+    Find the lowest metric IPv4 default route in the main table. Routes parsed from `ip route show` carry no
+    family, table or type and are assumed to be IPv4 main table unicast routes.
 
-    :param routes:
-    :return:
+    :param routes: list of route dictionaries
+    :return: The preferred default route or an empty dict
     """
     _defaults = []
     for route in routes:
+        if route.get('family', 'inet') != 'inet' or route.get('table', 'main') != 'main' or \
+                route.get('type', 'unicast') != 'unicast':
+            continue
         if route.get('destination') == 'default':
             if 'metric' not in route:
                 route['metric'] = 0
@@ -0,0 +1,36 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from mercury_agent.inspector.inspectors import expose
+from mercury_agent.inspector.hwlib.smbios import get_table
+
+
+@expose('smbios')
+def smbios_inspector():
+    """
+    Decoded SMBIOS structures: bios, system, baseboards, chassis, processors, memory devices,
+    slots and onboard devices
+    :return: dictionary or None when the SMBIOS table is not readable
+    """
+    table = get_table()
+    if table is None:
+        return None
+    return table.dump()
+
+
+if __name__ == '__main__':
+    import pprint
+
+    pprint.pprint(smbios_inspector())
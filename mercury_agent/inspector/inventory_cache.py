@@ -0,0 +1,152 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Warm start support. The last inventory is saved to local disk along with the kernel boot_id and
+a hardware fingerprint built from sysfs. When both match on the next start, the saved inventory
+can be registered immediately while a full inspection runs in the background.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+CACHE_VERSION = 1
+
+
+def _read(path):
+    try:
+        with open(path) as fp:
+            return fp.read().strip()
+    except (IOError, OSError):
+        return ''
+
+
+def _listdir(path):
+    try:
+        return sorted(os.listdir(path))
+    except (IOError, OSError):
+        return []
+
+
+def get_boot_id(path=BOOT_ID_PATH):
+    return _read(path)
+
+
+def hardware_fingerprint(sysfs_root='/sys'):
+    """
+    Build a cheap fingerprint of the hardware using only sysfs reads: PCI IDs, DMI product_uuid,
+    block device serials and physical NIC MAC addresses
+    :param sysfs_root: sysfs mount point
+    :return: sha256 hex digest
+    """
+    items = []
+
+    pci_root = os.path.join(sysfs_root, 'bus/pci/devices')
+    for slot in _listdir(pci_root):
+        items.append('pci:{}:{}'.format(slot, ':'.join(
+            _read(os.path.join(pci_root, slot, attribute)) for attribute in
+            ('vendor', 'device', 'subsystem_vendor', 'subsystem_device'))))
+
+    items.append('dmi:{}'.format(_read(os.path.join(sysfs_root, 'class/dmi/id/product_uuid'))))
+
+    block_root = os.path.join(sysfs_root, 'block')
+    for name in _listdir(block_root):
+        device = os.path.join(block_root, name, 'device')
+        items.append('block:{}:{}'.format(
+            name, _read(os.path.join(device, 'serial')) or _read(os.path.join(device, 'wwid'))))
+
+    net_root = os.path.join(sysfs_root, 'class/net')
+    for name in _listdir(net_root):
+        # Virtual interfaces come and go, only consider interfaces backed by a device
+        if not os.path.exists(os.path.join(net_root, name, 'device')):
+            continue
+        items.append('net:{}:{}'.format(name, _read(os.path.join(net_root, name, 'address'))))
+
+    return hashlib.sha256('\n'.join(items).encode('utf-8')).hexdigest()
+
+
+def normalize(device_info):
+    """
+    Round trip device_info through json so that live inventory can be compared with cached
+    inventory
+    """
+    return json.loads(json.dumps(device_info, default=str))
+
+
+class InventoryCache(object):
+    def __init__(self, path, sysfs_root='/sys', boot_id_path=BOOT_ID_PATH):
+        """
+        :param path: Location of the cache file
+        :param sysfs_root: sysfs mount point
+        :param boot_id_path: Location of the kernel boot_id
+        """
+        self.path = path
+        self.sysfs_root = sysfs_root
+        self.boot_id_path = boot_id_path
+
+    def key(self):
+        return {
+            'version': CACHE_VERSION,
+            'boot_id': get_boot_id(self.boot_id_path),
+            'fingerprint': hardware_fingerprint(self.sysfs_root)
+        }
+
+    def load(self):
+        """
+        :return: The cached device_info if the boot_id and hardware fingerprint match, otherwise
+            None
+        """
+        try:
+            with open(self.path) as fp:
+                cached = json.load(fp)
+        except (IOError, OSError):
+            log.info('No cached inventory at {}'.format(self.path))
+            return None
+        except ValueError:
+            log.warning('Cached inventory at {} is corrupt'.format(self.path))
+            return None
+
+        key = self.key()
+        if cached.get('key') != key:
+            log.info('Cached inventory is stale, boot_id or hardware has changed')
+            return None
+
+        return cached.get('device_info')
+
+    def save(self, device_info):
+        """
+        Atomically write device_info to the cache file. Failures are logged, a missing cache
+        only costs a full inspection on the next start
+        :param device_info: The inventory to save
+        :return: True on success
+        """
+        data = {'key': self.key(), 'device_info': normalize(device_info)}
+        temp_path = '{}.tmp'.format(self.path)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(temp_path, 'w') as fp:
+                json.dump(data, fp)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError) as e:
+            log.warning('Could not save inventory cache to {}: {}'.format(self.path, e))
+            return False
+        return True
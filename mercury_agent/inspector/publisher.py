@@ -0,0 +1,117 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import logging
+import threading
+
+from mercury_agent.backend_client import get_backend_client
+from mercury_agent.inspector.diff import diff, to_update, IGNORED_KEYS
+from mercury_agent.inspector.inventory_cache import normalize
+
+log = logging.getLogger(__name__)
+
+
+class InventoryPublisher(object):
+    """
+    Keeps the last device_info acknowledged by the backend and sends only the paths which have
+    changed since. If an incremental update fails, the affected sections are resent whole.
+    """
+    def __init__(self, backend_client=None):
+        """
+        :param backend_client: BackEndClient, defaults to the shared client
+        """
+        self._backend_client = backend_client
+        self.acknowledged = None
+        self.lock = threading.Lock()
+
+    @property
+    def backend_client(self):
+        if not self._backend_client:
+            self._backend_client = get_backend_client()
+        return self._backend_client
+
+    def acknowledge(self, device_info):
+        """
+        Set the baseline, call this after a successful registration
+        :param device_info: The inventory the backend has stored
+        """
+        with self.lock:
+            self.acknowledged = normalize(device_info)
+
+    def _send(self, mercury_id, update):
+        result = self.backend_client.update(mercury_id, update)
+        if isinstance(result, dict) and result.get('error'):
+            log.error('Inventory update failed: {}'.format(result.get('message')))
+            return False
+        return True
+
+    def publish(self, device_info, sections=None, full=False):
+        """
+        Send changes to the backend
+        :param device_info: The current inventory
+        :param sections: Limit the update to these top level sections
+        :param full: Resend the sections whole rather than as a diff
+        :return: The update which was sent, an empty dict if nothing changed or None on failure
+        """
+        current = normalize(device_info)
+        mercury_id = current['mercury_id']
+        if sections is None:
+            sections = [k for k in current if k not in IGNORED_KEYS]
+
+        with self.lock:
+            baseline = self.acknowledged or {}
+            old = dict((k, baseline[k]) for k in sections if k in baseline)
+            new = dict((k, current[k]) for k in sections if k in current)
+
+            if full or self.acknowledged is None:
+                update = dict((k, new.get(k)) for k in sections if k not in IGNORED_KEYS)
+            else:
+                update = to_update(diff(old, new), new)
+
+            if not update:
+                log.debug('Inventory has not changed')
+                return update
+
+            log.info('Sending inventory update: {}'.format(', '.join(sorted(update))))
+            sent = self._send(mercury_id, update)
+
+            if not sent and not full:
+                log.info('Attempting a full resync of {}'.format(', '.join(sections)))
+                update = dict((k, new.get(k)) for k in sections if k not in IGNORED_KEYS)
+                sent = self._send(mercury_id, update)
+
+            if not sent:
+                return None
+
+            if self.acknowledged is None:
+                self.acknowledged = {'mercury_id': mercury_id}
+            for k in sections:
+                if k in current:
+                    self.acknowledged[k] = current[k]
+                else:
+                    self.acknowledged.pop(k, None)
+
+            return update
+
+
+# Private
+__publisher = None
+
+
+def get_publisher():
+    global __publisher
+    if not __publisher:
+        __publisher = InventoryPublisher()
+    return __publisher
@@ -0,0 +1,243 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+RAID inventory updates after configuration changes. Capabilities which change a RAID adapter
+report the adapter they touched. The refresh waits until no change is running and none was
+requested for the settle time, so a burst of RAID tasks is merged into one refresh. Only the
+requested adapters are re-inspected and replaced in the raid section before it is published.
+"""
+
+import contextlib
+import logging
+import threading
+
+from mercury_agent.hardware.drivers import get_subsystem_drivers
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.inspectors import raid
+from mercury_agent.inspector.publisher import get_publisher
+
+log = logging.getLogger(__name__)
+
+# RAID tasks usually arrive back to back while a host is provisioned
+DEFAULT_SETTLE_SECONDS = 1.0
+
+
+class RAIDInventoryRefresher(object):
+    def __init__(self, publisher=None, settle=DEFAULT_SETTLE_SECONDS, options=None):
+        """
+        :param publisher: InventoryPublisher, defaults to the shared publisher
+        :param settle: Seconds to wait for further changes before refreshing
+        :param options: Keyword arguments of the raid inspector
+        """
+        self.publisher = publisher or get_publisher()
+        self.settle = settle
+        self.options = options or {}
+        self.pending = set()
+        self.changing = 0
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def _restart_timer(self):
+        # Called with self.lock held
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(self.settle, self._flush_quietly)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def begin_change(self):
+        """
+        Hold refreshes while a capability changes RAID configuration. Waits for a refresh which
+        is running, so adapters are never inspected part way through a change.
+        """
+        with inspect.get_section_lock('raid'):
+            with self.lock:
+                self.changing += 1
+
+    def end_change(self):
+        """A change started with begin_change is done, refresh once the settle time passes"""
+        with self.lock:
+            self.changing -= 1
+            if self.pending:
+                self._restart_timer()
+
+    def request(self, driver_name=None, adapter_index=None):
+        """
+        Schedule a refresh, the timer restarts with every request
+
+        :param driver_name: Driver owning the adapter, None refreshes every adapter
+        :param adapter_index: Adapter index within the driver, None refreshes every adapter of
+            the driver
+        """
+        with self.lock:
+            self.pending.add((driver_name, adapter_index))
+            self._restart_timer()
+
+    @staticmethod
+    def _resolve(section, pending):
+        """
+        :return: list of (driver, adapter index) or None when the whole section must be inspected
+        """
+        positions = getattr(section, 'positions', None)
+        if not positions:
+            return None
+
+        drivers = dict((driver.name, driver) for driver in get_subsystem_drivers('raid'))
+
+        targets = set()
+        for driver_name, adapter_index in pending:
+            if driver_name not in drivers:
+                return None
+            if adapter_index is None:
+                keys = [key for key in positions if key[0] == driver_name]
+            else:
+                keys = [(driver_name, adapter_index)]
+            if not keys or any(key not in positions for key in keys):
+                return None
+            targets.update(keys)
+
+        return [(drivers[name], idx) for name, idx in sorted(targets)]
+
+    def flush(self):
+        """
+        Refresh the adapters requested so far and publish the raid section. Nothing is refreshed
+        while a change is running, its end_change restarts the timer.
+        :return: The update which was sent, see InventoryPublisher.publish
+        """
+        with inspect.get_section_lock('raid'):
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                if self.changing:
+                    return {}
+                pending, self.pending = self.pending, set()
+
+            if not pending:
+                return {}
+
+            device_info = inspect.global_device_info
+            section = device_info.get('raid')
+            targets = self._resolve(section, pending)
+
+            if targets is None:
+                log.debug('RAID configuration changed, inspecting every adapter')
+                section = raid.raid_inspector(device_info, **self.options)
+                if section is None:
+                    log.warning('RAID inspector returned no data, not updating inventory')
+                    return {}
+            else:
+                log.debug('RAID configuration changed, inspecting {}'.format(', '.join(
+                    '{}:{}'.format(driver.name, idx) for driver, idx in targets)))
+                section = raid.RAIDSection(section, section.positions)
+                entries = raid.inspect_adapters(targets, **self.options)
+                for (driver, idx), entry in zip(targets, entries):
+                    section[section.positions[(driver.name, idx)]] = entry
+            device_info['raid'] = section
+
+            # The publisher sends the paths which changed, all within the refreshed adapters
+            return self.publisher.publish(device_info, sections=['raid'])
+
+    def _flush_quietly(self):
+        # noinspection PyBroadException
+        try:
+            self.flush()
+        except Exception:
+            log.exception('RAID inventory refresh failed')
+
+
+def find_adapter(driver_name, match):
+    """
+    :param driver_name: Driver owning the adapter
+    :param match: Called with each inventory entry of the driver's adapters
+    :return: The index of the first adapter matched, or None
+    """
+    section = inspect.global_device_info.get('raid') or []
+    for (name, idx), position in sorted(getattr(section, 'positions', {}).items()):
+        if name == driver_name and position < len(section) and match(section[position]):
+            return idx
+    return None
+
+
+# Private
+__refresher = None
+
+
+def get_raid_refresher(options=None):
+    """
+    :param options: Keyword arguments of the raid inspector, used when the refresher is created.
+        The agent creates it at startup, before a capability can request a refresh
+    """
+    global __refresher
+    if not __refresher:
+        __refresher = RAIDInventoryRefresher(options=options)
+    return __refresher
+
+
+def refresh_adapters(targets):
+    """
+    Request a refresh of several adapters, they are refreshed and published together
+
+    :param targets: list of (driver name, adapter index), see RAIDInventoryRefresher.request
+    """
+    refresher = get_raid_refresher()
+    for driver_name, adapter_index in targets:
+        refresher.request(driver_name, adapter_index)
+
+
+@contextlib.contextmanager
+def raid_change():
+    """
+    Hold RAID refreshes while the block changes RAID configuration, see
+    RAIDInventoryRefresher.begin_change
+    """
+    refresher = get_raid_refresher()
+    refresher.begin_change()
+    try:
+        yield
+    finally:
+        refresher.end_change()
+
+
+def refresh_on_change(target=None):
+    """
+    Decorates a capability which changes RAID configuration. Once it returns, or fails part way,
+    a refresh of the adapter it changed is requested. Back to back capabilities share a single
+    refresh.
+
+    :param target: Called with the capability arguments, returns (driver name, adapter index).
+        Either may be None, see RAIDInventoryRefresher.request. Every adapter is refreshed when
+        target is not given or fails.
+    """
+    def decorator(f):
+        def wrapped_f(*args, **kwargs):
+            with raid_change():
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    # noinspection PyBroadException
+                    try:
+                        driver_name, adapter_index = target and target(*args, **kwargs) or \
+                            (None, None)
+                    except Exception:
+                        log.exception('Could not determine the adapter changed by {}'.format(
+                            f.__name__))
+                        driver_name, adapter_index = None, None
+                    refresh_adapters([(driver_name, adapter_index)])
+        wrapped_f.__name__ = f.__name__
+        wrapped_f.__doc__ = f.__doc__
+        return wrapped_f
+    return decorator
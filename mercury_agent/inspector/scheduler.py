@@ -0,0 +1,178 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import heapq
+import logging
+import random
+import threading
+import time
+
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.inspectors import inspectors, late_inspectors
+from mercury_agent.inspector.publisher import get_publisher
+
+log = logging.getLogger(__name__)
+
+# Seconds between refreshes, inspectors which are not listed are not refreshed
+DEFAULT_INTERVALS = {
+    'mem': 300,
+    'interfaces': 300,
+    'routes': 300,
+    'route_summary': 300,
+    'os_storage': 900,
+    'cpu': 3600,
+    'dmi': 86400,
+    'smbios': 86400,
+    'pci': 21600,
+    'raid': 21600,
+    'bmc': 21600
+}
+
+DEFAULT_JITTER = 0.1
+
+# Delay before retrying an inspector which was skipped because its section was busy
+BUSY_RETRY_SECONDS = 60
+
+# Holder of the serial lock while an inspector is refreshed
+REFRESH_TASK_ID = 'inspector_refresh'
+
+# Sections read with the tools serial capabilities use to change the hardware. Their refresh
+# holds the serial lock, the others only hold their section lock.
+SERIAL_SECTIONS = ('raid', 'bmc')
+
+
+class InspectorScheduler(object):
+    """
+    Re-runs individual inspectors on their own jittered intervals and publishes the sections
+    which changed. Each refresh holds its section lock. Refreshes of SERIAL_SECTIONS also hold
+    the serial lock, so they never overlap a serial capability, and a serial task arriving
+    during one is rejected as busy. A refresh which finds either lock held is retried later.
+    """
+    def __init__(self, serial_lock, intervals=None, jitter=DEFAULT_JITTER, publisher=None,
+                 clock=time.monotonic, options=None):
+        """
+        :param serial_lock: AgentService.serial_lock
+        :param intervals: dict of inspector name: seconds. A false interval disables the refresh
+        :param jitter: Fraction of the interval used to spread refreshes
+        :param publisher: InventoryPublisher, defaults to the shared publisher
+        :param clock: monotonic clock
+        :param options: dict of inspector name: keyword arguments passed to the inspector
+        """
+        self.serial_lock = serial_lock
+        self.intervals = dict((k, v) for k, v in (intervals or DEFAULT_INTERVALS).items() if v)
+        self.jitter = jitter
+        self.publisher = publisher or get_publisher()
+        self.clock = clock
+        self.options = options or {}
+
+        self.functions = dict(inspectors)
+        self.late_functions = dict(late_inspectors)
+
+        for name in list(self.intervals):
+            if name not in self.functions and name not in self.late_functions:
+                log.warning('Refresh interval set for unknown inspector: {}'.format(name))
+                del self.intervals[name]
+
+        self.queue = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _delay(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def schedule(self, name, seconds):
+        heapq.heappush(self.queue, (self.clock() + self._delay(seconds), name))
+
+    def refresh(self, name):
+        """
+        Run a single inspector and publish its section if it changed
+        :param name: inspector name
+        :return: True if the inspector ran, False if it was skipped because of a serial task or
+            an update of the same section
+        """
+        serial = name in SERIAL_SECTIONS
+        if serial and not self.serial_lock.acquire(REFRESH_TASK_ID):
+            log.debug('Serial task {} is running, deferring {} refresh'.format(
+                self.serial_lock.task_id, name))
+            return False
+
+        try:
+            return self._refresh(name)
+        finally:
+            if serial:
+                self.serial_lock.release()
+
+    def _refresh(self, name):
+        lock = inspect.get_section_lock(name)
+        if not lock.acquire(False):
+            log.debug('Section {} is being updated, deferring its refresh'.format(name))
+            return False
+
+        try:
+            return self._inspect(name)
+        finally:
+            lock.release()
+
+    def _inspect(self, name):
+        log.debug('Refreshing inspector: {}'.format(name))
+        kwargs = self.options.get(name) or {}
+        if name in self.functions:
+            data = self.functions[name](**kwargs)
+        else:
+            data = self.late_functions[name](dict(inspect.global_device_info), **kwargs)
+
+        if data is None:
+            # Inspectors return None when they fail, keep the last good data
+            log.warning('Inspector {} returned no data, not updating inventory'.format(name))
+            return True
+
+        inspect.global_device_info[name] = data
+        self.publisher.publish(inspect.global_device_info, sections=[name])
+        return True
+
+    def run_pending(self):
+        """
+        Run every inspector which is due
+        :return: Seconds until the next inspector is due
+        """
+        while self.queue and self.queue[0][0] <= self.clock():
+            _, name = heapq.heappop(self.queue)
+            # noinspection PyBroadException
+            try:
+                ran = self.refresh(name)
+            except Exception:
+                log.exception('Unhandled error refreshing {}'.format(name))
+                ran = True
+            self.schedule(name, ran and self.intervals[name] or BUSY_RETRY_SECONDS)
+
+        if not self.queue:
+            return None
+        return max(0, self.queue[0][0] - self.clock())
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.stop_event.wait(self.run_pending())
+
+    def start(self):
+        for name, interval in self.intervals.items():
+            self.schedule(name, interval)
+        log.info('Starting inspector refresh scheduler: {}'.format(
+            ', '.join('{}={}s'.format(k, v) for k, v in sorted(self.intervals.items()))))
+        self.thread = threading.Thread(target=self._run, name='inspector_scheduler')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
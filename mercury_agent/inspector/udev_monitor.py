@@ -0,0 +1,268 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""
+Event driven inventory updates. A long running udev monitor maps block, net and pci events to
+the affected inventory section and re-inspects only the device which changed.
+"""
+
+import contextlib
+import logging
+import threading
+import time
+
+import netifaces
+
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.hwlib import lspci
+from mercury_agent.inspector.hwlib.udev import UDevHelper
+from mercury_agent.inspector.inspectors.interfaces import inspect_interface
+from mercury_agent.inspector.hwlib.block import BlockDevices, PropertyFilter
+from mercury_agent.inspector.inspectors.os_storage import DEFAULT_PROPERTIES, \
+    inspect_storage_device, is_valid_storage_device
+from mercury_agent.inspector.publisher import get_publisher
+
+log = logging.getLogger(__name__)
+
+SUBSYSTEM_SECTIONS = {
+    'block': 'os_storage',
+    'net': 'interfaces',
+    'pci': 'pci'
+}
+
+# Hot plug produces bursts of events, wait this long for the burst to settle before publishing
+DEFAULT_SETTLE_SECONDS = 0.2
+
+
+def normalize_slot(slot):
+    """lspci omits the PCI domain when it is 0000, udev does not"""
+    if slot and slot.count(':') == 1:
+        return '0000:' + slot
+    return slot
+
+
+def _refresh_multipath_maps(section, block_devices):
+    """
+    Re-read the paths of every multipath map and drop the paths from the section, they are only
+    reported under their map
+    """
+    paths = set()
+    for devname, entry in list(section.items()):
+        if 'paths' not in entry:
+            continue
+        entry = dict(entry)
+        entry['paths'] = ['/dev/' + slave for slave in
+                          block_devices.get_slaves(devname.rpartition('/')[2])]
+        section[devname] = entry
+        paths.update(entry['paths'])
+
+    for path in paths:
+        section.pop(path, None)
+
+
+def refresh_storage_device(device_info, device, action, properties=DEFAULT_PROPERTIES):
+    """
+    Disks are read through BlockDevices, as os_storage_inspector does, so multipath maps keep
+    their paths and other device mapper devices are left out
+    :param properties: see os_storage_inspector
+    :return: The updated os_storage section or None if the event is not relevant
+    """
+    if device.device_type != 'disk':
+        return None
+
+    section = dict(device_info.get('os_storage') or {})
+
+    try:
+        block_devices = BlockDevices()
+    except OSError as e:
+        log.debug('Using pyudev properties for {}: {}'.format(device.sys_name, e))
+        return _refresh_udev_storage_device(section, device, action, properties)
+
+    original = dict(section)
+    section.pop(device.get('DEVNAME') or '/dev/' + device.sys_name, None)
+    if action != 'remove':
+        entry = block_devices.get_device(device.sys_name, is_valid=is_valid_storage_device)
+        if entry is not None:
+            section[entry['DEVNAME']] = PropertyFilter(properties)(entry)
+
+    # A path joining or leaving a map changes the map's paths, not only its own entry
+    _refresh_multipath_maps(section, block_devices)
+
+    if section == original:
+        return None
+    return section
+
+
+def _refresh_udev_storage_device(section, device, action, properties):
+    """
+    Hosts without a udev database, the event's own properties are used
+    """
+    devname = device.get('DEVNAME')
+
+    if action == 'remove':
+        if devname not in section:
+            return None
+        del section[devname]
+    elif UDevHelper.is_valid_storage_device(device, fc_enabled=True, loop_enabled=False):
+        devname, entry = inspect_storage_device(device, PropertyFilter(properties))
+        section[devname] = entry
+    else:
+        return None
+
+    return section
+
+
+def refresh_interface(device_info, device, action):
+    """
+    :return: The updated interfaces section or None if the event is not relevant
+    """
+    name = device.sys_name
+    removed = [name]
+    if action == 'move' and device.get('INTERFACE_OLD'):
+        removed.append(device.get('INTERFACE_OLD'))
+
+    interfaces = list(device_info.get('interfaces') or [])
+    position = None
+    for idx in reversed(range(len(interfaces))):
+        if interfaces[idx]['devname'] in removed:
+            position = idx
+            del interfaces[idx]
+
+    if action != 'remove' and UDevHelper.is_ethernet_device(device):
+        _iface = inspect_interface(name, [device], netifaces.gateways())
+        if _iface:
+            if position is None:
+                interfaces.append(_iface)
+            else:
+                interfaces.insert(position, _iface)
+    elif position is None:
+        return None
+
+    return interfaces
+
+
+def refresh_pci_device(device_info, device, action):
+    """
+    :return: The updated pci section or None if the event is not relevant
+    """
+    slot = normalize_slot(device.sys_name)
+    devices = [d for d in device_info.get('pci') or [] if normalize_slot(d['slot']) != slot]
+
+    if action != 'remove':
+        devices += lspci.get_pci_devices(slot=slot)
+
+    devices.sort(key=lambda d: normalize_slot(d['slot']))
+    return devices
+
+
+REFRESH_HANDLERS = {
+    'os_storage': refresh_storage_device,
+    'interfaces': refresh_interface,
+    'pci': refresh_pci_device
+}
+
+
+class UDevInventoryMonitor(object):
+    def __init__(self, publisher=None, settle=DEFAULT_SETTLE_SECONDS, monitor=None, options=None):
+        """
+        :param publisher: InventoryPublisher, defaults to the shared publisher
+        :param settle: Seconds to wait for related events before publishing
+        :param monitor: pyudev.Monitor, a new netlink monitor is created by default
+        :param options: dict of inspector name: keyword arguments, passed to the refresh handler
+            of the inspector's section
+        """
+        self.publisher = publisher or get_publisher()
+        self.options = options or {}
+        self.settle = settle
+        self.monitor = monitor or UDevHelper().get_monitor()
+        for subsystem in SUBSYSTEM_SECTIONS:
+            self.monitor.filter_by(subsystem)
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def handle(self, device):
+        """
+        Update global_device_info for a single udev event
+        :param device: pyudev.Device
+        :return: The name of the section which changed or None
+        """
+        section_name = SUBSYSTEM_SECTIONS.get(device.subsystem)
+        if not section_name:
+            return None
+
+        log.debug('udev event: {} {} {}'.format(device.action, device.subsystem, device.sys_name))
+
+        # The scheduler may be replacing the same section
+        with inspect.get_section_lock(section_name):
+            # noinspection PyBroadException
+            try:
+                section = REFRESH_HANDLERS[section_name](inspect.global_device_info, device,
+                                                         device.action,
+                                                         **(self.options.get(section_name) or {}))
+            except Exception:
+                log.exception('Failed to refresh {} for {}'.format(section_name, device.sys_name))
+                return None
+
+            if section is None:
+                return None
+
+            inspect.global_device_info[section_name] = section
+        return section_name
+
+    def process(self, timeout=1.0):
+        """
+        Wait for an event, collect any that follow within the settle time and publish the
+        changed sections
+        :return: The sections which were published
+        """
+        device = self.monitor.poll(timeout=timeout)
+        if device is None:
+            return []
+
+        changed = set([self.handle(device)])
+        deadline = time.monotonic() + self.settle
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            device = self.monitor.poll(timeout=remaining)
+            if device is None:
+                break
+            changed.add(self.handle(device))
+
+        changed.discard(None)
+        if changed:
+            log.info('Hardware change detected, updating {}'.format(', '.join(sorted(changed))))
+            with contextlib.ExitStack() as stack:
+                # Always taken in the same order
+                for section_name in sorted(changed):
+                    stack.enter_context(inspect.get_section_lock(section_name))
+                self.publisher.publish(inspect.global_device_info, sections=sorted(changed))
+        return sorted(changed)
+
+    def _run(self):
+        self.monitor.start()
+        while not self.stop_event.is_set():
+            self.process()
+
+    def start(self):
+        log.info('Starting udev inventory monitor')
+        self.thread = threading.Thread(target=self._run, name='udev_inventory_monitor')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
@@ -21,7 +21,7 @@ from mercury_agent.capabilities import capability
 from mercury_agent.hardware.platform_detection import is_dell
 from mercury_agent.inspector.inspect import global_device_info
 from mercury.common.exceptions import MercuryFirmwareException
-from mercury.common.helpers.util import extract_tar_archive, download_file, cli, xml_to_dict
+from mercury.common.helpers import cli
 
 
 log = logging.getLogger(__name__)
@@ -98,6 +98,9 @@ def get_return_code_status(ret):
 
 
 def run_cmd_and_parse_xml(cmd, xml_element):
+    # helpers.util imports lxml and requests, defer until a capability needs it
+    from mercury.common.helpers.util import xml_to_dict
+
     result = cli.run(cmd).stdout
     return xml_to_dict(result, xml_element)
 
@@ -251,6 +254,8 @@ def dell_update_firmware(url, dry_run=False):
      :param url: Full URL to the package containing firmware files
      :param dry_run: If firmware updates should be applied when found
     """
+    from mercury.common.helpers.util import download_file, extract_tar_archive
+
     download_path = '/tmp/dell_firmware.tar.gz'
 
     download_file(url, download_path)
@@ -18,9 +18,6 @@ import glob
 import logging
 import os
 
-import lxml
-import requests
-
 from mercury_agent.capabilities import capability
 from mercury_agent.inspector.inspect import global_device_info
 from mercury.common.exceptions import HPFirmwareException
@@ -54,8 +51,9 @@ def _extract(tarball_path, extract_path):
 
 
 def parse_fw_report(xml_file):
-    # noinspection PyUnresolvedReferences
-    fw_tree = lxml.etree.parse(xml_file)
+    from lxml import etree
+
+    fw_tree = etree.parse(xml_file)
     # For checking needs_install XML tag is present or not
     component_list = parse_xml_for_components(fw_tree, 'needs_install')
     component_list += parse_xml_for_components(fw_tree, 'already_installed')
@@ -248,6 +246,8 @@ def hp_update_firmware(url=None, dry_run=False):
     :param url: Full URL to the package containing firmware files
     :param dry_run: If firmware updates should be applied when found
     """
+    import requests
+
     try:
         r = requests.get(url, stream=True, verify=False)
     except requests.RequestException as err:
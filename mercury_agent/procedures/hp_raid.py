@@ -18,10 +18,8 @@ import logging
 from mercury.common.exceptions import MercuryUserError
 
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
 from mercury_agent.hardware.drivers.drivers import driver_class_cache
-from mercury_agent.inspector.inspect import global_device_info
-from mercury_agent.inspector.inspectors.raid import raid_inspector
+from mercury_agent.inspector.raid_refresh import find_adapter, refresh_on_change
 
 
 log = logging.getLogger(__name__)
@@ -40,23 +38,10 @@ def has_hp_raid_driver():
     return bool(driver_class_cache.get('hpssa'))
 
 
-def update_inventory():
-    backend_client = get_backend_client()
-    raid_info = raid_inspector(global_device_info)
-    mercury_id = global_device_info['mercury_id']
-
-    log.debug('RAID configuration changed, updating inventory')
-    backend_client.update(mercury_id, {'raid': raid_info})
-
-
-def update_on_change(f):
-    def wrapped_f(*args, **kwargs):
-        result = f(*args, **kwargs)
-        update_inventory()
-        return result
-    wrapped_f.__name__ = f.__name__
-    wrapped_f.__doc__ = f.__doc__
-    return wrapped_f
+# noinspection PyUnusedLocal
+def changed_slot(slot, *args, **kwargs):
+    return 'hpssa', find_adapter(
+        'hpssa', lambda adapter: str(adapter.get('vendor_info', {}).get('slot')) == str(slot))
 
 
 @capability('hpssa_create_array',
@@ -66,7 +51,7 @@ def update_on_change(f):
             dependency_callback=has_hp_raid_driver,
             timeout=120
             )
-@update_on_change
+@refresh_on_change(changed_slot)
 def hpssa_create_array(slot, selection, raid, array_letter=None, array_type='ld', size='max',
                        stripe_size='default', write_policy='writeback', sectors=32, caching=True,
                        data_ld=None, parity_init_method='default'):
@@ -119,7 +104,7 @@ def hpssa_create_array(slot, selection, raid, array_letter=None, array_type='ld'
 @capability('hpssa_delete_ld', description='Delete a logical drive on a given controller',
             kwarg_names=['slot', 'logical_drive'], serial=True,
             dependency_callback=has_hp_raid_driver, timeout=120)
-@update_on_change
+@refresh_on_change(changed_slot)
 def hpssa_delete_ld(slot, logical_drive):
     """
     Delete a logical drive
@@ -136,7 +121,7 @@ def hpssa_delete_ld(slot, logical_drive):
 @capability('hpssa_clear_configuration', description='Delete all arrays on a given controller',
             kwarg_names=['slot'], serial=True, dependency_callback=has_hp_raid_driver,
             timeout=120)
-@update_on_change
+@refresh_on_change(changed_slot)
 def hpssa_clear_configuration(slot):
     """
     Delete all arrays on a given controller
@@ -154,7 +139,7 @@ def hpssa_clear_configuration(slot):
             serial=True,
             dependency_callback=has_hp_raid_driver,
             timeout=120)
-@update_on_change
+@refresh_on_change(lambda: ('hpssa', None))
 def hpssa_clear_configurations_all_controllers():
     """
     Nuke it from orbit. It's the only way to be sure
@@ -170,7 +155,7 @@ def hpssa_clear_configurations_all_controllers():
             dependency_callback=has_hp_raid_driver,
             kwarg_names=['slot', 'selection'],
             timeout=120)
-@update_on_change
+@refresh_on_change(changed_slot)
 def hpssa_add_spares(slot, selection, array_letters=None):
     """
 
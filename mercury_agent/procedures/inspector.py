@@ -14,13 +14,23 @@
 #    limitations under the License.
 
 from mercury_agent.capabilities import capability
+from mercury_agent.configuration import get_configuration, get_inspector_options
 from mercury_agent.inspector import inspect
+from mercury_agent.inspector.publisher import get_publisher
 
 
-@capability('inspector', description='Run inspector')
-def inspector():
+@capability('inspector', description='Run inspector', kwarg_names=['diff'])
+def inspector(diff=False):
     """
-    Manually run inspectors
+    Manually run inspectors and send changes to the backend
+    :param diff: Return the update which was sent rather than the complete device_info
     :return: results
     """
-    return inspect.inspect()
+    # Inspect with the same options as the startup inspection and the refresh scheduler
+    configuration = get_configuration()
+    device_info = inspect.inspect(max_workers=configuration.agent.inspector.max_workers,
+                                  options=get_inspector_options(configuration))
+    update = get_publisher().publish(device_info)
+    if diff:
+        return {'update': update}
+    return device_info
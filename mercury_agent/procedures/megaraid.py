@@ -16,10 +16,8 @@
 import logging
 
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
 from mercury_agent.hardware.drivers.drivers import driver_class_cache
-from mercury_agent.inspector.inspect import global_device_info
-from mercury_agent.inspector.inspectors.raid import raid_inspector
+from mercury_agent.inspector.raid_refresh import refresh_on_change
 
 
 log = logging.getLogger(__name__)
@@ -33,23 +31,13 @@ def has_megaraid_driver():
     return bool(get_megaraid_driver())
 
 
-def update_inventory():
-    backend_client = get_backend_client()
-    raid_info = raid_inspector(global_device_info)
-    mercury_id = global_device_info['mercury_id']
-
-    log.debug('RAID configuration changed, updating inventory')
-    backend_client.update(mercury_id, {'raid': raid_info})
-
-
-def update_on_change(f):
-    def wrapped_f(*args, **kwargs):
-        result = f(*args, **kwargs)
-        update_inventory()
-        return result
-    wrapped_f.__name__ = f.__name__
-    wrapped_f.__doc__ = f.__doc__
-    return wrapped_f
+# noinspection PyUnusedLocal
+def changed_controller(controller, *args, **kwargs):
+    # storcli numbers controllers in the order /call show all lists them, which is the order
+    # the driver indexes its adapters
+    if str(controller).lower() == 'all':
+        return 'megaraid_sas', None
+    return 'megaraid_sas', int(controller)
 
 
 @capability('megaraid_add',
@@ -60,7 +48,7 @@ def update_on_change(f):
             timeout=60,
             task_id_kwargs=True
             )
-@update_on_change
+@refresh_on_change(changed_controller)
 def megaraid_add(controller,
                  array_type,
                  drives,
@@ -140,7 +128,7 @@ discharged
             dependency_callback=has_megaraid_driver,
             timeout=60,
             task_id_kwargs=True)
-@update_on_change
+@refresh_on_change(changed_controller)
 def megaraid_delete(controller, virtual_drive='all'):
     """
 
@@ -19,7 +19,6 @@ import subprocess
 
 from mercury_agent.capabilities import capability
 from mercury.common.helpers.cli import run
-from mercury.common.helpers.util import download_file
 
 
 log = logging.getLogger(__name__)
@@ -94,6 +93,7 @@ def reload(kernel_url, initrd_url):
     """
     # This should look into the configuration to find the location
     # of the kernel/initrd images and download them
+    from mercury.common.helpers.util import download_file
 
     kernel_file = '/tmp/vmlinuz'
     initrd_file = '/tmp/initrd'
@@ -21,19 +21,16 @@ from mercury_agent.configuration import get_configuration
 from mercury.common.clients.rpc.backend import BackEndClient
 from mercury.common.exceptions import fancy_traceback_short, parse_exception
 
-from press.configuration.util import configuration_from_file
-from press.exceptions import PressCriticalException
-from press.log import setup_logging
-from press.plugin_init import init_plugins
-from press.press import PressOrchestrator
-from press.press_cli import parse_args
-from press.hooks.hooks import clear_hooks
+# press pulls in its orchestrator, plugins and pkg_resources. It is imported when the capability
+# is invoked rather than at agent startup
 
 
 log = logging.getLogger(__name__)
 
 
 def cleanup_thread():
+    from press.hooks.hooks import clear_hooks
+
     # Clear logging handlers!
     del logging.getLogger('press').handlers[:]
     # Clear hooks
@@ -49,6 +46,9 @@ def entry(run_configuration, mercury_press_configuration):
     mercury-agent.yaml
     :return:
     """
+    from press.plugin_init import init_plugins
+    from press.press import PressOrchestrator
+
     log.info('Initializing plugins')
     init_plugins(run_configuration,
                  mercury_press_configuration.get('plugins', {}).get(
@@ -1,11 +1,12 @@
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+
 from mercury_agent.capabilities import capability
-from mercury_agent.backend_client import get_backend_client
 from mercury_agent.hardware.drivers.drivers import get_subsystem_drivers
-from mercury_agent.hardware.raid.abstraction.api import RAIDActions
-from mercury_agent.inspector.inspect import global_device_info
-from mercury_agent.inspector.inspectors.raid import raid_inspector
+from mercury_agent.hardware.raid.abstraction.api import RAIDActions, RAIDAbstractionException
+from mercury_agent.inspector.raid_refresh import raid_change, refresh_adapters, \
+    refresh_on_change
 
 log = logging.getLogger(__name__)
 
@@ -18,23 +19,9 @@ def has_abstraction_handler():
     return False
 
 
-def update_inventory():
-    backend_client = get_backend_client()
-    raid_info = raid_inspector(global_device_info)
-    mercury_id = global_device_info['mercury_id']
-
-    log.debug('RAID configuration changed, updating inventory')
-    backend_client.update(mercury_id, {'raid': raid_info})
-
-
-def update_on_change(f):
-    def wrapped_f(*args, **kwargs):
-        result = f(*args, **kwargs)
-        update_inventory()
-        return result
-    wrapped_f.__name__ = f.__name__
-    wrapped_f.__doc__ = f.__doc__
-    return wrapped_f
+# noinspection PyUnusedLocal
+def changed_adapter(adapter, *args, **kwargs):
+    return get_subsystem_drivers('raid')[0].name, adapter
 
 
 @capability('create_logical_drive',
@@ -44,7 +31,7 @@ def update_on_change(f):
             dependency_callback=has_abstraction_handler,
             timeout=120
             )
-@update_on_change
+@refresh_on_change(changed_adapter)
 def abstract_create_logical_drive(adapter, level, drives=None, size=None, array=None):
     """
     :param adapter: Target adapter
@@ -88,7 +75,7 @@ def abstract_create_logical_drive(adapter, level, drives=None, size=None, array=
             serial=True,
             dependency_callback=has_abstraction_handler,
             timeout=120)
-@update_on_change
+@refresh_on_change(changed_adapter)
 def abstract_delete_logical_drive(adapter, array, logical_drive):
     """
     :param adapter:
@@ -106,7 +93,7 @@ def abstract_delete_logical_drive(adapter, array, logical_drive):
             serial=True,
             dependency_callback=has_abstraction_handler,
             timeout=120)
-@update_on_change
+@refresh_on_change(changed_adapter)
 def abstract_clear_configuration(adapter):
     """
     :param adapter:
@@ -122,7 +109,7 @@ def abstract_clear_configuration(adapter):
             serial=True,
             dependency_callback=has_abstraction_handler,
             timeout=120)
-@update_on_change
+@refresh_on_change(changed_adapter)
 def abstract_add_spares(adapter, drives, array=None):
     """
     :param adapter:
@@ -132,3 +119,119 @@ def abstract_add_spares(adapter, drives, array=None):
     """
     raid_driver = get_subsystem_drivers('raid')[0]
     return raid_driver.handler.add_spares(adapter, drives, array)
+
+
+def _map_adapters(f, adapters_args):
+    """
+    Calls f(*args) for each adapter concurrently
+    :param f: function
+    :param adapters_args: list of args tuples, one per adapter, starting with driver and adapter
+    :return: list of (result, error) in the order of adapters_args
+    """
+    def _call(args):
+        try:
+            return f(*args), None
+        except Exception as e:
+            log.exception('RAID layout failed on adapter {}:{}'.format(args[0].name, args[1]))
+            return None, str(e) or e.__class__.__name__
+
+    if not adapters_args:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(adapters_args)) as executor:
+        return list(executor.map(_call, adapters_args))
+
+
+def _layout_drivers(layout):
+    """
+    Resolves the driver of each adapter layout. A layout names its driver when more than one
+    driver supports the RAID abstraction, since adapter indexes are only unique within a driver.
+
+    :param layout: See apply_raid_layout
+    :return: list of drivers in the order of layout
+    """
+    drivers = [driver for driver in get_subsystem_drivers('raid')
+               if isinstance(driver.handler, RAIDActions)]
+    by_name = dict((driver.name, driver) for driver in drivers)
+
+    resolved = []
+    for entry in layout:
+        name = entry.get('driver')
+        if name is None:
+            if len(drivers) != 1:
+                raise RAIDAbstractionException(
+                    'Adapter {} must name its driver, one of {}'.format(
+                        entry['adapter'], ', '.join(sorted(by_name))))
+            resolved.append(drivers[0])
+        elif name in by_name:
+            resolved.append(by_name[name])
+        else:
+            raise RAIDAbstractionException('Unknown RAID driver {}'.format(name))
+    return resolved
+
+
+@capability('apply_raid_layout',
+            description='Validate and apply the layout of one or more adapters in a single task',
+            kwarg_names=['layout'],
+            serial=True,
+            dependency_callback=has_abstraction_handler,
+            timeout=1800)
+def apply_raid_layout(layout):
+    """
+    Every adapter is validated against a single read before any adapter is changed. Adapters are
+    then configured concurrently, and a single inventory refresh is requested for all of them.
+
+    :param layout: A list of adapter layouts. Each is `adapter`, the name of its `driver` and the
+        arguments of RAIDActions.plan_layout. `driver` may be left out when a single driver
+        supports the RAID abstraction. For example::
+
+            [
+                {'driver': 'hpssa',
+                 'adapter': 0,
+                 'logical_drives': [{'level': '1', 'drives': '0-1'}],
+                 'spares': [{'drives': '4'}]},
+                {'driver': 'megaraid_sas',
+                 'adapter': 0,
+                 'clear': True,
+                 'logical_drives': [{'level': '10', 'drives': 'unassigned'}]}
+            ]
+
+    :return: list of {'driver': name, 'adapter': index, 'results': [step results]}
+    """
+    drivers = _layout_drivers(layout)
+    targets = [(driver, entry['adapter']) for driver, entry in zip(drivers, layout)]
+    names = ['{}:{}'.format(driver.name, adapter) for driver, adapter in targets]
+    if len(set(names)) != len(names):
+        raise RAIDAbstractionException('Each adapter may only appear once in a layout')
+
+    def _plan(driver, adapter, entry):
+        options = dict(entry)
+        del options['adapter']
+        options.pop('driver', None)
+        return driver.handler.plan_layout(adapter, **options)
+
+    def _apply(driver, adapter, steps):
+        return driver.handler.apply_layout(adapter, steps)
+
+    planned = _map_adapters(_plan, [(driver, adapter, entry)
+                                    for (driver, adapter), entry in zip(targets, layout)])
+    errors = ['{}: {}'.format(name, error) for name, (_, error) in zip(names, planned) if error]
+    if errors:
+        raise RAIDAbstractionException('Invalid layout, {}'.format('; '.join(errors)))
+
+    log.info('Applying RAID layout to adapters {}'.format(names))
+    with raid_change():
+        try:
+            applied = _map_adapters(_apply, [(driver, adapter, steps)
+                                             for (driver, adapter), (steps, _)
+                                             in zip(targets, planned)])
+        finally:
+            # One refresh covers every adapter of the layout
+            refresh_adapters([(driver.name, adapter) for driver, adapter in targets])
+
+    errors = ['{}: {}'.format(name, error) for name, (_, error) in zip(names, applied) if error]
+    if errors:
+        raise RAIDAbstractionException('Layout was not fully applied, {}'.format('; '.join(errors)))
+
+    return [{'driver': driver.name, 'adapter': adapter, 'results': results}
+            for (driver, adapter), (results, _) in zip(targets, applied)]
@@ -0,0 +1,31 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from mercury_agent.capabilities import capability
+from mercury_agent.inspector.inspectors.routes import iter_routes
+
+
+@capability('route_table', description='Return the full kernel routing table',
+            kwarg_names=['family', 'table'])
+def route_table(family=None, table=None):
+    """
+    Dump the routing table, including routes left out of the summarized routes inventory
+    :param family: Only return routes of this family, inet or inet6
+    :param table: Only return routes from this table, main, local or a table number
+    :return: list of routes
+    """
+    return [route for route in iter_routes()
+            if (family is None or route.get('family', 'inet') == family) and
+            (table is None or route.get('table', 'main') == str(table))]
@@ -16,6 +16,7 @@
 import logging
 import time
 
+from mercury_agent.compression import get_registration_info
 from mercury_agent.configuration import get_configuration
 from mercury.common.exceptions import MercuryCritical, MercuryConfigurationError
 from mercury_agent.inspector.inspectors.interfaces import get_interface_by_name
@@ -101,7 +102,7 @@ def _get_port_from_config(key, default):
                                         f'proto://address:port')
 
 
-def register(rpc_backend_client, device_info, local_ip, local_ip6, capabilities):
+def register(rpc_backend_client, device_info, local_ip, local_ip6, capabilities, timeline=None):
     # There is still some confusion regarding how best to determine what ip
     # to publish. Current wisdom suggest that we find the default gateway,
     # determine the interface used for the default route, and take whatever
@@ -132,4 +133,11 @@ def register(rpc_backend_client, device_info, local_ip, local_ip6, capabilities)
         'capabilities': _serialize_capabilities(capabilities)
     }
 
+    if timeline:
+        agent_info['startup_timeline'] = timeline.to_dict()
+
+    compression = get_configuration().agent.compression
+    if not compression.disabled:
+        agent_info['compression'] = get_registration_info(compression.threshold)
+
     return rpc_backend_client.register(device_info, agent_info)
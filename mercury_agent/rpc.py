@@ -29,8 +29,10 @@ class SerialLock(object):
         self.lock = threading.Lock()
 
     def acquire(self, task_id):
-        self.task_id = task_id
-        return self.lock.acquire(False)  # don't block on acquire
+        acquired = self.lock.acquire(False)  # don't block on acquire
+        if acquired:
+            self.task_id = task_id
+        return acquired
 
     def release(self):
         self.task_id = None
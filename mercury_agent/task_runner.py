@@ -17,9 +17,10 @@ import logging
 import threading
 import time
 
-from mercury.common.clients.rpc.backend import BackEndClient
 from mercury.common.exceptions import fancy_traceback_short, parse_exception
 
+from mercury_agent.backend_client import CompressingBackEndClient
+
 log = logging.getLogger(__name__)
 
 
@@ -54,7 +55,7 @@ class TaskRunner(object):
         self.time_started = None
         self.time_completed = None
 
-        self.backend = BackEndClient(backend_url)
+        self.backend = CompressingBackEndClient(backend_url)
 
     def __management_thread(self):
         """
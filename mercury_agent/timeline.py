@@ -0,0 +1,94 @@
+# Copyright 2015 Jared Rodriguez (jared.rodriguez@rackspace.com)
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import contextlib
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Timeline(object):
+    """
+    Records monotonic start and end times for named startup phases. Offsets are relative to
+    the creation of the timeline so they can be compared across nodes
+    """
+    def __init__(self, clock=time.monotonic):
+        """
+        :param clock: monotonic clock returning seconds
+        """
+        self.clock = clock
+        self.origin = clock()
+        self.origin_wall = time.time()
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def record(self, name, start, end, category='phase'):
+        with self.lock:
+            self.entries.append({
+                'name': name,
+                'category': category,
+                'start': start,
+                'end': end
+            })
+
+    @contextlib.contextmanager
+    def phase(self, name, category='phase'):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            end = self.clock()
+            self.record(name, start, end, category)
+            log.debug('Startup {} {} took {:.3f}s'.format(category, name, end - start))
+
+    def wrap(self, name, f, category):
+        """
+        Return a callable which records the run time of f
+        :param name: entry name
+        :param f: callable
+        :param category: phase, inspector, probe, late_inspector
+        :return:
+        """
+        def timed(*args, **kwargs):
+            with self.phase(name, category):
+                return f(*args, **kwargs)
+        return timed
+
+    def to_dict(self):
+        """
+        :return: Serializable timeline with start and end offsets, in seconds, from the origin
+        """
+        with self.lock:
+            entries = sorted(self.entries, key=lambda e: e['start'])
+        return {
+            'origin': self.origin_wall,
+            'elapsed': round(self.clock() - self.origin, 6),
+            'entries': [{
+                'name': e['name'],
+                'category': e['category'],
+                'start': round(e['start'] - self.origin, 6),
+                'end': round(e['end'] - self.origin, 6),
+                'duration': round(e['end'] - e['start'], 6)
+            } for e in entries]
+        }
+
+    def log_summary(self):
+        data = self.to_dict()
+        log.info('Startup timeline, {:.3f}s elapsed'.format(data['elapsed']))
+        for e in data['entries']:
+            log.info('  {:>8.3f} - {:>8.3f} ({:.3f}s) {}: {}'.format(
+                e['start'], e['end'], e['duration'], e['category'], e['name']))
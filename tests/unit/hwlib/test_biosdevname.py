@@ -0,0 +1,189 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Module to unit test mercury_agent.inspector.hwlib.biosdevname and smbios"""
+
+import os
+import shutil
+import struct
+import tempfile
+
+import mock
+import pytest
+
+from mercury_agent.inspector.hwlib import biosdevname, smbios
+from mercury_agent.inspector.inspectors import interfaces
+from tests.unit.base import MercuryAgentUnitTest
+
+BIOSDEVNAME_DUMP = """\
+BIOS device: em1
+Kernel name: eno1
+Permanant MAC: 3c:a8:2a:0e:70:b0
+Assigned MAC : 3c:a8:2a:0e:70:b0
+Driver: igb
+Bus Info: 0000:02:00.0
+SMBIOS Device Type: Ethernet
+SMBIOS Instance: 1
+SMBIOS Enabled: True
+
+BIOS device: p2p1
+Kernel name: ens2f0
+Permanant MAC: 3c:a8:2a:0e:70:b4
+Driver: ixgbe
+Bus Info: 0000:05:00.0
+PCI Slot      : 2
+
+BIOS device:
+Kernel name: ens2f0v0
+"""
+
+
+def structure(structure_type, handle, formatted, strings=()):
+    data = smbios.HEADER.pack(structure_type, smbios.HEADER.size + len(formatted), handle) + formatted
+    if strings:
+        return data + b'\0'.join(s.encode('ascii') for s in strings) + b'\0\0'
+    return data + b'\0\0'
+
+
+def devfn(device, function):
+    return (device << 3) | function
+
+
+def system_slot(handle, slot_id, bus, device, designation):
+    formatted = struct.pack('<BBBBBHBBHBB', 1, 0xb6, 0x0d, 4, 4, slot_id, 0x0c, 0x01, 0, bus,
+                            devfn(device, 0))
+    return structure(smbios.SYSTEM_SLOT, handle, formatted, [designation])
+
+
+def onboard_device(handle, instance, bus, device, function):
+    formatted = struct.pack('<BBBHBB', 1, 0x85, instance, 0, bus, devfn(device, function))
+    return structure(smbios.ONBOARD_DEVICE, handle, formatted, ['Embedded NIC %d' % instance])
+
+
+def _link(target, name):
+    directory = os.path.dirname(name)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    os.symlink(target, name)
+
+
+class MercuryHwlibBiosdevnameUnitTests(MercuryAgentUnitTest):
+    def setUp(self):
+        super(MercuryHwlibBiosdevnameUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.table = smbios.SMBIOSTable(
+            onboard_device(0x2900, 1, 0x02, 0, 0) +
+            onboard_device(0x2901, 2, 0x02, 0, 1) +
+            # Slot 2 is described by the root port above the card
+            system_slot(0x0900, 2, 0x00, 3, 'PCIe Slot 2') +
+            # Slot 7 is empty
+            structure(smbios.SYSTEM_SLOT, 0x0901, struct.pack('<BBBBBHBBHBB', 1, 0xb6, 0x0d, 3, 4,
+                                                              7, 0x0c, 0x01, 0xffff, 0xff, 0xff),
+                      ['PCIe Slot 7']) +
+            structure(smbios.END_OF_TABLE, 0xfeff, b''))
+
+        devices = os.path.join(self.root, 'devices/pci0000:00')
+        functions = {
+            'eno1': '0000:00:01.0/0000:02:00.0',
+            'eno2': '0000:00:01.0/0000:02:00.1',
+            'ens2f0': '0000:00:03.0/0000:05:00.0',
+            'ens2f1': '0000:00:03.0/0000:05:00.1',
+            'ens2f0v0': '0000:00:03.0/0000:05:10.0',
+            'ens3': '0000:00:02.0/0000:06:00.0',
+            'ens9': '0000:00:1c.0/0000:09:00.0'
+        }
+        for interface, path in functions.items():
+            os.makedirs(os.path.join(devices, path))
+            _link(os.path.join(devices, path), os.path.join(self.root, 'class/net', interface,
+                                                            'device'))
+        os.makedirs(os.path.join(self.root, 'class/net/bond0'))
+
+        _link(os.path.join(devices, functions['ens2f0']),
+              os.path.join(devices, functions['ens2f0v0'], 'physfn'))
+        _link(os.path.join(devices, functions['ens2f0v0']),
+              os.path.join(devices, functions['ens2f0'], 'virtfn0'))
+
+        # Slot 3 is only known to the pciehp driver
+        os.makedirs(os.path.join(self.root, 'bus/pci/slots/3'))
+        with open(os.path.join(self.root, 'bus/pci/slots/3/address'), 'w') as fp:
+            fp.write('0000:06:00\n')
+
+    def test_iter_structures(self):
+        records = self.table.records(smbios.SYSTEM_SLOT)
+        assert records[0]['designation'] == 'PCIe Slot 2'
+        assert records[0]['slot_id'] == 2
+        assert records[0]['pci_address'] == '0000:00:03.0'
+        assert records[1]['pci_address'] is None
+
+        onboard = self.table.records(smbios.ONBOARD_DEVICE)
+        assert onboard[1] == {'designation': 'Embedded NIC 2', 'device_type': 'Ethernet',
+                              'enabled': True, 'instance': 2, 'pci_address': '0000:02:00.1',
+                              'handle': 0x2901}
+
+    def test_native_names(self):
+        resolver = biosdevname.SlotNameResolver(self.table, sysfs_root=self.root)
+
+        assert resolver.get_names() == {
+            'eno1': 'em1',
+            'eno2': 'em2',
+            'ens2f0': 'p2p1',
+            'ens2f1': 'p2p2',
+            'ens2f0v0': 'p2p1_0',
+            'ens3': 'p3p1',
+            'ens9': None
+        }
+        assert resolver.get_names(['ens2f1', 'bond0']) == {'ens2f1': 'p2p2', 'bond0': None}
+
+    def test_parse_dump(self):
+        assert biosdevname.parse_dump(BIOSDEVNAME_DUMP) == {
+            'eno1': 'em1',
+            'ens2f0': 'p2p1',
+            'ens2f0v0': None
+        }
+
+    @mock.patch.object(biosdevname.subprocess, 'Popen')
+    @mock.patch.object(biosdevname.SlotNameResolver, 'load')
+    def test_get_names_uses_dump(self, load_mock, popen_mock):
+        popen_mock.return_value.communicate.return_value = (BIOSDEVNAME_DUMP.encode(), b'')
+        popen_mock.return_value.returncode = 0
+
+        assert biosdevname.get_names(['eno1', 'bond0']) == {'eno1': 'em1', 'bond0': None}
+        assert popen_mock.call_count == 1
+        assert popen_mock.call_args[0][0][-1] == '-d'
+        assert not load_mock.called
+
+    @mock.patch.object(biosdevname.subprocess, 'Popen')
+    @mock.patch.object(biosdevname.SlotNameResolver, 'load')
+    def test_get_names_falls_back_to_smbios(self, load_mock, popen_mock):
+        popen_mock.side_effect = OSError(2, 'No such file or directory')
+        load_mock.return_value.get_names.return_value = {'eno1': 'em1'}
+
+        assert biosdevname.get_names(['eno1']) == {'eno1': 'em1'}
+        load_mock.return_value.get_names.assert_called_once_with(['eno1'])
+
+        popen_mock.side_effect = None
+        popen_mock.return_value.communicate.return_value = (b'', b'')
+        popen_mock.return_value.returncode = 3
+        load_mock.side_effect = IOError(13, 'Permission denied')
+        with pytest.raises(IOError):
+            biosdevname.get_names()
+
+    @mock.patch.object(biosdevname, 'get_names')
+    def test_inspector_ignores_failures(self, get_names_mock):
+        for error in (OSError(2, 'No such file or directory'), struct.error('unpack'),
+                      ValueError('bad record'), Exception('Problem running biosdevname: 1')):
+            get_names_mock.side_effect = error
+            assert interfaces.get_biosdevnames(['eno1']) == {}
@@ -14,6 +14,10 @@
 #    limitations under the License.
 """Module to unit test mercury_agent.inspector.hwlib.cpuinfo"""
 
+import os
+import shutil
+import tempfile
+
 import mock
 import pytest
 
@@ -400,6 +404,50 @@ def get_fake_cpuinfo_output(num_logical_processors=2,
     return fake_output
 
 
+def write_fake_cpu_tree(root, sockets=2, cores_per_socket=2, cpufreq=True):
+    """
+    Write /proc/cpuinfo and /sys/devices/system/cpu for a host without hyper threading
+    :return: path of the cpuinfo file
+    """
+    cpuinfo_output = ''
+    processor = 0
+    for physical_id in range(sockets):
+        for core_id in range(cores_per_socket):
+            cpuinfo_output += CPUINFO_TEMPLATE_SINGLE_CPU_ENTRY % {
+                'processor_num': processor,
+                'physical_id': physical_id,
+                'siblings': cores_per_socket,
+                'core_id': core_id,
+                'cpu_cores': cores_per_socket,
+                'apic_id': processor,
+                'flags': DEFAULT_CPU_FLAGS
+            }
+            attributes = {
+                'topology/physical_package_id': physical_id,
+                'topology/core_id': core_id
+            }
+            if cpufreq:
+                attributes.update({
+                    'cpufreq/scaling_min_freq': 1200000,
+                    'cpufreq/scaling_max_freq': 4000000,
+                    'cpufreq/scaling_cur_freq': 2000000 + processor
+                })
+            for attribute, value in attributes.items():
+                path = os.path.join(root, 'sys/devices/system/cpu/cpu%d' % processor, attribute)
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                with open(path, 'w') as fp:
+                    fp.write('%d\n' % value)
+            processor += 1
+
+    # Entries which are not processors are ignored
+    os.makedirs(os.path.join(root, 'sys/devices/system/cpu/cpuidle'))
+    path = os.path.join(root, 'cpuinfo')
+    with open(path, 'w') as fp:
+        fp.write(cpuinfo_output)
+    return path
+
+
 class MercuryHwlibCpuinfoUnitTests(MercuryAgentUnitTest):
     """Unit tests for mercury_agent.inspector.hwlib.cpuinfo"""
     @mock.patch("mercury_agent.inspector.hwlib.cpuinfo.os.path.exists")
@@ -509,3 +557,79 @@ class MercuryHwlibCpuinfoUnitTests(MercuryAgentUnitTest):
         assert speed_info[0]['current'] == 1268.115
         assert speed_info[0]['min'] == 1268.115
         assert speed_info[0]['max'] == 1268.115
+
+    def test_indexes_are_memoized(self):
+        """Indexes are built once and core_zero_index leaves physical_index intact."""
+        assert self.cpuinfo_obj.physical_index is self.cpuinfo_obj.physical_index
+        assert self.cpuinfo_obj.logical_processor_index is \
+            self.cpuinfo_obj.logical_processor_index
+
+        core_zi = self.cpuinfo_obj.core_zero_index
+        assert core_zi[0] is self.cpuinfo_obj.core_dicts[0]
+        assert len(self.cpuinfo_obj.physical_index[0]) == 12
+
+    def test_flags_are_shared(self):
+        """Identical values are stored once."""
+        flags = [core['flags'] for core in self.cpuinfo_obj.core_dicts]
+        assert all(f is flags[0] for f in flags)
+
+
+class MercuryHwlibSysFSCpuinfoUnitTests(MercuryAgentUnitTest):
+    """Unit tests for mercury_agent.inspector.hwlib.cpuinfo.SysFSCPUInfo"""
+    def setUp(self):
+        super(MercuryHwlibSysFSCpuinfoUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_topology(self):
+        cpuinfo_path = write_fake_cpu_tree(self.root)
+        info = cpuinfo.SysFSCPUInfo(sysfs_root=os.path.join(self.root, 'sys'),
+                                    cpuinfo_path=cpuinfo_path)
+
+        assert info.processor_ids == [0, 1, 2, 3]
+        assert sorted(info.physical_index) == [0, 1]
+        assert [c['core_id'] for c in info.get_cores(1)] == [0, 1]
+        assert info.total_physical_core_count == 4
+
+        leader = info.core_zero_index[1]
+        assert leader['processor'] == 2
+        assert leader['apicid'] == '2'
+        sibling = info.logical_processor_index[3][0]
+        assert sibling['apicid'] == '3'
+        assert sibling['cpu_mhz'] == leader['cpu_mhz']
+        assert sibling['flags'] is leader['flags']
+        assert sibling['model_name'] == leader['model_name']
+
+    def test_leader_missing_from_cpuinfo(self):
+        cpuinfo_path = write_fake_cpu_tree(self.root)
+        with open(cpuinfo_path) as fp:
+            blocks = fp.read().split('\n\n')
+        with open(cpuinfo_path, 'w') as fp:
+            fp.write('\n\n'.join(blocks[1:]))
+
+        info = cpuinfo.SysFSCPUInfo(sysfs_root=os.path.join(self.root, 'sys'),
+                                    cpuinfo_path=cpuinfo_path)
+
+        assert info.processor_ids == [1, 2, 3]
+        assert info.core_zero_index[0]['processor'] == 1
+        assert info.core_zero_index[0]['apicid'] == '1'
+
+    @mock.patch("mercury_agent.inspector.hwlib.cpuinfo.get_cpufreq_info")
+    def test_speed_info_uses_cached_cpufreq(self, cpufreq_info_mock):
+        cpuinfo_path = write_fake_cpu_tree(self.root)
+        info = cpuinfo.SysFSCPUInfo(sysfs_root=os.path.join(self.root, 'sys'),
+                                    cpuinfo_path=cpuinfo_path)
+
+        speed_info = info.get_physical_speed_info()
+        assert [s['current'] for s in speed_info] == [2000000, 2000002]
+        assert all(s['cpufreq_enabled'] for s in speed_info)
+        assert not cpufreq_info_mock.called
+
+    def test_missing_cpufreq(self):
+        cpuinfo_path = write_fake_cpu_tree(self.root, sockets=1, cpufreq=False)
+        info = cpuinfo.SysFSCPUInfo(sysfs_root=os.path.join(self.root, 'sys'),
+                                    cpuinfo_path=cpuinfo_path)
+
+        speed_info = info.get_physical_speed_info()
+        assert speed_info[0]['cpufreq_enabled'] is False
+        assert speed_info[0]['current'] == 1200.64
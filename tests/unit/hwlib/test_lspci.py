@@ -14,6 +14,10 @@
 #    limitations under the License.
 """Module to unit test mercury_agent.inspector.hwlib.lspci"""
 
+import json
+import os
+import tracemalloc
+
 import mock
 import pytest
 
@@ -220,9 +224,11 @@ def get_fake_pcidevice_required_args(slot='00:00.0', class_id='beef',
 
 class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
     """Unit tests for mercury_agent.inspector.hwlib.lspci"""
+    @mock.patch('mercury_agent.inspector.hwlib.lspci.parse_sysfs')
     @mock.patch('mercury_agent.inspector.hwlib.lspci.subprocess.Popen')
-    def setUp(self, popen_mock):
-        """Setup a PCIBus object for each test."""
+    def setUp(self, popen_mock, parse_sysfs_mock):
+        """Setup a PCIBus object for each test, from lspci output."""
+        parse_sysfs_mock.side_effect = OSError(2, 'No such file or directory')
         popen_mock.return_value.communicate.return_value = (
             EXAMPLE_LSPCI_OUTPUT, '')
         popen_mock.return_value.returncode = 0
@@ -252,7 +258,7 @@ class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
         lspci.PCIDevice(**test_args)
 
         # Check key absence raises.
-        for key in test_args:
+        for key in list(test_args):
             value = test_args[key]
             del test_args[key]
             with pytest.raises(lspci.LSPCIError):
@@ -351,3 +357,56 @@ class MercuryMiscLspciUnitTests(MercuryAgentUnitTest):
         """Test PCIBus.{get,has}_raid_bus[_devices]()"""
         self._membership_and_retrieval_test_helper(lspci.RAID_CONTROLLER,
                                                    'raid_bus_controller')
+
+    def test_pci_device_mapping(self):
+        """Test PCIDevice behaves like a dict"""
+        pci_device = lspci.PCIDevice(**get_fake_pcidevice_required_args())
+        expected = dict((field, None) for field in lspci.PCI_DEVICE_FIELDS)
+        expected.update(get_fake_pcidevice_required_args(),
+                        class_name='', vendor_name='', device_name='')
+        assert pci_device == expected
+        assert pci_device.get('driver', 'none') is None
+
+        pci_device.numa_node = '0'
+        pci_device['driver'] = 'igb'
+        assert pci_device['numa_node'] == '0'
+        assert pci_device.driver == 'igb'
+        assert 'numa_node' in pci_device.to_dict()
+        assert lspci.PCIDevice.__dictoffset__ == 0
+
+    def test_pcibus_indexes(self):
+        """Test PCIBus slot and id lookups"""
+        device = self.pci_bus.get_device_by_slot('0000:00:01.0')
+        assert device['device_id'] == '2f02'
+        assert self.pci_bus.get_device_by_slot('00:01.0') is device
+        assert self.pci_bus.get_devices_by_id('8086', '2f02') == [device]
+        assert self.pci_bus.get_devices_by_device_id('2f02') == [device]
+
+        self.pci_bus.remove(device)
+        assert self.pci_bus.get_device_by_slot('00:01.0') is None
+        assert self.pci_bus.get_devices_by_id('8086', '2f02') == []
+
+    def test_as_pci_bus(self):
+        """Test lists are indexed and buses are passed through"""
+        pci_data = [dict(get_fake_pcidevice_required_args(class_id=lspci.RAID_CONTROLLER))]
+        bus = lspci.as_pci_bus(pci_data)
+        assert isinstance(bus, lspci.PCIBus)
+        assert lspci.as_pci_bus(bus) is bus
+        assert bus.has_raid_bus_controller()
+
+    def test_pci_device_memory(self):
+        """Test slotted devices take less than half the memory of device dicts"""
+        with open(os.path.join(os.path.dirname(__file__), '../resources/pci_data.json')) as fp:
+            pci_data = json.load(fp) * 3
+
+        def traced(f):
+            tracemalloc.start()
+            try:
+                devices = f()
+                return tracemalloc.get_traced_memory()[0], devices
+            finally:
+                tracemalloc.stop()
+
+        slotted, _ = traced(lambda: [lspci.PCIDevice(**it) for it in pci_data])
+        dicts, _ = traced(lambda: [dict(it) for it in pci_data])
+        assert slotted * 2 < dicts
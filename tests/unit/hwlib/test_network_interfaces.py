@@ -104,3 +104,38 @@ class MercuryMiscNetworkInterfacesUnitTests(MercuryAgentUnitTest):
 
         assert net_ifs.get_ipv6_network_info('virbr0') == \
             [{'addr': 'dead:beed::1'}]
+
+    @mock.patch("netifaces.gateways")
+    @mock.patch("netifaces.ifaddresses")
+    @mock.patch("netifaces.interfaces")
+    def test_network_snapshot(self, interfaces_mock, ifaddresses_mock, gateways_mock):
+        """Tests for NetworkSnapshot."""
+        def ifaddresses(interface):
+            if interface == 'vnet0':
+                raise ValueError('You must specify a valid interface name.')
+            return fake_ifaddresses_func(interface)
+
+        interfaces_mock.return_value = FAKE_INTERFACE_LIST
+        ifaddresses_mock.side_effect = ifaddresses
+        gateways_mock.return_value = {
+            'default': {netifaces.AF_INET: ('192.168.1.1', 'eno1')},
+            netifaces.AF_INET: [('192.168.1.1', 'eno1', True)],
+            netifaces.AF_INET6: [('fe80::1', 'virbr0', False)]
+        }
+
+        network = net_ifs.NetworkSnapshot()
+
+        assert network.interfaces == FAKE_INTERFACE_LIST[1:]
+        assert interfaces_mock.call_count == 1
+        assert gateways_mock.call_count == 1
+        assert ifaddresses_mock.call_count == len(FAKE_INTERFACE_LIST) - 1
+
+        assert network.get_ipv4_network_info('eno1') == [{'addr': '192.168.1.115'}]
+        assert network.get_ipv6_network_info('virbr0') == [{'addr': 'dead:beed::1'}]
+        assert network.get_ipv4_network_info('vnet0') == []
+        assert network.get_ipv4_network_info('not_an_interface') == []
+        assert network.get_gateways('eno1') == [
+            {'gateway_ip': '192.168.1.1', 'interface': 'eno1', 'default': True}]
+        assert network.get_gateways('virbr0', netifaces.AF_INET6)[0]['gateway_ip'] == 'fe80::1'
+        assert network.get_gateways('br0') is None
+        assert interfaces_mock.call_count == 1
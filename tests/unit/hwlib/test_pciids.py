@@ -0,0 +1,142 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Module to unit test mercury_agent.inspector.hwlib.pciids and native PCI enumeration"""
+
+import os
+import shutil
+import tempfile
+
+from mercury_agent.inspector.hwlib import lspci, pciids
+from tests.unit.base import MercuryAgentUnitTest
+
+PCI_IDS = """\
+# Sample pci.ids
+103c  Hewlett-Packard Company
+8086  Intel Corporation
+\t1521  I350 Gigabit Network Connection
+\t\t103c 17d1  Ethernet 1Gb 4-port 366FLR Adapter
+\t8d62  C610/X99 series chipset SATA Controller [AHCI mode]
+# List of known device classes, subclasses and programming interfaces
+C 01  Mass storage controller
+\t06  SATA controller
+\t\t01  AHCI 1.0
+C 02  Network controller
+\t00  Ethernet controller
+C 0c  Serial bus controller
+"""
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as fp:
+        fp.write(data)
+
+
+def _pci_function(sysfs, address, class_code, vendor, device, subsystem=(0, 0), revision=0,
+                  driver=None):
+    path = os.path.join(sysfs, 'bus/pci/devices', address)
+    for attribute, value in (('class', '0x%06x' % class_code), ('vendor', '0x%04x' % vendor),
+                             ('device', '0x%04x' % device),
+                             ('subsystem_vendor', '0x%04x' % subsystem[0]),
+                             ('subsystem_device', '0x%04x' % subsystem[1]),
+                             ('revision', '0x%02x' % revision)):
+        _write(os.path.join(path, attribute), value + '\n')
+    if driver:
+        driver_path = os.path.join(sysfs, 'bus/pci/drivers', driver)
+        os.makedirs(driver_path)
+        os.symlink(driver_path, os.path.join(path, 'driver'))
+
+
+class MercuryHwlibPCIIDsUnitTests(MercuryAgentUnitTest):
+    def setUp(self):
+        super(MercuryHwlibPCIIDsUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.source = os.path.join(self.root, 'pci.ids')
+        self.index_path = os.path.join(self.root, 'cache/pci.ids.idx')
+        _write(self.source, PCI_IDS)
+
+    def test_lookup(self):
+        ids = pciids.PCIIDs.load(self.source, self.index_path)
+
+        assert ids.vendor(0x8086) == 'Intel Corporation'
+        assert ids.device(0x8086, 0x8d62) == 'C610/X99 series chipset SATA Controller [AHCI mode]'
+        assert ids.subsystem(0x8086, 0x1521, 0x103c, 0x17d1) == 'Ethernet 1Gb 4-port 366FLR Adapter'
+        assert ids.device_class(0x01, 0x06) == 'SATA controller'
+        # Unknown subclasses fall back to the class name
+        assert ids.device_class(0x0c, 0x04) == 'Serial bus controller'
+        assert ids.vendor(0x1af4) is None
+        assert ids.device(0x103c, 0x1521) is None
+
+    def test_index_is_saved_and_reused(self):
+        pciids.PCIIDs.load(self.source, self.index_path)
+        assert os.path.isfile(self.index_path)
+
+        ids = pciids.PCIIDs.load(self.source, self.index_path)
+        assert not isinstance(ids.buf, bytes)
+        assert ids.vendor(0x103c) == 'Hewlett-Packard Company'
+
+    def test_stale_index_is_rebuilt(self):
+        pciids.PCIIDs.load(self.source, self.index_path)
+        _write(self.source, PCI_IDS + '1af4  Red Hat, Inc.\n')
+
+        ids = pciids.PCIIDs.load(self.source, self.index_path)
+        assert ids.vendor(0x1af4) == 'Red Hat, Inc.'
+
+    def test_parse_sysfs(self):
+        sysfs = os.path.join(self.root, 'sys')
+        _pci_function(sysfs, '0000:00:1f.2', 0x010601, 0x8086, 0x8d62, subsystem=(0x103c, 0x8030),
+                      revision=5, driver='ahci')
+        _pci_function(sysfs, '0000:02:00.0', 0x020000, 0x8086, 0x1521, subsystem=(0x103c, 0x17d1),
+                      revision=1, driver='igb')
+        _pci_function(sysfs, '0000:03:00.0', 0x0c0400, 0x1077, 0x2031)
+        ids = pciids.PCIIDs.load(self.source, self.index_path)
+
+        devices = lspci.parse_sysfs(sysfs_root=sysfs, pci_ids=ids)
+
+        assert devices[0] == {
+            'slot': '00:1f.2',
+            'class_id': '0106',
+            'class_name': 'SATA controller',
+            'vendor_id': '8086',
+            'vendor_name': 'Intel Corporation',
+            'device_id': '8d62',
+            'device_name': 'C610/X99 series chipset SATA Controller [AHCI mode]',
+            'svendor_id': '103c',
+            'svendor_name': 'Hewlett-Packard Company',
+            'sdevice_id': '8030',
+            'sdevice_name': 'Device',
+            'revision': '05',
+            'progif': '01',
+            'driver': 'ahci'
+        }
+        assert devices[1]['sdevice_name'] == 'Ethernet 1Gb 4-port 366FLR Adapter'
+        assert devices[2] == {
+            'slot': '03:00.0',
+            'class_id': '0c04',
+            'class_name': 'Serial bus controller',
+            'vendor_id': '1077',
+            'vendor_name': 'Vendor',
+            'device_id': '2031',
+            'device_name': 'Device'
+        }
+
+        assert [d['slot'] for d in lspci.parse_sysfs(slot='0000:02:00.0', sysfs_root=sysfs,
+                                                     pci_ids=ids)] == ['02:00.0']
+        # Every function can still be built into a PCIDevice
+        for device in devices:
+            lspci.PCIDevice(**device)
@@ -0,0 +1,171 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Module to unit test mercury_agent.inspector.hwlib.rtnetlink"""
+
+import socket
+import struct
+
+import mock
+import pytest
+
+import mercury_agent.inspector.hwlib.rtnetlink as rtnl
+from mercury_agent.inspector.inspectors.routes import find_default_route
+from tests.unit.base import MercuryAgentUnitTest
+
+INTERFACES = {2: 'br0', 3: 'virbr0', 4: 'eth1'}
+
+
+def ifname(index):
+    return INTERFACES[index]
+
+
+def rtattr(rta_type, payload):
+    length = rtnl.RTATTR.size + len(payload)
+    padding = b'\0' * (((length + 3) & ~3) - length)
+    return rtnl.RTATTR.pack(length, rta_type) + payload + padding
+
+
+def u32(value):
+    return struct.pack('=I', value)
+
+
+def inet(address):
+    return socket.inet_pton(socket.AF_INET, address)
+
+
+def inet6(address):
+    return socket.inet_pton(socket.AF_INET6, address)
+
+
+def route_payload(family=socket.AF_INET, dst_len=0, table=254, protocol=4, scope=0, route_type=1, flags=0,
+                  attributes=b''):
+    return rtnl.RTMSG.pack(family, dst_len, 0, 0, min(table, 255), protocol, scope, route_type, flags) + attributes
+
+
+def message(msg_type, payload, seq=1):
+    return rtnl.NLMSG_HEADER.pack(rtnl.NLMSG_HEADER.size + len(payload), msg_type, rtnl.NLM_F_MULTI, seq,
+                                  0) + payload
+
+
+class MercuryHwlibRTNetlinkUnitTests(MercuryAgentUnitTest):
+    def test_parse_default_route(self):
+        payload = route_payload(attributes=rtattr(rtnl.RTA_TABLE, u32(254)) +
+                                rtattr(rtnl.RTA_PRIORITY, u32(425)) +
+                                rtattr(rtnl.RTA_GATEWAY, inet('192.168.1.1')) +
+                                rtattr(rtnl.RTA_OIF, u32(2)))
+
+        assert rtnl.parse_route(payload, ifname) == {
+            'destination': 'default',
+            'via': '192.168.1.1',
+            'dev': 'br0',
+            'proto': 'static',
+            'metric': '425',
+            'family': 'inet',
+            'table': 'main',
+            'type': 'unicast'
+        }
+
+    def test_parse_connected_route(self):
+        payload = route_payload(dst_len=24, protocol=2, scope=253, flags=0x10,
+                                attributes=rtattr(rtnl.RTA_DST, inet('192.168.122.0')) +
+                                rtattr(rtnl.RTA_PREFSRC, inet('192.168.122.1')) +
+                                rtattr(rtnl.RTA_OIF, u32(3)))
+
+        assert rtnl.parse_route(payload, ifname) == {
+            'destination': '192.168.122.0/24',
+            'src': '192.168.122.1',
+            'dev': 'virbr0',
+            'proto': 'kernel',
+            'scope': 'link',
+            'linkdown': True,
+            'family': 'inet',
+            'table': 'main',
+            'type': 'unicast'
+        }
+
+    def test_parse_host_route_and_extended_table(self):
+        payload = route_payload(dst_len=32, protocol=3, table=252,
+                                attributes=rtattr(rtnl.RTA_TABLE, u32(1000)) +
+                                rtattr(rtnl.RTA_DST, inet('10.0.0.1')) +
+                                rtattr(rtnl.RTA_OIF, u32(4)))
+
+        route = rtnl.parse_route(payload, ifname)
+        assert route['destination'] == '10.0.0.1'
+        assert route['table'] == '1000'
+        assert 'proto' not in route
+
+    def test_parse_inet6_multipath(self):
+        nexthops = b''
+        for ifindex, gateway in ((2, 'fe80::1'), (4, 'fe80::2')):
+            attributes = rtattr(rtnl.RTA_GATEWAY, inet6(gateway))
+            nexthops += rtnl.RTNEXTHOP.pack(rtnl.RTNEXTHOP.size + len(attributes), 0, 1, ifindex) + attributes
+
+        payload = route_payload(family=socket.AF_INET6, protocol=186,
+                                attributes=rtattr(rtnl.RTA_PRIORITY, u32(20)) +
+                                rtattr(rtnl.RTA_MULTIPATH, nexthops))
+
+        route = rtnl.parse_route(payload, ifname)
+        assert route['family'] == 'inet6'
+        assert route['proto'] == 'bgp'
+        assert route['nexthops'] == [
+            {'dev': 'br0', 'via': 'fe80::1', 'weight': '2'},
+            {'dev': 'eth1', 'via': 'fe80::2', 'weight': '2'}
+        ]
+
+    def test_cloned_routes_are_skipped(self):
+        payload = route_payload(family=socket.AF_INET6, dst_len=128, flags=rtnl.RTM_F_CLONED,
+                                attributes=rtattr(rtnl.RTA_DST, inet6('2001:db8::1')))
+        assert rtnl.parse_route(payload, ifname) is None
+
+    def test_iter_messages(self):
+        first = route_payload(attributes=rtattr(rtnl.RTA_OIF, u32(2)))
+        data = message(rtnl.RTM_NEWROUTE, first) + message(rtnl.NLMSG_DONE, u32(0))
+
+        messages = list(rtnl.iter_messages(data))
+        assert [m[0] for m in messages] == [rtnl.RTM_NEWROUTE, rtnl.NLMSG_DONE]
+        assert messages[0][3] == first
+
+    def test_dump_reads_until_done(self):
+        payload = route_payload(attributes=rtattr(rtnl.RTA_OIF, u32(2)))
+        sock = mock.MagicMock()
+        sock.recv.side_effect = [
+            message(rtnl.RTM_NEWROUTE, payload) + message(rtnl.RTM_NEWROUTE, payload, seq=99),
+            message(rtnl.RTM_NEWROUTE, payload) + message(rtnl.NLMSG_DONE, u32(0))
+        ]
+
+        with mock.patch.object(rtnl.socket, 'socket', return_value=sock):
+            reader = rtnl.RTNetlink(families=(socket.AF_INET,))
+            reader.ifname = ifname
+            table = reader.get_table()
+
+        assert len(table) == 2
+        assert sock.close.called
+
+    def test_dump_raises_on_error(self):
+        sock = mock.MagicMock()
+        sock.recv.return_value = message(rtnl.NLMSG_ERROR, struct.pack('=i', -13))
+
+        with mock.patch.object(rtnl.socket, 'socket', return_value=sock):
+            with pytest.raises(OSError):
+                rtnl.RTNetlink(families=(socket.AF_INET,)).get_table()
+
+    def test_find_default_route_ignores_other_tables(self):
+        routes = [
+            {'destination': 'default', 'via': 'fd00::1', 'family': 'inet6', 'table': 'main', 'metric': '1'},
+            {'destination': 'default', 'via': '10.0.0.1', 'family': 'inet', 'table': '100', 'metric': '1'},
+            {'destination': 'default', 'family': 'inet', 'table': 'main', 'type': 'unreachable'},
+            {'destination': 'default', 'via': '192.168.1.1', 'family': 'inet', 'table': 'main', 'metric': '425'}
+        ]
+        assert find_default_route(routes)['via'] == '192.168.1.1'
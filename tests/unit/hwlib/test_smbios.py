@@ -0,0 +1,148 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Module to unit test mercury_agent.inspector.hwlib.smbios"""
+
+import struct
+
+import mock
+
+from mercury_agent.inspector.hwlib import smbios
+from mercury_agent.inspector.inspectors import dmi, mem
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.hwlib.test_biosdevname import structure
+
+UUID = b'\x44\x45\x4c\x4c\x4d\x00\x10\x38\x80\x4e\xb2\xc0\x4f\x56\x31\x32'
+
+
+def memory_device(handle, size, locator, extended_size=0, speed=2400):
+    formatted = struct.pack('<HHHHHBBBBBHHBBBBBIH', 0x1000, 0xfffe, 72, 64, size, 9, 0, 1, 2, 26,
+                            0x80, speed, 3, 4, 0, 5, 2, extended_size, speed)
+    return structure(smbios.MEMORY_DEVICE, handle, formatted,
+                     [locator, 'NODE 1', 'Samsung', '1234ABCD', 'M393A4K40CB2-CTD'])
+
+
+BIOS_STRUCTURE = structure(smbios.BIOS, 0x0000, struct.pack('<BBHBBQ', 1, 2, 0xf000, 3, 0xff, 0),
+                           ['Dell Inc.', '2.4.3', '01/17/2017'])
+
+SMBIOS_TABLE = (
+    BIOS_STRUCTURE +
+    structure(smbios.SYSTEM, 0x0100, struct.pack('<BBBB', 1, 2, 0, 3) + UUID + struct.pack('<BBB', 6, 4, 5),
+              ['Dell Inc.', 'PowerEdge R630', 'FGY8Q32', 'SKU=NotProvided', 'PowerEdge']) +
+    structure(smbios.BASEBOARD, 0x0200, struct.pack('<BBBBB', 1, 2, 3, 4, 0),
+              ['Dell Inc.', '02C2CP', 'A03', '/FGY8Q32/CN747516A602KY/']) +
+    structure(smbios.CHASSIS, 0x0300, struct.pack('<BBBBB', 1, 0x17, 0, 2, 0),
+              ['Dell Inc.', 'FGY8Q32']) +
+    structure(smbios.PROCESSOR, 0x0400,
+              struct.pack('<BBBB8sBBHHHBBHHHBBBBBBHHHHH', 1, 3, 0xb3, 2, b'\0' * 8, 3, 0x8a, 8000,
+                          4000, 2400, 0x41, 0x06, 0x0700, 0x0701, 0x0702, 0, 0, 0, 24, 24, 48,
+                          0x00fc, 0xb3, 24, 24, 48),
+              ['CPU1', 'Intel', 'Intel(R) Xeon(R) CPU E5-2680 v3 @ 2.50GHz']) +
+    memory_device(0x1100, 16384, 'A1') +
+    memory_device(0x1101, 0, 'A2', speed=0) +
+    memory_device(0x1102, 0x7fff, 'A3', extended_size=65536) +
+    structure(smbios.END_OF_TABLE, 0x7f00, b'')
+)
+
+
+class MercuryHwlibSMBIOSUnitTests(MercuryAgentUnitTest):
+    def setUp(self):
+        super(MercuryHwlibSMBIOSUnitTests, self).setUp()
+        self.table = smbios.SMBIOSTable(SMBIOS_TABLE)
+
+    def test_system_records(self):
+        assert self.table.first(smbios.BIOS) == {
+            'vendor': 'Dell Inc.', 'version': '2.4.3', 'release_date': '01/17/2017',
+            'rom_size': 16 * 1048576, 'handle': 0x0000
+        }
+        system = self.table.first(smbios.SYSTEM)
+        assert system['uuid'] == '4c4c4544-004d-3810-804e-b2c04f563132'
+        assert system['family'] == 'PowerEdge'
+        assert system['sku_number'] == 'SKU=NotProvided'
+        assert self.table.first(smbios.CHASSIS)['type'] == 'Rack Mount Chassis'
+        assert self.table.first(smbios.BASEBOARD)['asset_tag'] is None
+
+    def test_processor(self):
+        processor = self.table.first(smbios.PROCESSOR)
+        assert processor['version'] == 'Intel(R) Xeon(R) CPU E5-2680 v3 @ 2.50GHz'
+        assert processor['current_speed'] == 2400
+        assert processor['populated'] is True
+        assert processor['status'] == 'Enabled'
+        assert processor['core_count'] == 24
+        assert processor['thread_count'] == 48
+        assert processor['serial_number'] is None
+
+    def test_memory_devices(self):
+        devices = self.table.records(smbios.MEMORY_DEVICE)
+        assert devices[0]['size'] == 16 * 1024 ** 3
+        assert devices[0]['memory_type'] == 'DDR4'
+        assert devices[0]['form_factor'] == 'DIMM'
+        assert devices[0]['locator'] == 'A1'
+        assert devices[0]['speed'] == 2400
+        assert devices[0]['part_number'] == 'M393A4K40CB2-CTD'
+        assert devices[1]['installed'] is False
+        assert devices[1]['speed'] is None
+        assert devices[2]['size'] == 64 * 1024 ** 3
+
+    def test_dmi_attributes(self):
+        attributes = self.table.dmi_attributes()
+        assert attributes['product_uuid'] == '4c4c4544-004d-3810-804e-b2c04f563132'
+        assert attributes['chassis_type'] == '23'
+        assert attributes['board_serial'] == '/FGY8Q32/CN747516A602KY/'
+        assert 'board_asset_tag' not in attributes
+
+    def test_uuid_byte_order(self):
+        """Test tables older than SMBIOS 2.6 keep the uuid in network order"""
+        table = smbios.SMBIOSTable(SMBIOS_TABLE, version=(2, 5))
+        assert table.first(smbios.SYSTEM)['uuid'] == '44454c4c-4d00-1038-804e-b2c04f563132'
+
+        table = smbios.SMBIOSTable(SMBIOS_TABLE, version=(3, 0))
+        assert table.first(smbios.SYSTEM)['uuid'] == '4c4c4544-004d-3810-804e-b2c04f563132'
+
+    def test_parse_entry_point(self):
+        assert smbios.parse_entry_point(b'_SM_\x1f\x1f\x02\x05' + b'\0' * 23) == (2, 5)
+        assert smbios.parse_entry_point(b'_SM3_\x00\x18\x03\x02' + b'\0' * 15) == (3, 2)
+        assert smbios.parse_entry_point(b'_DMI_') is None
+
+    def test_truncated_table(self):
+        table = smbios.SMBIOSTable(SMBIOS_TABLE[:len(BIOS_STRUCTURE) + 20])
+        assert table.records(smbios.SYSTEM) == []
+        assert table.first(smbios.BIOS)['vendor'] == 'Dell Inc.'
+
+    @mock.patch.object(dmi, 'DMI')
+    @mock.patch.object(smbios, 'get_table')
+    def test_dmi_inspector_fills_gaps(self, get_table_mock, dmi_mock):
+        get_table_mock.return_value = self.table
+        dmi_mock.return_value.dump.return_value = {'sys_vendor': 'Dell', 'product_uuid': '',
+                                                   'bios_version': ''}
+
+        result = dmi.dmi_inspector()
+        assert result['sys_vendor'] == 'Dell'
+        assert result['bios_version'] == '2.4.3'
+        assert result['product_name'] == 'PowerEdge R630'
+        # Identity attributes feed the MercuryID and are only taken from the kernel
+        assert result['product_uuid'] == ''
+        assert 'chassis_serial' not in result
+
+    @mock.patch.object(mem, 'parse_meminfo')
+    @mock.patch.object(smbios, 'get_table')
+    def test_memory_inspector(self, get_table_mock, parse_meminfo_mock):
+        get_table_mock.return_value = self.table
+        parse_meminfo_mock.side_effect = lambda: {'MemTotal': 101425274880}
+
+        result = mem.memory_inspector()
+        assert [d['locator'] for d in result['memory_devices']] == ['A1', 'A3']
+
+        get_table_mock.return_value = None
+        assert 'memory_devices' not in mem.memory_inspector()
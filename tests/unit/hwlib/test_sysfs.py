@@ -0,0 +1,94 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Module to unit test mercury_agent.inspector.hwlib.sysfs"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from mercury_agent.inspector.hwlib import sysfs
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as fp:
+        fp.write(data)
+
+
+class MercuryHwlibSysFSUnitTests(MercuryAgentUnitTest):
+    def setUp(self):
+        super(MercuryHwlibSysFSUnitTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        net = os.path.join(self.root, 'class/net')
+        _write(os.path.join(net, 'eth0/address'), 'aa:bb:cc:dd:ee:ff\n')
+        _write(os.path.join(net, 'eth0/carrier'), '1\n')
+        _write(os.path.join(net, 'eth0/speed'), '10000\n')
+        _write(os.path.join(net, 'eth0/mtu'), '9000\n')
+        _write(os.path.join(net, 'bond0/address'), '11:22:33:44:55:66\n')
+        # Reading a directory fails like an attribute the driver refuses to report
+        os.makedirs(os.path.join(net, 'bond0/speed'))
+
+        dmi = os.path.join(self.root, 'class/dmi/id')
+        _write(os.path.join(dmi, 'sys_vendor'), 'HP\n')
+        _write(os.path.join(dmi, 'product_name'), 'ProLiant DL380 Gen9\n')
+        os.makedirs(os.path.join(dmi, 'power'))
+
+    def test_device_snapshot(self):
+        snapshot = sysfs.SysFSSnapshot('class/net', attributes=['address', 'carrier', 'speed'],
+                                       devices=True, sysfs_root=self.root)
+
+        assert sorted(snapshot.device_names()) == ['bond0', 'eth0']
+        assert snapshot.data['eth0'] == {'address': 'aa:bb:cc:dd:ee:ff', 'carrier': '1',
+                                         'speed': '10000'}
+        # Missing attributes are left out, unreadable attributes are empty and recorded
+        assert snapshot.data['bond0'] == {'address': '11:22:33:44:55:66', 'speed': ''}
+        assert snapshot.failed == {'bond0': {'speed': 'EISDIR'}}
+        assert snapshot.get('carrier', 'bond0', default=None) is None
+
+    def test_directory_snapshot_reads_regular_files(self):
+        snapshot = sysfs.SysFSSnapshot('/class/dmi/id', sysfs_root=self.root)
+
+        assert snapshot.data == {'sys_vendor': 'HP', 'product_name': 'ProLiant DL380 Gen9'}
+        assert snapshot.failed == {}
+
+    def test_net_class_uses_snapshot(self):
+        snapshot = sysfs.SysFSSnapshot('class/net', attributes=['address', 'carrier'], devices=True,
+                                       sysfs_root=self.root)
+        ndi = sysfs.NetClass('eth0', snapshot=snapshot)
+
+        with mock.patch.object(sysfs, 'parse_cookie') as parse_cookie:
+            parse_cookie.return_value = '1500'
+            assert ndi.address == 'aa:bb:cc:dd:ee:ff'
+            assert ndi.carrier is True
+            # Attributes outside the allow-list are still read from sysfs
+            assert ndi.get_cookie('mtu') == '1500'
+            assert parse_cookie.call_count == 1
+
+    @mock.patch.object(sysfs, 'SysFSSnapshot')
+    def test_dmi_dump(self, snapshot_mock):
+        snapshot_mock.return_value.data = {'sys_vendor': 'HP', 'product_serial': ''}
+        snapshot_mock.return_value.failed = {None: {'product_serial': 'EACCES'}}
+
+        dmi = sysfs.DMI()
+        assert dmi.dump() == {'sys_vendor': 'HP', 'product_serial': ''}
+        assert dmi.sys_vendor == 'HP'
+        snapshot_mock.assert_called_once_with('class/dmi/id')
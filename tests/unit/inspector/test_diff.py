@@ -0,0 +1,82 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.diff"""
+
+from mercury_agent.inspector.diff import diff, to_update, ADDED, REMOVED, CHANGED
+from tests.unit.base import MercuryAgentUnitTest
+
+
+OLD = {
+    'mercury_id': 'abc',
+    'mem': {'total': 100, 'free': 50},
+    'raid': [{'name': 'c0', 'drives': [{'status': 'OK'}, {'status': 'OK'}]}],
+    'interfaces': [{'devname': 'eth0'}],
+}
+
+
+def _new(**sections):
+    new = dict(OLD)
+    new.update(sections)
+    return new
+
+
+class DiffUnitTest(MercuryAgentUnitTest):
+    """Unit tests for structural inventory diffs"""
+    def test_no_changes(self):
+        """Test identical documents produce no diff"""
+        assert diff(OLD, dict(OLD)) == []
+        assert to_update([], OLD) == {}
+
+    def test_nested_change(self):
+        """Test a change deep in a list is addressed with a dotted path"""
+        new = _new(raid=[{'name': 'c0', 'drives': [{'status': 'OK'}, {'status': 'FAILED'}]}])
+        changes = diff(OLD, new)
+        assert changes == [(CHANGED, ('raid', 0, 'drives', 1, 'status'), 'FAILED')]
+        assert to_update(changes, new) == {'raid.0.drives.1.status': 'FAILED'}
+
+    def test_added_and_removed_keys(self):
+        """Test removed keys send their parent whole"""
+        new = _new(mem={'total': 100, 'available': 25})
+        changes = diff(OLD, new)
+        assert (REMOVED, ('mem', 'free'), None) in changes
+        assert (ADDED, ('mem', 'available'), 25) in changes
+        assert to_update(changes, new) == {'mem': {'total': 100, 'available': 25}}
+
+    def test_list_length_change(self):
+        """Test a list which changed length is replaced"""
+        new = _new(interfaces=[{'devname': 'eth0'}, {'devname': 'eth1'}])
+        assert to_update(diff(OLD, new), new) == {'interfaces': new['interfaces']}
+
+    def test_removed_section(self):
+        """Test a removed section is set to None"""
+        new = dict(OLD)
+        del new['raid']
+        assert to_update(diff(OLD, new), new) == {'raid': None}
+
+    def test_unaddressable_keys(self):
+        """Test keys which cannot be used in dotted paths send the parent"""
+        old = _new(os_storage={'props': {'ID.PATH': 'a', '$x': 1}})
+        new = _new(os_storage={'props': {'ID.PATH': 'b', '$x': 1}})
+        assert to_update(diff(old, new), new) == {'os_storage.props': new['os_storage']['props']}
+
+    def test_mercury_id_is_never_updated(self):
+        """Test mercury_id is excluded from updates"""
+        new = _new(mercury_id='def')
+        assert to_update(diff(OLD, new), new) == {}
+
+    def test_type_change(self):
+        """Test a change of type is reported even when values compare equal"""
+        new = _new(mem={'total': 100.0, 'free': 50})
+        assert to_update(diff(OLD, new), new) == {'mem.total': 100.0}
@@ -0,0 +1,197 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.inspect"""
+
+import threading
+import time
+
+import mock
+import pytest
+
+from mercury_agent.inspector import inspect
+from mercury_agent.inspector.hwlib.lspci import PCIBus
+from mercury_agent.timeline import Timeline
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeDriver(object):
+    wants = 'pci'
+    driver_type = 'raid'
+    probed_with = None
+
+    @classmethod
+    def probe(cls, context_data):
+        cls.probed_with = context_data
+        return context_data and ['device']
+
+
+def _slow(value, delay=0.01):
+    def f():
+        time.sleep(delay)
+        return value
+    return f
+
+
+def _late(f, wants=None, driver_type=None):
+    f.wants = wants
+    f.driver_type = driver_type
+    return f
+
+
+FAKE_INSPECTORS = [
+    ('dmi', _slow({'product_uuid': 'abc'})),
+    ('interfaces', _slow([{'name': 'eth0'}])),
+    ('pci', _slow([{'slot': '00:1f.2', 'class_id': '0104', 'vendor_id': '8086',
+                    'device_id': '8d02'}], delay=0.05)),
+]
+
+FAKE_DRIVERS = [
+    {'name': 'fake', 'class': FakeDriver, 'driver_type': 'raid', 'wants': 'pci'}
+]
+
+
+class InspectUnitTest(MercuryAgentUnitTest):
+    """Unit tests for the inspector execution engine"""
+    def setUp(self):
+        super(InspectUnitTest, self).setUp()
+        self.late_calls = []
+
+        def raid(device_info):
+            self.late_calls.append(sorted(device_info))
+            return {'pci_count': len(device_info['pci'])}
+
+        patches = [
+            mock.patch.object(inspect, 'inspectors', FAKE_INSPECTORS),
+            mock.patch.object(inspect, 'late_inspectors',
+                              [('raid', _late(raid, wants=['pci'], driver_type='raid'))]),
+            mock.patch.object(inspect, 'registered_drivers', FAKE_DRIVERS),
+            mock.patch.object(inspect, 'set_driver_cache'),
+            mock.patch.object(inspect, 'generate_mercury_id',
+                              lambda dmi, interfaces: 'id-' + dmi['product_uuid']),
+            mock.patch.object(inspect, 'global_device_info', {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_parallel_matches_serial(self):
+        """Test the thread pool and serial paths collect the same data"""
+        serial = dict(inspect.inspect(max_workers=1))
+        inspect.global_device_info.clear()
+        parallel = dict(inspect.inspect(max_workers=4))
+
+        assert serial == parallel
+        assert parallel['mercury_id'] == 'id-abc'
+        assert parallel['raid'] == {'pci_count': 1}
+        assert isinstance(FakeDriver.probed_with, PCIBus)
+        assert [device['class_id'] for device in FakeDriver.probed_with] == ['0104']
+        assert inspect.set_driver_cache.call_count == 2
+
+    def test_probes_share_one_pci_bus(self):
+        """Test the PCI bus is indexed once for every probe of an inspection"""
+        drivers = FAKE_DRIVERS + [dict(FAKE_DRIVERS[0], name='other')]
+        for max_workers in (1, 4):
+            with mock.patch.object(inspect, 'registered_drivers', drivers), \
+                    mock.patch.object(inspect, 'PCIBus', wraps=PCIBus) as pci_bus_mock:
+                inspect.inspect(max_workers=max_workers)
+            assert pci_bus_mock.call_count == 1
+            inspect.global_device_info.clear()
+
+    def test_options(self):
+        """Test inspectors are passed their options"""
+        dmi = mock.Mock(return_value={'product_uuid': 'abc'})
+        raid = mock.Mock(return_value={})
+        for max_workers in (1, 4):
+            with mock.patch.object(inspect, 'inspectors', [('dmi', dmi)] + FAKE_INSPECTORS[1:]), \
+                    mock.patch.object(inspect, 'late_inspectors', [('raid', _late(raid))]):
+                inspect.inspect(max_workers=max_workers,
+                                options={'dmi': {'full': True}, 'raid': {'timeout': 5}})
+            dmi.assert_called_with(full=True)
+            assert raid.call_args[1] == {'timeout': 5}
+            inspect.global_device_info.clear()
+
+    def test_late_inspector_receives_wanted_sections(self):
+        """Test late inspectors only wait for the sections they want"""
+        inspect.inspect(max_workers=4)
+        assert 'pci' in self.late_calls[0]
+
+    def test_early_then_late_matches_inspect(self):
+        """Test two phase inspection collects the same data as inspect()"""
+        for max_workers in (1, 4):
+            full = dict(inspect.inspect(max_workers=max_workers))
+            inspect.global_device_info.clear()
+
+            early = dict(inspect.inspect_early(max_workers=max_workers))
+            assert 'raid' not in early
+            assert early['mercury_id'] == 'id-abc'
+
+            streamed = []
+            late = inspect.inspect_late(on_complete=lambda name, data: streamed.append(name),
+                                        max_workers=max_workers)
+            assert streamed == ['raid']
+            assert dict(late) == full
+            inspect.global_device_info.clear()
+
+    def test_late_inspector_without_drivers(self):
+        """Test driver_type False does not wait for driver probes"""
+        tasks = dict((key, requires) for key, _, requires in inspect.build_tasks())
+        assert tasks['raid'] == ['pci', inspect.DRIVER_PREFIX + 'fake']
+
+        with mock.patch.object(inspect, 'late_inspectors',
+                               [('summary', _late(lambda d: d, wants=['pci'], driver_type=False))]):
+            tasks = dict((key, requires) for key, _, requires in inspect.build_tasks())
+        assert tasks['summary'] == ['pci']
+
+    def test_timeline(self):
+        """Test inspectors, probes and late inspectors are recorded on the timeline"""
+        for max_workers in (1, 4):
+            timeline = Timeline()
+            inspect.inspect(max_workers=max_workers, timeline=timeline)
+            recorded = sorted((e['category'], e['name']) for e in timeline.to_dict()['entries'])
+            assert recorded == [('inspector', 'dmi'), ('inspector', 'interfaces'),
+                                ('inspector', 'pci'), ('late_inspector', 'raid'),
+                                ('probe', 'fake')]
+
+    def test_run_tasks_respects_requires(self):
+        """Test run_tasks() starts a task after its requirements"""
+        order = []
+        lock = threading.Lock()
+
+        def record(name):
+            def f(results):
+                with lock:
+                    order.append(name)
+                return sorted(results)
+            return f
+
+        results = inspect.run_tasks([
+            ('b', record('b'), ['a']),
+            ('a', record('a'), []),
+            ('c', record('c'), ['a', 'b']),
+        ], max_workers=3)
+
+        assert order == ['a', 'b', 'c']
+        assert results['c'] == ['a', 'b']
+
+    def test_run_tasks_unknown_requirement(self):
+        """Test run_tasks() rejects unknown requirements"""
+        with pytest.raises(ValueError):
+            inspect.run_tasks([('a', lambda r: None, ['missing'])])
+
+    def test_run_tasks_circular(self):
+        """Test run_tasks() detects circular dependencies"""
+        with pytest.raises(ValueError):
+            inspect.run_tasks([('a', lambda r: None, ['b']),
+                               ('b', lambda r: None, ['a'])])
@@ -0,0 +1,85 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.inventory_cache"""
+
+import os
+import shutil
+import tempfile
+
+from mercury_agent.inspector import inventory_cache
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as fp:
+        fp.write(data)
+
+
+class InventoryCacheUnitTest(MercuryAgentUnitTest):
+    """Unit tests for the warm start inventory cache"""
+    def setUp(self):
+        super(InventoryCacheUnitTest, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.sysfs = os.path.join(self.root, 'sys')
+        self.boot_id = os.path.join(self.root, 'boot_id')
+        _write(self.boot_id, 'a5f0ef38-0001\n')
+
+        pci = os.path.join(self.sysfs, 'bus/pci/devices/0000:00:1f.2')
+        for attribute, value in (('vendor', '0x8086'), ('device', '0x8d62'),
+                                 ('subsystem_vendor', '0x103c'),
+                                 ('subsystem_device', '0x21bd')):
+            _write(os.path.join(pci, attribute), value + '\n')
+        _write(os.path.join(self.sysfs, 'class/dmi/id/product_uuid'), 'uuid\n')
+        _write(os.path.join(self.sysfs, 'block/sda/device/serial'), 'S1\n')
+        _write(os.path.join(self.sysfs, 'class/net/eth0/address'), 'aa:bb:cc:dd:ee:ff\n')
+        os.makedirs(os.path.join(self.sysfs, 'class/net/eth0/device'))
+
+        self.cache = inventory_cache.InventoryCache(os.path.join(self.root, 'cache/inventory.json'),
+                                                    sysfs_root=self.sysfs,
+                                                    boot_id_path=self.boot_id)
+
+    def test_round_trip(self):
+        """Test saved inventory is loaded when nothing has changed"""
+        assert self.cache.load() is None
+        assert self.cache.save({'mercury_id': 'abc', 'mem': {'total': 1}})
+        assert self.cache.load() == {'mercury_id': 'abc', 'mem': {'total': 1}}
+
+    def test_reboot_invalidates(self):
+        """Test a new boot_id invalidates the cache"""
+        self.cache.save({'mercury_id': 'abc'})
+        _write(self.boot_id, 'a5f0ef38-0002\n')
+        assert self.cache.load() is None
+
+    def test_hardware_change_invalidates(self):
+        """Test a changed NIC or disk invalidates the cache"""
+        self.cache.save({'mercury_id': 'abc'})
+        _write(os.path.join(self.sysfs, 'block/sda/device/serial'), 'S2\n')
+        assert self.cache.load() is None
+
+    def test_virtual_interfaces_are_ignored(self):
+        """Test interfaces without a backing device do not change the fingerprint"""
+        fingerprint = inventory_cache.hardware_fingerprint(self.sysfs)
+        _write(os.path.join(self.sysfs, 'class/net/veth0/address'), '11:22:33:44:55:66\n')
+        assert inventory_cache.hardware_fingerprint(self.sysfs) == fingerprint
+
+    def test_corrupt_cache(self):
+        """Test a corrupt cache file is treated as a miss"""
+        _write(self.cache.path, '{not json')
+        assert self.cache.load() is None
@@ -0,0 +1,135 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.hwlib.block and the os_storage inspector"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from mercury_agent.inspector.hwlib import block
+from mercury_agent.inspector.inspectors import os_storage
+from tests.unit.base import MercuryAgentUnitTest
+
+DISKS = {
+    'sda': ('8', '0', '/devices/pci0000:00/0000:00:1f.2/ata1/host0/target0:0:0/0:0:0:0/block/sda',
+            'E:ID_BUS=ata\nE:ID_SERIAL=SAMSUNG_MZ7LM480_S2UJNX0H\nE:ID_TYPE=disk\n'
+            'E:SCSI_IDENT_SERIAL=S2UJNX0H\nS:disk/by-id/ata-SAMSUNG_MZ7LM480_S2UJNX0H\n'
+            'S:disk/by-path/pci-0000:00:1f.2-ata-1\nG:systemd\n'),
+    'sdb': ('8', '16', '/devices/pci0000:00/0000:00:03.0/0000:05:00.0/host1/rport-1:0-0/'
+                       'target1:0:0/1:0:0:0/block/sdb',
+            'E:ID_BUS=scsi\nE:ID_WWN=0x600a098038303053\nE:ID_PATH=pci-0000:05:00.0-fc-0x1\n'),
+    'sdc': ('8', '32', '/devices/pci0000:00/0000:00:03.0/0000:05:00.1/host2/rport-2:0-0/'
+                       'target2:0:0/2:0:0:0/block/sdc',
+            'E:ID_BUS=scsi\nE:ID_WWN=0x600a098038303053\nE:ID_PATH=pci-0000:05:00.1-fc-0x1\n'),
+    'sr0': ('11', '0', '/devices/pci0000:00/0000:00:1f.2/ata2/host3/target3:0:0/3:0:0:0/block/sr0',
+            'E:ID_TYPE=cd\n'),
+    'loop0': ('7', '0', '/devices/virtual/block/loop0', ''),
+    'dm-0': ('253', '0', '/devices/virtual/block/dm-0',
+             'E:DM_NAME=mpatha\nE:DM_UUID=mpath-3600a098038303053\nE:MPATH_SBIN_PATH=/sbin\n'),
+    'dm-1': ('253', '1', '/devices/virtual/block/dm-1',
+             'E:DM_NAME=vg0-root\nE:DM_UUID=LVM-Vx4NmQ\n')
+}
+
+
+def _write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as fp:
+        fp.write(data)
+
+
+def write_block_tree(root):
+    """
+    Write /sys/block and the udev database for DISKS below root, dm-0 is a multipath map of
+    sdb and sdc
+    :return: sysfs root, udev database path
+    """
+    sysfs = os.path.join(root, 'sys')
+    udev_data = os.path.join(root, 'run/udev/data')
+    os.makedirs(udev_data)
+    os.makedirs(os.path.join(sysfs, 'block'))
+
+    for name, (major, minor, devpath, data) in DISKS.items():
+        _write(os.path.join(sysfs + devpath, 'uevent'),
+               'MAJOR=%s\nMINOR=%s\nDEVNAME=%s\nDEVTYPE=disk\n' % (major, minor, name))
+        os.symlink(sysfs + devpath, os.path.join(sysfs, 'block', name))
+        _write(os.path.join(udev_data, 'b%s:%s' % (major, minor)), data)
+
+    os.makedirs(os.path.join(sysfs, 'devices/virtual/block/dm-0/slaves'))
+    for path in ('sdb', 'sdc'):
+        os.symlink(os.path.join(sysfs, 'block', path),
+                   os.path.join(sysfs, 'devices/virtual/block/dm-0/slaves', path))
+    return sysfs, udev_data
+
+
+class OSStorageUnitTest(MercuryAgentUnitTest):
+    def setUp(self):
+        super(OSStorageUnitTest, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.sysfs, self.udev_data = write_block_tree(self.root)
+
+    def test_parse_udev_data(self):
+        assert block.parse_udev_data(DISKS['sda'][3]) == {
+            'ID_BUS': 'ata',
+            'ID_SERIAL': 'SAMSUNG_MZ7LM480_S2UJNX0H',
+            'ID_TYPE': 'disk',
+            'SCSI_IDENT_SERIAL': 'S2UJNX0H',
+            'DEVLINKS': '/dev/disk/by-id/ata-SAMSUNG_MZ7LM480_S2UJNX0H '
+                        '/dev/disk/by-path/pci-0000:00:1f.2-ata-1',
+            'TAGS': ':systemd:'
+        }
+
+    def test_discover_groups_multipath(self):
+        devices = block.BlockDevices(sysfs_root=self.sysfs, udev_data_path=self.udev_data).discover(
+            is_valid=os_storage.is_valid_storage_device)
+
+        assert sorted(devices) == ['/dev/dm-0', '/dev/sda']
+        assert devices['/dev/dm-0']['paths'] == ['/dev/sdb', '/dev/sdc']
+        assert devices['/dev/sda']['DEVPATH'] == DISKS['sda'][2]
+        assert devices['/dev/sda']['MAJOR'] == '8'
+
+    @mock.patch.object(os_storage, 'BlockDevices')
+    def test_inspector_filters_properties(self, block_devices_mock):
+        block_devices_mock.return_value = block.BlockDevices(sysfs_root=self.sysfs,
+                                                             udev_data_path=self.udev_data)
+
+        result = os_storage.os_storage_inspector(properties=[
+            'DEVNAME', 'DEVPATH', 'DEVTYPE', 'DEVLINKS', 'MAJOR', 'MINOR', 'SUBSYSTEM', 'ID_*',
+            'DM_NAME', 'DM_UUID'])
+        assert 'SCSI_IDENT_SERIAL' not in result['/dev/sda']
+        assert 'TAGS' not in result['/dev/sda']
+        assert result['/dev/sda']['ID_SERIAL'] == 'SAMSUNG_MZ7LM480_S2UJNX0H'
+        assert 'MPATH_SBIN_PATH' not in result['/dev/dm-0']
+        assert result['/dev/dm-0']['DM_NAME'] == 'mpatha'
+        assert result['/dev/dm-0']['paths'] == ['/dev/sdb', '/dev/sdc']
+
+        result = os_storage.os_storage_inspector()
+        assert result['/dev/sda']['SCSI_IDENT_SERIAL'] == 'S2UJNX0H'
+
+    @mock.patch.object(os_storage, 'UDevHelper')
+    @mock.patch.object(os_storage, 'BlockDevices')
+    def test_inspector_falls_back_to_pyudev(self, block_devices_mock, udev_helper_mock):
+        block_devices_mock.side_effect = OSError('udev database is not available')
+        udev_helper_mock.return_value.discover_valid_storage_devices.return_value = [
+            {'DEVNAME': '/dev/sda', 'ID_BUS': 'ata', 'SCSI_IDENT_SERIAL': 'S2UJNX0H'}
+        ]
+
+        assert os_storage.os_storage_inspector(properties=['DEVNAME', 'ID_*']) == {
+            '/dev/sda': {'DEVNAME': '/dev/sda', 'ID_BUS': 'ata'}
+        }
@@ -0,0 +1,80 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.publisher"""
+
+import mock
+
+from mercury_agent.inspector.publisher import InventoryPublisher
+from tests.unit.base import MercuryAgentUnitTest
+
+
+DEVICE_INFO = {
+    'mercury_id': 'abc',
+    'mem': {'total': 100},
+    'raid': [{'status': 'OK'}],
+}
+
+
+class InventoryPublisherUnitTest(MercuryAgentUnitTest):
+    """Unit tests for incremental inventory publishing"""
+    def setUp(self):
+        super(InventoryPublisherUnitTest, self).setUp()
+        self.backend = mock.Mock()
+        self.backend.update.return_value = {'error': False}
+        self.publisher = InventoryPublisher(self.backend)
+
+    def test_publish_without_baseline_sends_sections(self):
+        """Test sections are sent whole before registration is acknowledged"""
+        update = self.publisher.publish(DEVICE_INFO, sections=['raid'])
+        assert update == {'raid': [{'status': 'OK'}]}
+        self.backend.update.assert_called_once_with('abc', update)
+
+    def test_publish_diff(self):
+        """Test only changed paths are sent"""
+        self.publisher.acknowledge(DEVICE_INFO)
+        current = dict(DEVICE_INFO, raid=[{'status': 'FAILED'}])
+
+        assert self.publisher.publish(current) == {'raid.0.status': 'FAILED'}
+        self.backend.update.assert_called_once_with('abc', {'raid.0.status': 'FAILED'})
+
+        self.backend.update.reset_mock()
+        assert self.publisher.publish(current) == {}
+        assert not self.backend.update.called
+
+    def test_publish_falls_back_to_full_resync(self):
+        """Test a failed incremental update is retried with whole sections"""
+        self.publisher.acknowledge(DEVICE_INFO)
+        self.backend.update.side_effect = [{'error': True, 'message': 'failed'}, {'error': False}]
+        current = dict(DEVICE_INFO, raid=[{'status': 'FAILED'}])
+
+        assert self.publisher.publish(current, sections=['raid']) == {'raid': [{'status': 'FAILED'}]}
+        assert self.backend.update.call_count == 2
+
+    def test_failed_publish_keeps_baseline(self):
+        """Test changes are resent after the backend fails"""
+        self.publisher.acknowledge(DEVICE_INFO)
+        self.backend.update.return_value = {'error': True, 'message': 'failed'}
+        current = dict(DEVICE_INFO, mem={'total': 200})
+
+        assert self.publisher.publish(current) is None
+
+        self.backend.update.return_value = {'error': False}
+        assert self.publisher.publish(current) == {'mem.total': 200}
+
+    def test_publish_full(self):
+        """Test full=True sends requested sections even when unchanged"""
+        self.publisher.acknowledge(DEVICE_INFO)
+        assert self.publisher.publish(DEVICE_INFO, sections=['mem'], full=True) == \
+            {'mem': {'total': 100}}
@@ -0,0 +1,103 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.inspectors.raid"""
+
+import threading
+import time
+
+import mock
+
+from mercury_agent.hardware.drivers.drivers import DriverBase
+from mercury_agent.inspector.inspectors import raid
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeRAIDDriver(DriverBase):
+    driver_type = 'raid'
+
+    def __init__(self, name, delays, hang=None, release=None, barrier=None):
+        """
+        :param barrier: Every adapter inspection waits on it, so the inspection only completes
+            when the barrier's parties run at the same time
+        """
+        super(FakeRAIDDriver, self).__init__([])
+        self.name = name
+        self.delays = delays
+        self.hang = hang
+        self.release = release
+        self.barrier = barrier
+
+    def get_adapter_indexes(self):
+        return list(range(len(self.delays)))
+
+    def inspect_adapter(self, index):
+        if index == self.hang:
+            self.release.wait()
+        if self.barrier:
+            self.barrier.wait(timeout=5)
+        if self.delays[index] is None:
+            raise Exception('adapter is missing')
+        time.sleep(self.delays[index])
+        return {'name': '%s-%d' % (self.name, index)}
+
+
+class WholeDriver(DriverBase):
+    name = 'whole'
+    driver_type = 'raid'
+
+    def inspect(self):
+        return [{'name': 'whole-0'}, {'name': 'whole-1'}]
+
+
+class RAIDInspectorUnitTest(MercuryAgentUnitTest):
+    @mock.patch.object(raid, 'get_subsystem_drivers')
+    def test_concurrent_and_ordered(self, get_subsystem_drivers_mock):
+        # The five adapters only get past the barrier when they are inspected together,
+        # a serial inspection breaks it and reports errors
+        barrier = threading.Barrier(5)
+        get_subsystem_drivers_mock.return_value = [
+            FakeRAIDDriver('hpssa', [0.2, 0.0], barrier=barrier),
+            FakeRAIDDriver('megaraid_sas', [0.1, 0.2, None], barrier=barrier),
+            WholeDriver([])
+        ]
+        result = raid.raid_inspector({}, max_workers=8)
+
+        assert result == [
+            {'name': 'hpssa-0'}, {'name': 'hpssa-1'},
+            {'name': 'megaraid_sas-0'}, {'name': 'megaraid_sas-1'},
+            {'driver': 'megaraid_sas', 'adapter_index': 2, 'error': 'adapter is missing'},
+            {'name': 'whole-0'}, {'name': 'whole-1'}
+        ]
+
+    @mock.patch.object(raid, 'get_subsystem_drivers')
+    def test_hung_adapter(self, get_subsystem_drivers_mock):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        get_subsystem_drivers_mock.return_value = [
+            FakeRAIDDriver('megaraid_sas', [0.0, 0.0], hang=0, release=release)
+        ]
+        # The hung adapter gives up its worker, the second adapter is still inspected
+        with mock.patch.object(raid.log, 'warning') as warning_mock:
+            assert raid.raid_inspector({}, max_workers=1, adapter_timeout=0.2) == [
+                {'driver': 'megaraid_sas', 'adapter_index': 0,
+                 'error': 'Timed out after 0.2 seconds'},
+                {'name': 'megaraid_sas-1'}
+            ]
+        assert 'megaraid_sas adapter 0' in warning_mock.call_args[0][0]
+
+    @mock.patch.object(raid, 'get_subsystem_drivers')
+    def test_no_drivers(self, get_subsystem_drivers_mock):
+        get_subsystem_drivers_mock.return_value = []
+        assert raid.raid_inspector({}) is None
@@ -0,0 +1,193 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.raid_refresh"""
+
+import threading
+
+import mock
+import pytest
+
+from mercury_agent.inspector import inspect, raid_refresh
+from mercury_agent.inspector.inspectors import raid
+from mercury_agent.inspector.publisher import InventoryPublisher
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.inspector.test_raid import FakeRAIDDriver
+
+
+class RAIDRefreshUnitTest(MercuryAgentUnitTest):
+    def setUp(self):
+        super(RAIDRefreshUnitTest, self).setUp()
+        self.drivers = [FakeRAIDDriver('hpssa', [0.0]),
+                        FakeRAIDDriver('megaraid_sas', [0.0, 0.0])]
+        patcher = mock.patch.object(raid, 'get_subsystem_drivers', return_value=self.drivers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(raid_refresh, 'get_subsystem_drivers',
+                                    return_value=self.drivers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.dict(inspect.global_device_info, {'mercury_id': 'x'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        inspect.global_device_info['raid'] = raid.raid_inspector(inspect.global_device_info)
+
+        self.backend_client = mock.Mock()
+        self.backend_client.update.return_value = {}
+        publisher = InventoryPublisher(backend_client=self.backend_client)
+        publisher.acknowledge(inspect.global_device_info)
+        # Tests flush explicitly, unless they shorten the settle time
+        self.refresher = raid_refresh.RAIDInventoryRefresher(publisher=publisher, settle=60)
+        self.addCleanup(lambda: self.refresher.timer and self.refresher.timer.cancel())
+
+        for driver in self.drivers:
+            driver.inspect_adapter = mock.Mock(wraps=driver.inspect_adapter)
+
+    def test_scoped_refresh(self):
+        self.drivers[1].inspect_adapter.side_effect = lambda idx: {'name': 'changed-%d' % idx}
+
+        self.refresher.request('megaraid_sas', 1)
+        self.refresher.request('megaraid_sas', 1)
+        self.backend_client.update.assert_not_called()
+
+        self.refresher.flush()
+
+        self.drivers[0].inspect_adapter.assert_not_called()
+        self.drivers[1].inspect_adapter.assert_called_once_with(1)
+        self.backend_client.update.assert_called_once_with('x', {'raid.2.name': 'changed-1'})
+        assert inspect.global_device_info['raid'][1] == {'name': 'megaraid_sas-0'}
+        # Positions are kept with the refreshed section
+        assert inspect.global_device_info['raid'].positions[('megaraid_sas', 1)] == 2
+
+    def test_driver_and_full_refresh(self):
+        self.refresher.request('megaraid_sas')
+        self.refresher.flush()
+        assert self.drivers[1].inspect_adapter.call_count == 2
+        self.drivers[0].inspect_adapter.assert_not_called()
+
+        self.refresher.request('megaraid_sas', 5)  # unknown adapter
+        self.refresher.flush()
+        self.drivers[0].inspect_adapter.assert_called_once_with(0)
+
+        assert self.refresher.flush() == {}
+
+    def test_cached_section_is_inspected_in_full(self):
+        """Test a section without positions, as restored from the inventory cache"""
+        inspect.global_device_info['raid'] = list(inspect.global_device_info['raid'])
+        self.refresher.request('megaraid_sas', 1)
+        self.refresher.flush()
+        assert self.drivers[0].inspect_adapter.call_count == 1
+        assert self.drivers[1].inspect_adapter.call_count == 2
+        assert isinstance(inspect.global_device_info['raid'], raid.RAIDSection)
+
+    def test_flush_holds_section_lock(self):
+        def inspect_adapter(idx):
+            assert not inspect.get_section_lock('raid').acquire(False)
+            return {'name': 'changed'}
+
+        self.drivers[0].inspect_adapter.side_effect = inspect_adapter
+        self.refresher.request('hpssa', 0)
+        self.refresher.flush()
+        self.drivers[0].inspect_adapter.assert_called_once_with(0)
+
+    def test_burst_is_merged(self):
+        """Test back to back changes are refreshed once, after the last one"""
+        self.refresher.settle = 0.05
+        published = threading.Event()
+        self.backend_client.update.side_effect = lambda *args: published.set() or {}
+        self.drivers[1].inspect_adapter.side_effect = lambda idx: {'name': 'changed-%d' % idx}
+
+        for idx in (0, 1, 0):
+            self.refresher.begin_change()
+            self.refresher.request('megaraid_sas', idx)
+            self.refresher.end_change()
+
+        assert published.wait(5)
+        assert self.drivers[1].inspect_adapter.call_count == 2
+        self.backend_client.update.assert_called_once_with(
+            'x', {'raid.1.name': 'changed-0', 'raid.2.name': 'changed-1'})
+
+    def test_no_refresh_while_changing(self):
+        self.refresher.begin_change()
+        self.refresher.request('hpssa', 0)
+        assert self.refresher.flush() == {}
+        self.drivers[0].inspect_adapter.assert_not_called()
+        assert self.refresher.pending == {('hpssa', 0)}
+
+        self.refresher.end_change()
+        assert self.refresher.timer is not None
+        self.refresher.flush()
+        self.drivers[0].inspect_adapter.assert_called_once_with(0)
+
+    def test_change_waits_for_refresh(self):
+        """Test a change does not start while adapters are being inspected"""
+        inspecting = threading.Event()
+        resume = threading.Event()
+
+        def inspect_adapter(idx):
+            inspecting.set()
+            resume.wait(5)
+            return {'name': 'changed'}
+
+        self.drivers[0].inspect_adapter.side_effect = inspect_adapter
+        self.refresher.request('hpssa', 0)
+        thread = threading.Thread(target=self.refresher.flush)
+        thread.start()
+        assert inspecting.wait(5)
+
+        started = threading.Event()
+        change = threading.Thread(
+            target=lambda: self.refresher.begin_change() or started.set())
+        change.start()
+        assert not started.wait(0.1)
+
+        resume.set()
+        assert started.wait(5)
+        thread.join()
+        change.join()
+        assert self.refresher.changing == 1
+
+    def test_refresh_on_change(self):
+        refresher = mock.Mock()
+
+        @raid_refresh.refresh_on_change(lambda slot: ('hpssa', raid_refresh.find_adapter(
+            'hpssa', lambda adapter: adapter['name'] == slot)))
+        def capability(slot):
+            refresher.begin_change.assert_called_once_with()
+            # Nothing is requested until the capability is done
+            refresher.request.assert_not_called()
+            if slot is None:
+                raise Exception('failed')
+            return slot
+
+        with mock.patch.object(raid_refresh, 'get_raid_refresher', return_value=refresher):
+            assert capability('hpssa-0') == 'hpssa-0'
+            refresher.request.assert_called_once_with('hpssa', 0)
+            refresher.end_change.assert_called_once_with()
+
+            refresher.reset_mock()
+            with pytest.raises(Exception):
+                capability(None)
+            refresher.request.assert_called_once_with('hpssa', None)
+            refresher.end_change.assert_called_once_with()
+
+    def test_refresh_adapters(self):
+        """Test several adapters are refreshed and published together"""
+        with mock.patch.object(raid_refresh, 'get_raid_refresher', return_value=self.refresher):
+            raid_refresh.refresh_adapters([('hpssa', 0), ('megaraid_sas', 1)])
+        assert self.refresher.pending == {('hpssa', 0), ('megaraid_sas', 1)}
+        self.refresher.flush()
+        self.drivers[0].inspect_adapter.assert_called_once_with(0)
+        self.drivers[1].inspect_adapter.assert_called_once_with(1)
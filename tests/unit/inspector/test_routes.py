@@ -0,0 +1,138 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.inspectors.routes"""
+
+import mock
+
+from mercury_agent.inspector.hwlib.iproute2 import iter_table
+from mercury_agent.inspector.inspectors import routes
+from mercury_agent.procedures.routes import route_table
+from tests.unit.base import MercuryAgentUnitTest
+
+ROUTE_LINES = [
+    'default via 203.0.113.1 dev eth0 proto bgp metric 20',
+    '10.0.0.0/16 dev eth0 proto kernel scope link src 10.0.0.1',
+    '198.51.100.0/24 via 10.0.0.2 dev eth0 proto bgp metric 20',
+    '192.0.2.0/24 via 10.0.0.2 dev eth0 proto bgp metric 20',
+    '192.0.2.0/23 via 10.0.0.3 dev eth0 proto bgp metric 20',
+    '192.0.2.1 dev eth0 scope link'
+]
+
+NETLINK_ROUTES = [
+    {'destination': 'default', 'via': 'fd00::1', 'dev': 'eth0', 'family': 'inet6', 'table': 'main',
+     'type': 'unicast'},
+    {'destination': '127.0.0.1', 'dev': 'lo', 'proto': 'kernel', 'family': 'inet', 'table': 'local',
+     'type': 'local'},
+    {'destination': '10.1.0.0/16', 'via': '10.0.0.1', 'family': 'inet', 'table': '100',
+     'type': 'unicast'}
+]
+
+
+class RouteInventoryUnitTest(MercuryAgentUnitTest):
+    """Unit tests for route collection and summarization"""
+    def test_small_table_is_not_summarized(self):
+        table = routes.collect_routes(iter_table(ROUTE_LINES), summary_threshold=10)
+        summary = table.summary.to_dict()
+
+        assert len(table) == 6
+        assert summary['total'] == 6
+        assert not summary['truncated']
+        assert summary['defaults'] == 1
+        assert summary['connected'] == 1
+        assert summary['tables'] == {'main': 6}
+        assert summary['protocols'] == {'bgp': 4, 'kernel': 1, 'boot': 1}
+
+    def test_large_table_keeps_default_and_connected_routes(self):
+        table = routes.collect_routes(iter_table(ROUTE_LINES), summary_threshold=2)
+
+        assert [r['destination'] for r in table] == ['default', '10.0.0.0/16']
+        assert routes.find_default_route(table)['via'] == '203.0.113.1'
+
+        # The summary counts every route, not only those kept
+        summary = table.summary.to_dict()
+        assert summary['total'] == 6
+        assert summary['truncated']
+        assert summary['protocols'] == {'bgp': 4, 'kernel': 1, 'boot': 1}
+
+    def test_prefix_lengths_and_next_hops(self):
+        summary = routes.summarize_routes(iter_table(ROUTE_LINES + [
+            '192.0.2.0/24 via 10.0.0.3 dev eth0 table 100 proto bgp metric 20'
+        ]), top_prefixes=3)
+
+        assert summary['prefix_lengths'] == [
+            {'family': 'inet', 'length': 24, 'count': 3},
+            {'family': 'inet', 'length': 0, 'count': 1},
+            {'family': 'inet', 'length': 16, 'count': 1}
+        ]
+        assert summary['next_hops'] == [
+            {'family': 'inet', 'dev': 'eth0', 'count': 2},
+            {'family': 'inet', 'via': '10.0.0.2', 'dev': 'eth0', 'count': 2},
+            {'family': 'inet', 'via': '10.0.0.3', 'dev': 'eth0', 'count': 2}
+        ]
+
+    def test_multipath_next_hops(self):
+        summary = routes.summarize_routes([
+            {'destination': '10.1.0.0/16', 'nexthops': [{'via': '10.0.0.1', 'dev': 'eth0'},
+                                                        {'via': '10.0.0.2', 'dev': 'eth1'}]},
+            {'destination': '10.2.0.0/16', 'via': '10.0.0.1', 'dev': 'eth0'}
+        ])
+        assert summary['next_hops'] == [
+            {'family': 'inet', 'via': '10.0.0.1', 'dev': 'eth0', 'count': 2},
+            {'family': 'inet', 'via': '10.0.0.2', 'dev': 'eth1', 'count': 1}
+        ]
+
+    def test_summary_counts_families_and_tables(self):
+        summary = routes.summarize_routes(NETLINK_ROUTES)
+
+        assert summary['families'] == {'inet': 2, 'inet6': 1}
+        assert summary['tables'] == {'main': 1, 'local': 1, '100': 1}
+        assert summary['connected'] == 0
+        assert {'family': 'inet6', 'length': 0, 'count': 1} in summary['prefix_lengths']
+
+    @mock.patch.object(routes, 'iter_routes')
+    def test_route_summary_uses_collected_summary(self, iter_routes_mock):
+        table = routes.collect_routes(iter_table(ROUTE_LINES), summary_threshold=2)
+        summary = routes.route_summary_inspector({'routes': table})
+
+        assert summary['total'] == 6
+        assert summary['truncated']
+        assert routes.route_summary_inspector({}) is None
+        assert not iter_routes_mock.called
+
+    @mock.patch.object(routes, 'iter_routes')
+    def test_route_summary_of_cached_section(self, iter_routes_mock):
+        """Test a plain list from the inventory cache is summarized from the kernel tables"""
+        iter_routes_mock.side_effect = lambda: iter_table(ROUTE_LINES)
+        summary = routes.route_summary_inspector({'routes': NETLINK_ROUTES[:1]})
+
+        assert summary['total'] == 6
+        assert summary['truncated']
+
+    @mock.patch('mercury_agent.procedures.routes.iter_routes')
+    def test_route_table_capability_filters(self, iter_routes_mock):
+        iter_routes_mock.side_effect = lambda: iter(NETLINK_ROUTES)
+
+        assert len(route_table()) == 3
+        assert route_table(family='inet6') == NETLINK_ROUTES[:1]
+        assert route_table(table=100) == NETLINK_ROUTES[2:]
+
+    @mock.patch.object(routes, 'IPRoute2')
+    @mock.patch.object(routes, 'RTNetlink')
+    def test_iter_routes_falls_back_to_iproute2(self, rtnetlink_mock, iproute2_mock):
+        rtnetlink_mock.return_value.iter_routes.side_effect = OSError(93, 'Protocol not supported')
+        iproute2_mock.return_value.iter_routes.return_value = iter([{'destination': 'default'}])
+
+        assert list(routes.iter_routes()) == [{'destination': 'default'}]
+        iproute2_mock.assert_called_once_with(load=False)
@@ -0,0 +1,144 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.scheduler"""
+
+import mock
+
+from mercury_agent.inspector import inspect, scheduler
+from mercury_agent.rpc import SerialLock
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class InspectorSchedulerUnitTest(MercuryAgentUnitTest):
+    """Unit tests for the background inspector scheduler"""
+    def setUp(self):
+        super(InspectorSchedulerUnitTest, self).setUp()
+        self.mem = mock.Mock(return_value={'total': 100})
+        self.raid = mock.Mock(return_value=[{'status': 'OK'}])
+
+        patches = [
+            mock.patch.object(scheduler, 'inspectors', [('mem', self.mem)]),
+            mock.patch.object(scheduler, 'late_inspectors', [('raid', self.raid)]),
+            mock.patch.object(inspect, 'global_device_info', {'mercury_id': 'abc'}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.clock = FakeClock()
+        self.lock = SerialLock()
+        self.publisher = mock.Mock()
+        self.scheduler = scheduler.InspectorScheduler(
+            self.lock, intervals={'mem': 10, 'raid': 100, 'unknown': 5}, jitter=0,
+            publisher=self.publisher, clock=self.clock)
+        for name, interval in self.scheduler.intervals.items():
+            self.scheduler.schedule(name, interval)
+
+    def test_unknown_inspectors_are_ignored(self):
+        """Test intervals for unknown inspectors are dropped"""
+        assert sorted(self.scheduler.intervals) == ['mem', 'raid']
+
+    def test_inspectors_run_on_their_interval(self):
+        """Test each inspector runs when it is due"""
+        self.clock.now = 10
+        assert self.scheduler.run_pending() == 10
+        assert self.mem.call_count == 1
+        assert not self.raid.called
+        self.publisher.publish.assert_called_once_with(inspect.global_device_info,
+                                                       sections=['mem'])
+
+        self.clock.now = 100
+        self.scheduler.run_pending()
+        self.raid.assert_called_once_with({'mercury_id': 'abc', 'mem': {'total': 100}})
+        assert inspect.global_device_info['raid'] == [{'status': 'OK'}]
+
+    def test_serial_lock_defers_refresh(self):
+        """Test serial sections are not refreshed while a serial task holds the lock"""
+        self.lock.acquire('task')
+        self.clock.now = 100
+        self.scheduler.run_pending()
+        assert not self.raid.called
+        assert (100 + scheduler.BUSY_RETRY_SECONDS, 'raid') in self.scheduler.queue
+
+    def test_other_sections_ignore_serial_lock(self):
+        """Test sections which do not conflict with serial tasks are refreshed during one"""
+        self.lock.acquire('task')
+        self.clock.now = 10
+        self.scheduler.run_pending()
+        assert self.mem.call_count == 1
+        assert self.lock.task_id == 'task'
+
+    def test_refresh_holds_serial_lock(self):
+        """Test serial tasks are rejected while a serial section is refreshed"""
+        def start_task(device_info):
+            assert self.lock.task_id == scheduler.REFRESH_TASK_ID
+            assert not self.lock.acquire('task')
+            return [{'status': 'Degraded'}]
+
+        self.raid.side_effect = start_task
+        assert self.scheduler.refresh('raid')
+        assert inspect.global_device_info['raid'] == [{'status': 'Degraded'}]
+        assert self.lock.acquire('task')
+
+    def test_serial_lock_released_on_failure(self):
+        """Test the serial lock is released when an inspector raises"""
+        self.raid.side_effect = Exception('failed')
+        self.clock.now = 100
+        self.scheduler.run_pending()
+        assert self.lock.acquire('task')
+
+    def test_refresh_holds_section_lock(self):
+        """Test a refresh excludes other updates of its section"""
+        def inspect_raid(device_info):
+            assert not inspect.get_section_lock('raid').acquire(False)
+            return [{'status': 'OK'}]
+
+        self.raid.side_effect = inspect_raid
+        assert self.scheduler.refresh('raid')
+        assert inspect.get_section_lock('raid').acquire(False)
+        inspect.get_section_lock('raid').release()
+
+    def test_section_lock_defers_refresh(self):
+        """Test a section being updated elsewhere is refreshed later"""
+        with inspect.get_section_lock('mem'):
+            self.clock.now = 10
+            self.scheduler.run_pending()
+        assert not self.mem.called
+        assert self.scheduler.queue[0] == (10 + scheduler.BUSY_RETRY_SECONDS, 'mem')
+        assert self.lock.acquire('task')
+
+    def test_options(self):
+        """Test inspectors are passed their options"""
+        self.scheduler.options = {'mem': {'full': True}, 'raid': {'timeout': 5}}
+        self.scheduler.refresh('mem')
+        self.scheduler.refresh('raid')
+        self.mem.assert_called_once_with(full=True)
+        self.raid.assert_called_once_with(mock.ANY, timeout=5)
+
+    def test_failed_inspector_keeps_data(self):
+        """Test an inspector returning None does not clear the section"""
+        inspect.global_device_info['mem'] = {'total': 100}
+        self.mem.return_value = None
+        assert self.scheduler.refresh('mem')
+        assert inspect.global_device_info['mem'] == {'total': 100}
+        assert not self.publisher.publish.called
@@ -0,0 +1,192 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.inspector.udev_monitor"""
+
+import shutil
+import tempfile
+
+import mock
+
+from mercury_agent.inspector import inspect, udev_monitor
+from mercury_agent.inspector.hwlib import block
+from tests.unit.base import MercuryAgentUnitTest
+from tests.unit.inspector.test_os_storage import write_block_tree
+
+
+class FakeDevice(dict):
+    def __init__(self, action, subsystem, sys_name, device_type=None, **properties):
+        super(FakeDevice, self).__init__(**properties)
+        self.action = action
+        self.subsystem = subsystem
+        self.sys_name = sys_name
+        self.device_type = device_type
+        self.attributes = mock.Mock()
+        self.attributes.asint.return_value = 1
+
+
+class FakeMonitor(object):
+    def __init__(self, events):
+        self.events = list(events)
+        self.filters = []
+
+    def filter_by(self, subsystem):
+        self.filters.append(subsystem)
+
+    def poll(self, timeout=None):
+        if self.events:
+            return self.events.pop(0)
+        return None
+
+
+def disk(action, devname, **properties):
+    return FakeDevice(action, 'block', devname.split('/')[-1], device_type='disk',
+                      DEVNAME=devname, MAJOR='8', DEVPATH='/devices/' + devname, **properties)
+
+
+class UDevInventoryMonitorUnitTest(MercuryAgentUnitTest):
+    """Unit tests for udev driven inventory updates"""
+    def setUp(self):
+        super(UDevInventoryMonitorUnitTest, self).setUp()
+        device_info = {
+            'mercury_id': 'abc',
+            'os_storage': {'/dev/sda': {'DEVNAME': '/dev/sda'}},
+            'interfaces': [{'devname': 'eth0'}, {'devname': 'eth1'}],
+            'pci': [{'slot': '00:1f.2'}, {'slot': '03:00.0'}]
+        }
+        patcher = mock.patch.object(inspect, 'global_device_info', device_info)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.publisher = mock.Mock()
+        # Without a udev database the event's own properties are used
+        patcher = mock.patch.object(udev_monitor, 'BlockDevices',
+                                    side_effect=OSError('udev database is not available'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _monitor(self, events):
+        return udev_monitor.UDevInventoryMonitor(publisher=self.publisher, settle=0.01,
+                                                 monitor=FakeMonitor(events))
+
+    def test_disk_hot_plug(self):
+        """Test adding and removing a disk only touches that entry"""
+        monitor = self._monitor([disk('add', '/dev/sdb', ID_SERIAL='S2'),
+                                 disk('remove', '/dev/sda')])
+        assert monitor.process() == ['os_storage']
+        assert inspect.global_device_info['os_storage'] == {
+            '/dev/sdb': {'DEVNAME': '/dev/sdb', 'MAJOR': '8', 'DEVPATH': '/devices//dev/sdb',
+                         'ID_SERIAL': 'S2'}}
+        self.publisher.publish.assert_called_once_with(inspect.global_device_info,
+                                                       sections=['os_storage'])
+
+    def test_partitions_and_cdroms_are_ignored(self):
+        """Test events for devices os_storage does not track"""
+        monitor = self._monitor([
+            FakeDevice('add', 'block', 'sda1', device_type='partition', DEVNAME='/dev/sda1'),
+            disk('add', '/dev/sr0', ID_TYPE='cd')])
+        assert monitor.process() == []
+        assert not self.publisher.publish.called
+
+    @mock.patch('mercury_agent.inspector.udev_monitor.netifaces.gateways', return_value={})
+    @mock.patch('mercury_agent.inspector.udev_monitor.inspect_interface')
+    def test_interface_change(self, mock_inspect_interface, _):
+        """Test a changed interface keeps its position"""
+        mock_inspect_interface.return_value = {'devname': 'eth0', 'carrier': True}
+        monitor = self._monitor([FakeDevice('change', 'net', 'eth0', INTERFACE='eth0')])
+        assert monitor.process() == ['interfaces']
+        assert inspect.global_device_info['interfaces'] == [
+            {'devname': 'eth0', 'carrier': True}, {'devname': 'eth1'}]
+
+    def test_interface_removed(self):
+        """Test a removed interface is dropped"""
+        monitor = self._monitor([FakeDevice('remove', 'net', 'eth1')])
+        assert monitor.process() == ['interfaces']
+        assert inspect.global_device_info['interfaces'] == [{'devname': 'eth0'}]
+
+    @mock.patch('mercury_agent.inspector.udev_monitor.lspci.get_pci_devices')
+    def test_pci_add(self, mock_parse):
+        """Test a new PCI device is inspected on its own and kept in slot order"""
+        mock_parse.return_value = [{'slot': '02:00.0'}]
+        monitor = self._monitor([FakeDevice('add', 'pci', '0000:02:00.0')])
+        assert monitor.process() == ['pci']
+        mock_parse.assert_called_once_with(slot='0000:02:00.0')
+        assert [d['slot'] for d in inspect.global_device_info['pci']] == \
+            ['00:1f.2', '02:00.0', '03:00.0']
+
+    def test_pci_remove(self):
+        """Test a removed PCI device is matched without its domain"""
+        monitor = self._monitor([FakeDevice('remove', 'pci', '0000:03:00.0')])
+        monitor.process()
+        assert inspect.global_device_info['pci'] == [{'slot': '00:1f.2'}]
+
+    def test_section_lock(self):
+        """Test the section is changed and published while its lock is held"""
+        lock = inspect.get_section_lock('interfaces')
+
+        def publish(device_info, sections):
+            assert not lock.acquire(False)
+
+        self.publisher.publish.side_effect = publish
+        monitor = self._monitor([FakeDevice('remove', 'net', 'eth1')])
+        with mock.patch.dict(udev_monitor.REFRESH_HANDLERS, {
+                'interfaces': mock.Mock(side_effect=lambda *args: publish(None, None) or [])}):
+            assert monitor.process() == ['interfaces']
+        assert self.publisher.publish.called
+        assert lock.acquire(False)
+        lock.release()
+
+    def test_no_event(self):
+        """Test nothing is published when no event arrives"""
+        assert self._monitor([]).process() == []
+        assert not self.publisher.publish.called
+
+
+class UDevBlockDevicesUnitTest(MercuryAgentUnitTest):
+    """Unit tests for block events read through the udev database"""
+    def setUp(self):
+        super(UDevBlockDevicesUnitTest, self).setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.sysfs, udev_data = write_block_tree(root)
+        patcher = mock.patch.object(udev_monitor, 'BlockDevices', return_value=block.BlockDevices(
+            sysfs_root=self.sysfs, udev_data_path=udev_data))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.device_info = {'os_storage': {
+            '/dev/sda': {'DEVNAME': '/dev/sda'},
+            '/dev/dm-0': {'DEVNAME': '/dev/dm-0', 'paths': ['/dev/sdb']}
+        }}
+
+    def test_multipath_path_added(self):
+        """Test a new path is reported under its map and not on its own"""
+        section = udev_monitor.refresh_storage_device(self.device_info, disk('add', '/dev/sdc'),
+                                                      'add')
+        assert sorted(section) == ['/dev/dm-0', '/dev/sda']
+        assert section['/dev/dm-0']['paths'] == ['/dev/sdb', '/dev/sdc']
+
+    def test_multipath_map_changed(self):
+        """Test a change event on a map re-reads it with its paths"""
+        device = FakeDevice('change', 'block', 'dm-0', device_type='disk', DEVNAME='/dev/dm-0')
+        section = udev_monitor.refresh_storage_device(self.device_info, device, 'change')
+        assert section['/dev/dm-0']['DM_NAME'] == 'mpatha'
+        assert section['/dev/dm-0']['paths'] == ['/dev/sdb', '/dev/sdc']
+
+        self.device_info['os_storage'] = section
+        assert udev_monitor.refresh_storage_device(self.device_info, device, 'change') is None
+
+    def test_other_device_mapper_devices_are_ignored(self):
+        device = FakeDevice('add', 'block', 'dm-1', device_type='disk', DEVNAME='/dev/dm-1')
+        self.device_info['os_storage']['/dev/dm-0']['paths'] = ['/dev/sdb', '/dev/sdc']
+        assert udev_monitor.refresh_storage_device(self.device_info, device, 'add') is None
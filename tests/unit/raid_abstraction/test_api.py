@@ -16,6 +16,8 @@
 import json
 import os
 
+import mock
+
 from mercury_agent.hardware.raid.abstraction.api import (
     RAIDAbstractionException,
     RAIDActions,
@@ -150,3 +152,72 @@ class MercuryRAIDAbstractionAPITest(MercuryAgentUnitTest):
         drives = self.dummy.get_all_drives(0)
         for idx in range(len(drives)):
             assert idx == drives[idx]['index']
+
+    def test_adapter_transaction(self):
+        self.dummy.transform_adapter_info = mock.Mock(
+            side_effect=DummyImplementation.transform_adapter_info.__get__(self.dummy))
+
+        assert self.dummy.create_logical_drive(adapter=0, level='0', drives='9, 10')
+        assert self.dummy.transform_adapter_info.call_count == 1
+
+        assert self.dummy.get_drives_from_selection(0, '9-11')
+        assert self.dummy.transform_adapter_info.call_count == 2
+
+        with self.dummy.adapter_transaction(0):
+            adapter_info = self.dummy.get_adapter_info(0)
+            with self.dummy.adapter_transaction(0):
+                assert self.dummy.get_adapter_info(0) is adapter_info
+            assert self.dummy.get_unassigned(0)
+            self.dummy.get_adapter_info(1)
+            self.dummy.get_adapter_info(1)
+        assert self.dummy.transform_adapter_info.call_count == 5
+
+        self.assertRaises(RAIDAbstractionException, self.dummy.create_logical_drive,
+                          *(0, '0', None, '10GiB', 100))
+        self.dummy.get_adapter_info(0)
+        assert self.dummy.transform_adapter_info.call_count == 7
+
+    def test_plan_layout(self):
+        steps = self.dummy.plan_layout(0, logical_drives=[
+            {'level': '1', 'drives': '9-10'},
+            {'level': 10, 'drives': [11, 12, 13, 14], 'size': '100GiB'},
+            {'level': '0', 'array': 2, 'size': '10%FREE'}
+        ], spares=[{'drives': '15', 'arrays': [1]}])
+
+        assert steps == [
+            ('create_logical_drive', {'level': '1', 'drives': [9, 10], 'size': None}),
+            ('create_logical_drive', {'level': '10', 'drives': [11, 12, 13, 14],
+                                      'size': '100GiB'}),
+            ('create_logical_drive', {'level': '0', 'array': 2, 'size': '10%FREE'}),
+            ('add_spares', {'drives': [15], 'arrays': [1]})
+        ]
+        # The dummy does not change its configuration, leave out steps on the new arrays
+        assert self.dummy.apply_layout(0, steps[:2]) == [True] * 2
+
+        # Each logical drive takes half of what the one before it left
+        assert len(self.dummy.plan_layout(0, logical_drives=[
+            {'level': '0', 'array': 0, 'size': '50%FREE'}] * 3)) == 3
+
+        steps = self.dummy.plan_layout(0, clear=True,
+                                       logical_drives=[{'level': '5', 'drives': '0-5'}])
+        assert steps[0] == ('clear_configuration', {})
+
+        invalid_layouts = [
+            dict(logical_drives=[{'level': '1', 'drives': '9-10'},
+                                 {'level': '1', 'drives': '10-11'}]),  # drive 10 claimed twice
+            dict(logical_drives=[{'level': '5', 'drives': '0-5'}]),  # drives are array members
+            dict(logical_drives=[{'level': '1', 'drives': 9}]),  # RAID 1 needs two drives
+            dict(logical_drives=[{'level': '0', 'array': 1}]),  # array does not exist yet
+            dict(logical_drives=[{'level': '0'}]),  # neither drives or array
+            dict(spares=[{'drives': '9', 'arrays': [1]}]),  # array does not exist
+            dict(logical_drives=[{'level': '0', 'array': 0, 'size': '100%FREE'},
+                                 {'level': '0', 'array': 0, 'size': '100%FREE'}]),  # array 0 full
+            dict(logical_drives=[{'level': '1', 'drives': '9-10'},
+                                 {'level': '0', 'array': 1}]),  # array 1 has no space left
+            dict(logical_drives=[{'level': '0', 'array': 0, 'size': '1TB'},
+                                 {'level': '0', 'array': 0, 'size': '1TB'}]),  # 1.69TB free
+            dict(logical_drives=[{'level': '0', 'drives': '9'}],
+                 spares=[{'drives': 'unassigned'}])  # drive 25 is FAILED
+        ]
+        for layout in invalid_layouts:
+            self.assertRaises(RAIDAbstractionException, self.dummy.plan_layout, 0, **layout)
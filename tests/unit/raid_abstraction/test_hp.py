@@ -63,7 +63,7 @@ class MercurySmartArrayActionsTest(MercuryAgentUnitTest):
 
         self.dummy_actions = DummySmartArrayActions()
 
-    @mock.patch('mercury_agent.hardware.drivers.hp_raid.HPSSA')
+    @mock.patch('hpssa.hpssa.HPSSA')
     @mock.patch('mercury_agent.hardware.drivers.hp_raid.get_configuration')
     def test_real_init(self, mock_hpssa, mock_get_configuration):
         SmartArrayActions()
@@ -7,6 +7,7 @@ from mercury.common.helpers.cli import CLIResult
 from mercury_agent.hardware.drivers.megaraid import MegaRAIDActions, \
     MegaRaidSASDriver
 from mercury_agent.hardware.raid.abstraction.api import RAIDAbstractionException
+from mercury_agent.hardware.raid.interfaces.megaraid.storcli import StorcliSnapshot
 
 from ..base import MercuryAgentUnitTest
 
@@ -52,6 +53,7 @@ class DummyMegaRAIDActions(MegaRAIDActions):
         self.storcli.controllers = get_controllers()
 
         self.storcli.get_disk_group = get_storcli_dall_show
+        self.storcli.snapshot = StorcliSnapshot(self.storcli)
 
 
 class TestMegaRAIDActions(MercuryAgentUnitTest):
@@ -129,6 +131,19 @@ class TestMegaRAIDActions(MercuryAgentUnitTest):
         self.assertRaises(RAIDAbstractionException,
                           self.dummy_actions.transform_adapter_info, *(100,))
 
+    def test_transforms_share_snapshot(self):
+        new_dummy_actions = DummyMegaRAIDActions()
+        new_dummy_actions.storcli.get_disk_group = mock.Mock(
+            side_effect=get_storcli_dall_show)
+
+        new_dummy_actions.get_adapter_info(0)
+        new_dummy_actions.get_drives_from_selection(0, 'unassigned')
+        new_dummy_actions.storcli.get_disk_group.assert_called_once_with('all')
+
+        new_dummy_actions.storcli.snapshot.invalidate()
+        new_dummy_actions.transform_adapter_info(0)
+        self.assertEqual(new_dummy_actions.storcli.get_disk_group.call_count, 2)
+
     @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
     @mock.patch('mercury_agent.hardware.drivers.megaraid.get_configuration')
     def test_real_init(self, mock_get_configuration, mock_cli):
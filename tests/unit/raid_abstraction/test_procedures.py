@@ -0,0 +1,117 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+import pytest
+
+from mercury_agent.hardware.raid.abstraction.api import RAIDAbstractionException
+from mercury_agent.procedures import raid
+
+from .test_api import DummyImplementation
+from ..base import MercuryAgentUnitTest
+
+
+class RAIDProceduresTest(MercuryAgentUnitTest):
+    def setUp(self):
+        super(RAIDProceduresTest, self).setUp()
+        self.handler = DummyImplementation()
+        self.handler.dummy_data.append(self.handler.dummy_data[0])
+
+        driver = mock.Mock()
+        driver.handler = self.handler
+        driver.name = 'hpssa'
+        self.drivers = [driver]
+        patcher = mock.patch.object(raid, 'get_subsystem_drivers', return_value=self.drivers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(raid, 'refresh_adapters')
+        self.refresh_adapters = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(raid, 'raid_change', mock.MagicMock())
+        self.raid_change = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_apply_raid_layout(self):
+        self.handler.transform_adapter_info = mock.Mock(
+            side_effect=DummyImplementation.transform_adapter_info.__get__(self.handler))
+
+        result = raid.apply_raid_layout([
+            {'adapter': 0,
+             'logical_drives': [{'level': '1', 'drives': '9-10'}],
+             'spares': [{'drives': '11'}]},
+            {'adapter': 2, 'clear': True,
+             'logical_drives': [{'level': '10', 'drives': '12-15'}]}
+        ])
+
+        assert result == [{'driver': 'hpssa', 'adapter': 0, 'results': [True, True]},
+                          {'driver': 'hpssa', 'adapter': 2, 'results': [True, True]}]
+        # One read per adapter to validate, then one per create, the dummy add_spares does not read
+        assert self.handler.transform_adapter_info.call_count == 4
+        # Both adapters are refreshed together, once the layout is applied
+        self.raid_change.assert_called_once_with()
+        self.refresh_adapters.assert_called_once_with([('hpssa', 0), ('hpssa', 2)])
+
+    def test_invalid_layout(self):
+        self.handler.create = mock.Mock()
+
+        with pytest.raises(RAIDAbstractionException):
+            raid.apply_raid_layout([
+                {'adapter': 0, 'logical_drives': [{'level': '1', 'drives': '9-10'}]},
+                {'adapter': 2, 'logical_drives': [{'level': '1', 'drives': '0-1'}]}
+            ])
+
+        with pytest.raises(RAIDAbstractionException):
+            raid.apply_raid_layout([{'adapter': 0}, {'adapter': 0}])
+
+        self.handler.create.assert_not_called()
+        self.refresh_adapters.assert_not_called()
+
+    def test_failed_adapter(self):
+        self.handler.add_spares = mock.Mock(side_effect=RAIDAbstractionException('Spare failed'))
+
+        with pytest.raises(RAIDAbstractionException):
+            raid.apply_raid_layout([
+                {'adapter': 0, 'spares': [{'drives': '9'}]},
+                {'adapter': 2, 'logical_drives': [{'level': '1', 'drives': '9-10'}]}
+            ])
+
+        self.refresh_adapters.assert_called_once_with([('hpssa', 0), ('hpssa', 2)])
+
+    def test_adapters_addressed_per_driver(self):
+        megaraid = mock.Mock()
+        megaraid.name = 'megaraid_sas'
+        megaraid.handler = DummyImplementation()
+        megaraid.handler.create = mock.Mock(return_value=True)
+        self.handler.create = mock.Mock(return_value=True)
+        self.drivers.append(megaraid)
+
+        # Adapter indexes are per driver, so a layout must say which driver it means
+        with pytest.raises(RAIDAbstractionException):
+            raid.apply_raid_layout([{'adapter': 0}])
+        with pytest.raises(RAIDAbstractionException):
+            raid.apply_raid_layout([{'driver': 'smartpqi', 'adapter': 0}])
+
+        result = raid.apply_raid_layout([
+            {'driver': 'hpssa', 'adapter': 0,
+             'logical_drives': [{'level': '1', 'drives': '9-10'}]},
+            {'driver': 'megaraid_sas', 'adapter': 0,
+             'logical_drives': [{'level': '1', 'drives': '9-10'}]}
+        ])
+
+        assert [entry['driver'] for entry in result] == ['hpssa', 'megaraid_sas']
+        assert self.handler.create.call_count == 1
+        assert megaraid.handler.create.call_count == 1
+        self.refresh_adapters.assert_called_once_with([('hpssa', 0), ('megaraid_sas', 0)])
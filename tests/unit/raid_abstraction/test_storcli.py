@@ -23,6 +23,21 @@ class StorcliTest(MercuryAgentUnitTest):
 
         self.assertRaises(storcli.StorcliException, storcli.Storcli)
 
+    @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
+    def test_run_timeout(self, mock_cli):
+        mock_cli.find_in_path.side_effect = lambda name: '/usr/bin/' + name
+        s = storcli.Storcli(timeout=30)
+
+        mock_cli.run.return_value = CLIResult('', '', storcli.TIMEOUT_RETURNCODE)
+        self.assertRaises(storcli.StorcliException, s.run, *('/call show all', True))
+        mock_cli.run.assert_called_with(
+            '/usr/bin/timeout -k 5 30 /usr/bin/storcli /call show all', ignore_error=True)
+
+        s = storcli.Storcli(timeout=None)
+        mock_cli.run.return_value = CLIResult('', '', 0)
+        s.run('/call show all')
+        mock_cli.run.assert_called_with('/usr/bin/storcli /call show all', ignore_error=False)
+
     @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
     def test_run_json(self, mock_cli):
         with open(os.path.join(os.path.dirname(__file__),
@@ -150,3 +165,37 @@ class StorcliTest(MercuryAgentUnitTest):
         s.add_hotspare(0, 32, 10, [0, 1, 2])
 
         s.run.assert_called_with('/c0/e32/s10 add hotsparedrive DGs=0,1,2')
+
+    @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.time')
+    @mock.patch('mercury_agent.hardware.raid.interfaces.megaraid.storcli.cli')
+    def test_snapshot(self, mock_cli, mock_time):
+        mock_cli.find_in_path.return_value = '/sbin/storcli64'
+        mock_time.time.return_value = 1000
+
+        s = storcli.Storcli(snapshot_ttl=30)
+        s.run_json = mock.Mock()
+        s.run_json.side_effect = lambda cmd: {
+            'Controllers': [
+                {'Command Status': {'Status': 'Success'},
+                 'Response Data': {'Response Data': {'controller': c}, 'Basics': c}}
+                for c in range(2)]}
+
+        assert s.snapshot.controllers[1]['Basics'] == 1
+        assert s.snapshot.get_disk_group(1) == {'controller': 1}
+        assert s.snapshot.get_disk_group(0) == {'controller': 0}
+        self.assertRaises(IndexError, s.snapshot.get_disk_group, *(2,))
+        assert s.run_json.call_count == 2
+
+        mock_time.time.return_value = 1031
+        s.snapshot.get_disk_group(0)
+        assert s.run_json.call_count == 4
+
+        s.run = mock.Mock()
+        s.add_hotspare(0, 32, 10)
+        s.snapshot.get_disk_group(0)
+        assert s.run_json.call_count == 6
+
+        s.run.side_effect = storcli.StorcliException
+        self.assertRaises(storcli.StorcliException, s.delete, *(0,))
+        s.snapshot.get_disk_group(0)
+        assert s.run_json.call_count == 8
@@ -0,0 +1,62 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.backoff"""
+
+import random
+
+from mercury_agent.backoff import ExponentialBackoff, get_retry_after
+from tests.unit.base import MercuryAgentUnitTest
+
+
+def upper_bound(a, b):
+    return b
+
+
+class BackoffUnitTest(MercuryAgentUnitTest):
+    """Unit tests for registration retry backoff"""
+    def test_window_doubles_until_cap(self):
+        """Test the jitter window grows exponentially and is capped"""
+        backoff = ExponentialBackoff(base=1.0, cap=10.0, uniform=upper_bound)
+        assert [backoff.next_delay() for _ in range(6)] == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+    def test_full_jitter(self):
+        """Test delays are drawn from the whole window"""
+        backoff = ExponentialBackoff(base=1.0, cap=300.0, uniform=random.Random(0).uniform)
+        for attempt in range(12):
+            window = min(300.0, 1.0 * 2 ** attempt)
+            assert backoff.attempts == attempt
+            assert 0 <= backoff.next_delay() <= window
+
+    def test_retry_after_hint(self):
+        """Test the backend hint is a lower bound for the delay"""
+        backoff = ExponentialBackoff(base=2.0, cap=300.0, uniform=upper_bound)
+        assert backoff.next_delay(retry_after=30.0) == 32.0
+
+    def test_reset(self):
+        """Test reset() restores the initial window"""
+        backoff = ExponentialBackoff(base=1.0, cap=300.0, uniform=upper_bound)
+        for _ in range(100):
+            backoff.next_delay()
+        backoff.reset()
+        assert backoff.next_delay() == 1.0
+
+    def test_get_retry_after(self):
+        """Test reading retry_after from backend responses"""
+        assert get_retry_after({'error': True, 'retry_after': 12}) == 12.0
+        assert get_retry_after({'error': True, 'message': {'retry_after': '5'}}) == 5.0
+        assert get_retry_after({'error': True, 'message': 'Timeout'}) is None
+        assert get_retry_after({'error': True, 'retry_after': 'soon'}) is None
+        assert get_retry_after({'error': True, 'retry_after': -1}) is None
+        assert get_retry_after(None) is None
@@ -0,0 +1,83 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.compression"""
+
+import json
+import os
+
+import mock
+
+from mercury_agent import compression
+from mercury_agent.backend_client import CompressingBackEndClient
+from tests.unit.base import MercuryAgentUnitTest
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def load_resource(name):
+    with open(os.path.join(RESOURCES, name)) as fp:
+        return json.load(fp)
+
+
+class CompressionUnitTest(MercuryAgentUnitTest):
+    """Unit tests for payload compression"""
+    def setUp(self):
+        super(CompressionUnitTest, self).setUp()
+        self.payload = load_resource('storcli.json')
+
+    def tearDown(self):
+        compression.set_negotiated_codec(None)
+        super(CompressionUnitTest, self).tearDown()
+
+    def test_round_trip(self):
+        """Test every available codec round trips a large payload"""
+        for codec in compression.available_codecs():
+            envelope = compression.compress(self.payload, codec)
+            assert compression.is_compressed(envelope)
+            assert envelope[compression.ENVELOPE_KEY] == codec
+            assert len(envelope['data']) < envelope['size']
+            assert compression.decompress(envelope) == self.payload
+
+    def test_below_threshold(self):
+        """Test small payloads are sent as they are"""
+        assert compression.compress({'raid.0.status': 'OK'}, 'zlib') == {'raid.0.status': 'OK'}
+
+    def test_no_codec(self):
+        """Test compression is skipped until a codec is negotiated"""
+        assert compression.compress(self.payload, None) is self.payload
+
+    def test_negotiate(self):
+        """Test reading the codec chosen by the backend"""
+        assert compression.negotiate({'error': False, 'message': {'compression': 'zlib'}}) == 'zlib'
+        assert compression.negotiate({'error': False, 'compression': 'zlib'}) == 'zlib'
+        assert compression.negotiate({'error': False, 'message': 'ok'}) is None
+        assert compression.negotiate({'error': False, 'compression': 'lz4'}) is None
+
+    @mock.patch('mercury.common.clients.rpc.backend.BackEndClient.transceiver')
+    def test_client_compresses_after_negotiation(self, mock_transceiver):
+        """Test the backend client only compresses once a codec is negotiated"""
+        client = CompressingBackEndClient('tcp://localhost:9000')
+
+        client.update('abc', self.payload)
+        assert mock_transceiver.call_args[0][0]['args'][1] is self.payload
+
+        compression.set_negotiated_codec('zlib')
+        client.update('abc', self.payload)
+        assert compression.is_compressed(mock_transceiver.call_args[0][0]['args'][1])
+
+        client.complete_task({'status': 'SUCCESS', 'message': self.payload, 'task_id': 't'})
+        return_data = mock_transceiver.call_args[0][0]['args'][0]
+        assert return_data['status'] == 'SUCCESS'
+        assert compression.decompress(return_data['message']) == self.payload
@@ -0,0 +1,72 @@
+# Copyright 2017 Rackspace
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+"""Unit tests for mercury_agent.timeline"""
+
+from mercury_agent.timeline import Timeline
+from tests.unit.base import MercuryAgentUnitTest
+
+
+class FakeClock(object):
+    def __init__(self, start=100.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class TimelineUnitTest(MercuryAgentUnitTest):
+    """Unit tests for the startup timeline"""
+    def setUp(self):
+        super(TimelineUnitTest, self).setUp()
+        self.clock = FakeClock()
+        self.timeline = Timeline(clock=self.clock)
+
+    def test_phase(self):
+        """Test phases are recorded as offsets from the origin"""
+        self.clock.now += 1
+        with self.timeline.phase('inspection'):
+            self.clock.now += 2.5
+
+        entries = self.timeline.to_dict()['entries']
+        assert entries == [{'name': 'inspection', 'category': 'phase',
+                            'start': 1.0, 'end': 3.5, 'duration': 2.5}]
+
+    def test_phase_records_on_exception(self):
+        """Test a failed phase is still recorded"""
+        try:
+            with self.timeline.phase('registration'):
+                self.clock.now += 1
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert self.timeline.to_dict()['entries'][0]['duration'] == 1.0
+
+    def test_wrap(self):
+        """Test wrap() times a callable and passes through its result"""
+        def f(x):
+            self.clock.now += 0.5
+            return x * 2
+
+        assert self.timeline.wrap('pci', f, 'inspector')(2) == 4
+        data = self.timeline.to_dict()
+        assert data['entries'][0]['category'] == 'inspector'
+        assert data['entries'][0]['duration'] == 0.5
+        assert data['elapsed'] == 0.5
+
+    def test_entries_sorted_by_start(self):
+        """Test entries are ordered by start time"""
+        self.timeline.record('late', 105.0, 106.0)
+        self.timeline.record('early', 101.0, 102.0)
+        assert [e['name'] for e in self.timeline.to_dict()['entries']] == ['early', 'late']